@@ -0,0 +1,5 @@
+@ECHO OFF
+setlocal
+set PYTHONPATH=%PYTHONPATH%;%CD%\src
+python src\benchmark.py %*
+endlocal
\ No newline at end of file
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+"""
+    File name: benchmark.py
+    Author: Jon Lu
+    Date created: 10/17/2026
+    Date last modified: 10/17/2026
+    Python Version: 3.6.1
+
+    Usage: python src/benchmark.py [--quick] [--only NAME ...] [--output FILE] [--baseline FILE] [--save-baseline]
+    Times path generation, pricing and IV extraction (float32 paths against float64 ones too), writes the timings
+    and peak memory as JSON and flags regressions against a stored baseline (exit status 1 if any)
+"""
+
+import argparse
+import json
+import os
+import os.path as op
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import scipy
+import bs
+import fft_pricer
+import path_sampling
+import strike_table
+from plot import iv_time_plot
+
+ROOT = op.abspath(op.join(__file__, op.pardir, op.pardir))  # montecarlo folder
+OUTPUT = op.join(ROOT, 'out', 'benchmark.json')
+BASELINE = op.join(ROOT, 'src', 'tests', 'benchmark_baseline.json')
+TOLERANCE = .25  # slowdown over baseline flagged as a regression
+MIN_SECONDS = .2  # shortest timed run, faster benchmarks are called several times per run
+JUMPS = "[{'dte': 50, 'dist': 'normal', 'mean': 0, 'sd': .6, 'delta': 0, 'skew_a': 0}]"
+DISTS = [('normal', {}), ('uniform', {}), ('double-bell', {'delta': 1}), ('skewnorm', {'skew_a': 3}),
+         ('bootstrap', {'bs_data': 'spec/stkPx.csv'}), ('garch', {}), ('heston', {})]
+
+
+def benchmarks(quick=False):
+    """
+    Parameters
+    ----------
+    quick : bool
+        If True, a tenth of the paths and prices, for smoke runs (optional, default is False)
+
+    Returns
+    -------
+    list
+        (name, function, size) of each benchmark, function takes no arguments and size is the number of paths or
+        prices it handles (for throughput)
+    """
+    scale = 10 if quick else 1
+    paths = 20000 // scale
+    out = []
+    for dist, kwargs in DISTS:
+        for jumps in [None, JUMPS]:
+            name = 'path_' + dist + ('_jumps' if jumps else '')
+            jump_kwargs = dict(kwargs, jumps=jumps) if jumps else kwargs
+            out.append((name, lambda dist=dist, kw=jump_kwargs: path_sampling.path(100, .25, 100, paths, dist, rng=0,
+                                                                                   **kw), paths))
+    out.append(('path_normal_float32', lambda: path_sampling.path(100, .25, 100, paths, 'normal', rng=0,
+                                                                  dtype='float32'), paths))
+    for dist, kwargs in [('normal', {}), ('skewnorm', {'skew_a': 3})]:
+        out.append(('observations_' + dist, lambda dist=dist, kw=kwargs: path_sampling.observations(
+            100, .25, 100, paths, dist, [25, 50, 100], rng=0, **kw), paths))
+    rv_paths = path_sampling.path(100, .25, 100, paths, 'normal', rng=0)
+    out.append(('rv', lambda: path_sampling.rv(rv_paths), paths))
+    out.append(('all_including_rv', lambda: path_sampling.all_including_rv(100, .25, 100, 5 * paths, 100, 'normal',
+                                                                           seed=0), 5 * paths))
+    index = strike_table.CallPutTable.get_index(100, 30, 12)
+    out.append(('call_put_table', lambda: strike_table.CallPutTable(100, .25, 100, paths, index, seed=0,
+                                                                    executor='serial'), paths * len(index)))
+    out.append(('call_put_table_float32', lambda: strike_table.CallPutTable(100, .25, 100, paths, index, seed=0,
+                                                                            executor='serial', dtype='float32'),
+                paths * len(index)))
+    out.append(('fft_reference_table', lambda: fft_pricer.reference_table(100, .25, 100, index, 'skewnorm', skew_a=3,
+                                                                          jumps=JUMPS), len(index)))
+    lengths = list(range(10, 160, 10))
+    out.append(('time_table', lambda: iv_time_plot.TimeTable(lengths, .25, 100, paths, 100, seed=0,
+                                                             executor='serial'), paths * len(lengths)))
+    for size in [100, 10000, 1000000 // scale]:
+        rng = np.random.default_rng(size)
+        strikes = rng.uniform(60, 140, size)
+        days = rng.integers(5, 365, size)
+        vols = rng.uniform(.1, .8, size)
+        prices = bs.bs_option_price_array('c', 100, strikes, vols, 0, days)
+        out.append(('iv_solver_%d' % size, lambda strikes=strikes, days=days, prices=prices:
+                    bs.bs_option_implied_vol_array('c', 100, strikes, .25, 0, days, prices), size))
+    return out
+
+
+def run(quick=False, only=None, repeat=5):
+    """
+    Parameters
+    ----------
+    quick : bool
+        See benchmarks()
+    only : list
+        Names of benchmarks to run (optional, default is all)
+    repeat : int
+        Number of timed runs of each benchmark, after one warm-up run, each at least MIN_SECONDS long
+        (optional, default is 5)
+
+    Returns
+    -------
+    dict
+        Machine description and, for each benchmark, best and mean seconds per call over the runs, calls per run,
+        items per second and peak bytes traced by tracemalloc during one more (untimed) call
+    """
+    results = {}
+    for name, function, size in benchmarks(quick):
+        if only and name not in only:
+            continue
+        started = time.perf_counter()
+        function()  # warm-up (imports, caches)
+        number = max(1, int(MIN_SECONDS / (time.perf_counter() - started)))  # calls per timed run, short ones looped
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                function()
+            times.append((time.perf_counter() - started) / number)
+        tracemalloc.start()
+        function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {'seconds': min(times), 'mean_seconds': float(np.mean(times)), 'repeat': repeat,
+                         'number': number, 'size': size, 'per_second': size / min(times), 'peak_memory': peak_memory}
+    return {'machine': {'platform': platform.platform(), 'processor': platform.processor(),
+                        'cpus': os.cpu_count(), 'python': platform.python_version(), 'numpy': np.__version__,
+                        'scipy': scipy.__version__},
+            'quick': quick, 'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """
+    Parameters
+    ----------
+    report : dict
+        As returned by run()
+    baseline : dict
+        Earlier report of run()
+    tolerance : float
+        Slowdown (e.g. .25 = 25% slower than baseline) beyond which a benchmark is a regression
+        (optional, default is TOLERANCE)
+
+    Returns
+    -------
+    dict
+        Ratio of best seconds to baseline best seconds for each benchmark in both reports, and names of 'regressions'
+    """
+    if report.get('quick') != baseline.get('quick'):
+        raise ValueError('report and baseline must both be quick or both be full runs!')
+    ratios = {name: result['seconds'] / baseline['results'][name]['seconds']
+              for name, result in report['results'].items() if name in baseline['results']}
+    return {'ratios': ratios, 'regressions': sorted(name for name, ratio in ratios.items() if ratio > 1 + tolerance)}
+
+
+def write(filename, report):
+    """Writes report as JSON"""
+    os.makedirs(op.dirname(op.abspath(filename)), exist_ok=True)
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    """
+    Runs the benchmarks from the command line, see the module docstring
+
+    Returns
+    -------
+    int
+        Exit status, 1 if any benchmark regressed against the baseline
+    """
+    parser = argparse.ArgumentParser(description='Benchmark path generation, pricing and IV extraction')
+    parser.add_argument('--quick', action='store_true', help='a tenth of the paths, for smoke runs')
+    parser.add_argument('--only', nargs='+', help='names of benchmarks to run')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs of each benchmark')
+    parser.add_argument('--output', default=OUTPUT, help='JSON report file')
+    parser.add_argument('--baseline', default=BASELINE, help='JSON baseline to compare against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='slowdown flagged as a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    args = parser.parse_args(argv)
+    report = run(args.quick, args.only, args.repeat)
+    if op.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('quick') == args.quick:
+            report['comparison'] = compare(report, baseline, args.tolerance)
+    write(args.output, report)
+    if args.save_baseline:
+        write(args.baseline, report)
+    comparison = report.get('comparison', {'ratios': {}, 'regressions': []})
+    for name, result in report['results'].items():
+        ratio = comparison['ratios'].get(name)
+        print('%-24s %10.4fs %14.0f/s %10.1fMB' % (name, result['seconds'], result['per_second'],
+                                                   result['peak_memory'] / 2 ** 20)
+              + ('' if ratio is None else '  x%.2f of baseline' % ratio)
+              + ('  REGRESSION' if name in comparison['regressions'] else ''))
+    return 1 if comparison['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,15 +4,28 @@
     File name: bs.py
     Author: Jon Lu
     Date created: 6/13/2017
-    Date last modified: 6/13/2017
+    Date last modified: 10/17/2026
     Python Version: 3.6.1
 """
 
 import math
+import os
+import os.path as op
+import tempfile
+import numpy as np
+from scipy.special import ndtr
 from scipy.stats import norm
+import metrics
 
 DAYS_IN_YEAR = 365.25  # average days per year
 TDAYS_IN_YEAR = 252  # trading days per year
+CACHE_DIR = op.join(op.abspath(op.join(__file__, op.pardir, op.pardir)), '.cache')  # montecarlo/.cache
+IV_TABLE_X = (-3.0, 3.0, 241)  # log-moneyness log(K / F) grid of IV table (min, max, points)
+IV_TABLE_Y = (-30.0, 0.0, 601)  # log time value grid of IV table (min, max, points)
+IV_TABLE_W_MAX = 4.0  # largest total vol vol * sqrt(t) in IV table
+IV_TABLE_POLISH = 1e-4  # largest Newton step from a table guess taken as final, its error is about the step squared
+
+_iv_tables = {}
 
 
 def bs_option_price(option_type, stock_price,
@@ -302,8 +315,299 @@ def bs_option_implied_vol(option_type, stock_price,
             vega = 100 * bs_option_vega(option_type, stock_price,
                                         strike, v, interest,
                                         days_to_exp, is_td)
-            if abs(vega > .00001) and abs(p - p0) > .000001:
+            if abs(vega) > .00001 and abs(p - p0) > .000001:
                 v += (option_price - p) / vega
             else:
                 break
     return v
+
+
+def _option_kind(option_type):
+    """For internal use only, first letter of option type(s), casefolded, as array"""
+    return np.char.lower(np.asarray(option_type, dtype=str)).astype('<U1')
+
+
+def _array_inputs(option_type, stock_price, strike, vol, interest, days_to_exp, is_td):
+    """
+    For internal use only
+    Broadcasts inputs of the array functions against each other
+
+    Returns
+    -------
+    tuple
+        Option type as first letter ('c', 'p' or 's'), stock price, strike, vol, interest, days to expiration,
+        time in years, vol * sqrt(t), h and h2 (see bs_option_price()) as broadcast arrays
+        t, vol2, h and h2 are only valid where days_to_exp > 0 and vol > 0
+    """
+    kind, stock_price, strike, vol, interest, days_to_exp, is_td = np.broadcast_arrays(
+        _option_kind(option_type), np.asarray(stock_price, dtype=float), np.asarray(strike, dtype=float), np.asarray(vol, dtype=float),
+        np.asarray(interest, dtype=float), np.asarray(days_to_exp, dtype=float), np.asarray(is_td, dtype=bool))
+    valid = (days_to_exp > 0) & (vol > 0)
+    safe_vol = np.where(valid, vol, 1.0)
+    t = np.where(valid, days_to_exp, 1.0) / np.where(is_td, TDAYS_IN_YEAR, DAYS_IN_YEAR)
+    vol2 = safe_vol * np.sqrt(t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h = (np.log(stock_price / strike) + (interest + .5 * safe_vol ** 2) * t) / vol2
+    return kind, stock_price, strike, vol, interest, days_to_exp, t, vol2, h, h - vol2
+
+
+def _pdf(x):
+    """For internal use only, standard normal pdf"""
+    return np.exp(-.5 * x ** 2) / math.sqrt(2 * math.pi)
+
+
+def bs_option_price_array(option_type, stock_price,
+                          strike, vol, interest,
+                          days_to_exp, is_td=True):
+    """Array version of bs_option_price(), all parameters broadcast against each other (including option_type)
+
+    Returns
+    -------
+    numpy.ndarray
+        Black-Scholes theoretical option prices
+    """
+    kind, s, k, v, r, d, t, vol2, h, h2 = _array_inputs(option_type, stock_price, strike, vol, interest,
+                                                        days_to_exp, is_td)
+    call = kind == 'c'
+    discount = k * np.exp(-r * t)
+    price = np.where(call, s * ndtr(h) - discount * ndtr(h2), -s * ndtr(-h) + discount * ndtr(-h2))
+    expired = (d <= 0) | (v <= 0)
+    return np.where(expired, np.where(call, np.maximum(s - k, 0), np.maximum(k - s, 0)), price)
+
+
+def bs_option_delta_array(option_type, stock_price,
+                          strike, vol, interest,
+                          days_to_exp, is_td=True):
+    """Array version of bs_option_delta(), all parameters broadcast against each other (including option_type)
+
+    Returns
+    -------
+    numpy.ndarray
+        Black-Scholes deltas
+    """
+    kind, s, k, v, r, d, t, vol2, h, h2 = _array_inputs(option_type, stock_price, strike, vol, interest,
+                                                        days_to_exp, is_td)
+    call = kind == 'c'
+    delta = np.where(call, ndtr(h), -ndtr(-h))
+    expired = (d <= 0) | (v <= 0.000000001) | (k <= 0)
+    delta = np.where(expired, np.where(call, np.where(k >= s, 0.0, 1.0), np.where(k <= s, 0.0, -1.0)), delta)
+    return np.where(kind == 's', 1.0, delta)
+
+
+def bs_option_gamma_array(option_type, stock_price,
+                          strike, vol, interest,
+                          days_to_exp, is_td=True):
+    """Array version of bs_option_gamma(), all parameters broadcast against each other (including option_type)
+
+    Returns
+    -------
+    numpy.ndarray
+        Black-Scholes gammas
+    """
+    kind, s, k, v, r, d, t, vol2, h, h2 = _array_inputs(option_type, stock_price, strike, vol, interest,
+                                                        days_to_exp, is_td)
+    return np.where((d <= 0) | (v <= 0), 0.0, _pdf(h) / s / vol2)
+
+
+def bs_option_vega_array(option_type, stock_price,
+                         strike, vol, interest,
+                         days_to_exp, is_td=True):
+    """Array version of bs_option_vega(), all parameters broadcast against each other (including option_type)
+
+    Returns
+    -------
+    numpy.ndarray
+        Black-Scholes vegas
+    """
+    kind, s, k, v, r, d, t, vol2, h, h2 = _array_inputs(option_type, stock_price, strike, vol, interest,
+                                                        days_to_exp, is_td)
+    return np.where((d <= 0) | (v <= 0), 0.0, _pdf(h) * s * np.sqrt(t) / 100)
+
+
+def bs_option_rho_array(option_type, stock_price,
+                        strike, vol, interest,
+                        days_to_exp, is_td=True):
+    """Array version of bs_option_rho(), all parameters broadcast against each other (including option_type)
+
+    Returns
+    -------
+    numpy.ndarray
+        Black-Scholes rhos
+    """
+    kind, s, k, v, r, d, t, vol2, h, h2 = _array_inputs(option_type, stock_price, strike, vol, interest,
+                                                        days_to_exp, is_td)
+    safe_vol = np.where(v > 0, v, 1.0)
+    discount = np.exp(-r * t)
+    call = (_pdf(h) - k / s * discount * _pdf(h2) * s * np.sqrt(t) / safe_vol
+            + k * t * discount * ndtr(h2))
+    put = (_pdf(-h) - k / s * discount * _pdf(-h2) * s * np.sqrt(t) / safe_vol
+           - k * t * discount * ndtr(-h2))
+    return np.where((d <= 0) | (v <= 0), 0.0, np.where(kind == 'c', call, put))
+
+
+def _price_and_vega(call, stock_price, strike, vol, interest, t):
+    """
+    For internal use only
+    Black-Scholes price and derivative of price by vol (100 * vega) of arrays with t > 0 and vol > 0,
+    call is a boolean array (True for calls, False for puts)
+    """
+    sqrt_t = np.sqrt(t)
+    vol2 = vol * sqrt_t
+    h = (np.log(stock_price / strike) + (interest + .5 * vol ** 2) * t) / vol2
+    h2 = h - vol2
+    discount = strike * np.exp(-interest * t)
+    price = np.where(call, stock_price * ndtr(h) - discount * ndtr(h2), -stock_price * ndtr(-h) + discount * ndtr(-h2))
+    return price, _pdf(h) * stock_price * sqrt_t
+
+
+IV_CONVERGED = 0  # solved to tolerance
+IV_EXPIRED = 1  # days_to_exp <= 0, price has no vol information
+IV_OUT_OF_BOUNDS = 2  # price at or below the no-arbitrage lower bound, or above the price at max_vol
+IV_NOT_CONVERGED = 3  # ran out of iterations
+
+
+@metrics.timed('iv')
+def bs_option_implied_vol_array(option_type, stock_price,
+                                strike, vol, interest,
+                                days_to_exp, option_price, is_td=True,
+                                tol=1e-10, max_iter=100, max_vol=10.0, method='newton'):
+    """Implied BS volatility for whole arrays of prices at once
+    Newton steps on vega, falling back to bisection whenever a step leaves the bracket known to contain the
+    implied vol; entries are dropped from the iteration as soon as they converge
+    With method='table' the vol is interpolated from the normalized price table (see iv_table()) and polished by a
+    single Newton step, final when the step is at most IV_TABLE_POLISH (the vol is then within about its square,
+    not solved to tol), otherwise the entry falls back to the full solver from the polished vol
+
+    Parameters
+    ----------
+    option_type, stock_price, strike, vol, interest, days_to_exp, option_price, is_td
+        Same as bs_option_implied_vol(), broadcast against each other, vol is the starting guess
+    tol : float
+        Convergence tolerance on option price (optional, default value is 1e-10)
+    max_iter : int
+        Maximum number of Newton/bisection steps (optional, default value is 100)
+    max_vol : float
+        Upper bound for implied vol (optional, default value is 10.0)
+    method : str
+        Starting guess, 'newton' to start from vol or 'table' to start from iv_table() (optional, default is 'newton')
+
+    Returns
+    -------
+    tuple
+        numpy.ndarray of implied BS vols (NaN where not converged), and numpy.ndarray of statuses
+        (IV_CONVERGED, IV_EXPIRED, IV_OUT_OF_BOUNDS or IV_NOT_CONVERGED)
+    """
+    arrays = np.broadcast_arrays(_option_kind(option_type), *[np.asarray(a, dtype=float) for a in (
+        stock_price, strike, vol, interest, days_to_exp, option_price)], np.asarray(is_td, dtype=bool))
+    shape = arrays[0].shape
+    kind, s, k, v, r, d, price, is_td = [a.ravel() for a in arrays]
+    ivs = np.full(kind.shape, np.nan)
+    status = np.full(kind.shape, IV_NOT_CONVERGED)
+    status[d <= 0] = IV_EXPIRED
+    call = kind == 'c'
+    t = np.where(d > 0, d, 1.0) / np.where(is_td, TDAYS_IN_YEAR, DAYS_IN_YEAR)
+    discount = k * np.exp(-r * t)
+    lower = np.where(call, np.maximum(s - discount, 0), np.maximum(discount - s, 0))
+    upper = _price_and_vega(call, s, k, max_vol, r, t)[0]
+    # at or below the lower bound the price has no time value left to imply a vol from
+    status[(d > 0) & ((price <= lower + tol) | (price > upper + tol) | np.isnan(price))] = IV_OUT_OF_BOUNDS
+    active = np.flatnonzero(status == IV_NOT_CONVERGED)
+    lo = np.zeros(active.size)
+    hi = np.full(active.size, max_vol)
+    guess = np.where((v[active] > 0) & (v[active] < max_vol), v[active], .5 * max_vol)
+    if method == 'table':
+        table_guess = _iv_table_guess(kind[active], s[active], k[active], r[active], t[active], price[active])
+        usable = np.isfinite(table_guess) & (table_guess > 0) & (table_guess < max_vol)
+        guess[usable] = table_guess[usable]
+        metrics.count('iv_iterations', active.size)
+        guess_price, vega = _price_and_vega(call[active], s[active], k[active], guess, r[active], t[active])
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = guess - (guess_price - price[active]) / vega
+        inside = (step > 0) & (step < max_vol)
+        done = usable & inside & (np.abs(step - guess) <= IV_TABLE_POLISH)
+        ivs[active[done]] = step[done]
+        status[active[done]] = IV_CONVERGED
+        keep = ~done
+        active, lo, hi, guess = active[keep], lo[keep], hi[keep], np.where(inside, step, guess)[keep]
+    elif method != 'newton':
+        raise ValueError("""method must be string in ['newton', 'table']""")
+    for _ in range(max_iter):
+        if not active.size:
+            break
+        metrics.count('iv_iterations', active.size)
+        guess_price, vega = _price_and_vega(call[active], s[active], k[active], guess, r[active], t[active])
+        diff = guess_price - price[active]
+        done = np.abs(diff) <= tol
+        ivs[active[done]] = guess[done]
+        status[active[done]] = IV_CONVERGED
+        lo = np.where(diff < 0, guess, lo)
+        hi = np.where(diff > 0, guess, hi)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = guess - diff / vega
+        bisect = ~((step > lo) & (step < hi))
+        step[bisect] = .5 * (lo[bisect] + hi[bisect])
+        keep = ~done
+        active, lo, hi, guess = active[keep], lo[keep], hi[keep], step[keep]
+    return ivs.reshape(shape), status.reshape(shape)
+
+
+def iv_table():
+    """
+    Inverse of the normalized Black-Scholes call price c = C / S at zero rate (equivalently C * e^(rt) / F for
+    forward F): total vol w = vol * sqrt(t) on the grid of log-moneyness x = log(K / F) (IV_TABLE_X) and log time value
+    y = log(c - max(1 - e^x, 0)) (IV_TABLE_Y), NaN where the time value needs w above IV_TABLE_W_MAX
+    Built once from the forward price on a fine w grid, cached as .npy in CACHE_DIR and memory-mapped
+
+    Returns
+    -------
+    numpy.ndarray
+        len(x grid) x len(y grid) array of total vols
+    """
+    key = (IV_TABLE_X, IV_TABLE_Y, IV_TABLE_W_MAX)
+    if key not in _iv_tables:
+        filename = op.join(CACHE_DIR, 'iv_table_x%g_%g_%d_y%g_%g_%d_w%g.npy' % (IV_TABLE_X + IV_TABLE_Y + (IV_TABLE_W_MAX,)))
+        if not op.exists(filename):
+            x = np.linspace(*IV_TABLE_X)[:, np.newaxis]
+            w = IV_TABLE_W_MAX * np.linspace(0, 1, 4001)[np.newaxis, 1:] ** 2  # dense near 0 for short-dated options
+            d1 = -x / w + .5 * w
+            # time value from the out of the money side of put-call parity, so it does not cancel to 0
+            with np.errstate(divide='ignore'):
+                log_time_value = np.log(np.where(x > 0, ndtr(d1) - np.exp(x) * ndtr(d1 - w),
+                                                 np.exp(x) * ndtr(w - d1) - ndtr(-d1)))
+            y = np.linspace(*IV_TABLE_Y)
+            table = np.array([np.interp(y, np.maximum.accumulate(row), w[0], left=0, right=np.nan)
+                              for row in log_time_value])
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix='.npy', dir=CACHE_DIR)
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, table)
+            os.replace(tmp, filename)
+        _iv_tables[key] = np.load(filename, mmap_mode='r')
+    return _iv_tables[key]
+
+
+def _iv_table_guess(kind, stock_price, strike, interest, t, option_price):
+    """
+    For internal use only
+    Implied vols bilinearly interpolated from iv_table(), puts converted to calls by put-call parity
+
+    Returns
+    -------
+    numpy.ndarray
+        Implied vol estimates, NaN outside of the table
+    """
+    table = iv_table().view(np.ndarray)
+    x = np.log(strike / stock_price) - interest * t
+    c = np.where(kind == 'c', option_price, option_price + stock_price - strike * np.exp(-interest * t)) / stock_price
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = np.log(c - np.maximum(1 - np.exp(x), 0))
+    corners = []
+    for value, (v_min, v_max, n) in [(x, IV_TABLE_X), (y, IV_TABLE_Y)]:
+        pos = (value - v_min) / (v_max - v_min) * (n - 1)
+        inside = np.isfinite(pos) & (pos >= 0) & (pos < n - 1)
+        i = np.where(inside, np.floor(np.where(inside, pos, 0)), 0).astype(int)
+        corners.append((i, np.where(inside, pos - i, np.nan)))
+    (i, fx), (j, fy) = corners
+    w = ((1 - fx) * ((1 - fy) * table[i, j] + fy * table[i, j + 1])
+         + fx * ((1 - fy) * table[i + 1, j] + fy * table[i + 1, j + 1]))
+    return w / np.sqrt(t)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+"""
+    File name: executor.py
+    Author: Jon Lu
+    Date created: 10/17/2026
+    Date last modified: 10/17/2026
+    Python Version: 3.6.1
+"""
+
+import atexit
+import concurrent.futures
+import os
+
+BACKENDS = ['serial', 'thread', 'process']
+DEFAULT_BACKEND = 'process'
+
+_executors = {}
+
+
+class SerialExecutor:
+    """
+    Runs tasks one after another in the calling process, with the map() and shutdown() of concurrent.futures executors
+    """
+
+    def map(self, fn, *iterables, **kwargs):
+        return map(fn, *iterables)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def get_executor(executor=None, workers=None):
+    """
+    Shared executor, created on first use and reused by every table and plot until shutdown()
+
+    Parameters
+    ----------
+    executor : str, executor or None
+        Backend in ['serial', 'thread', 'process'], or an object with a concurrent.futures map() which is returned
+        as is (optional, default is DEFAULT_BACKEND)
+    workers : int
+        Number of threads or processes (optional, default is the number of CPUs)
+
+    Returns
+    -------
+    concurrent.futures.Executor or SerialExecutor
+    """
+    if executor is None:
+        executor = DEFAULT_BACKEND
+    if not isinstance(executor, str):
+        return executor
+    if executor not in BACKENDS:
+        raise ValueError("""executor must be string in ['serial', 'thread', 'process'] or an executor""")
+    workers = int(workers) if workers is not None else (os.cpu_count() or 1)  # may be a string from the input files
+    if workers <= 0:
+        raise ValueError('workers must be integer > 0!')
+    key = (executor, workers)
+    if key not in _executors:
+        if executor == 'serial':
+            _executors[key] = SerialExecutor()
+        elif executor == 'thread':
+            _executors[key] = concurrent.futures.ThreadPoolExecutor(workers)
+        else:
+            _executors[key] = concurrent.futures.ProcessPoolExecutor(workers)
+    return _executors[key]
+
+
+def discard(pool):
+    """Shuts down pool and drops it from the shared executors, so the next get_executor() creates a new one"""
+    for key, shared in list(_executors.items()):
+        if shared is pool:
+            del _executors[key]
+    pool.shutdown(wait=False)
+
+
+def starmap(executor, fn, tasks):
+    """
+    Parameters
+    ----------
+    executor : str, executor or None
+        See get_executor()
+    fn : callable
+        Picklable function (module-level or functools.partial of one) for the process backend
+    tasks : iterable
+        Tuples of positional arguments of fn
+
+    Returns
+    -------
+    list
+        fn(*task) for each of tasks, in the same order
+    """
+    return list(istarmap(executor, fn, tasks))
+
+
+def istarmap(executor, fn, tasks):
+    """
+    Same as starmap(), but yields results in order as they finish, so callers can record progress
+    A process pool broken by a dying worker is discarded before the error is raised, so later calls get a new one
+
+    Returns
+    -------
+    iterator
+        fn(*task) for each of tasks, in the same order
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+    pool = get_executor(executor)
+    try:
+        yield from pool.map(fn, *zip(*tasks))
+    except concurrent.futures.process.BrokenProcessPool:
+        discard(pool)
+        raise
+
+
+def shutdown():
+    """Shuts down every shared executor, the next get_executor() creates new ones"""
+    for executor in _executors.values():
+        executor.shutdown()
+    _executors.clear()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+
+"""
+    File name: fft_pricer.py
+    Author: Jon Lu
+    Date created: 10/17/2026
+    Date last modified: 10/17/2026
+    Python Version: 3.6.1
+
+    Deterministic prices for the i.i.d. dists of path_sampling: the log-return to expiration is the sum of length
+    daily log-returns and the scheduled jumps, so its characteristic function is the daily one to the power length
+    times each jump's, and one FFT turns it into the density on a grid every strike is priced from
+    Gives reference smiles without Monte Carlo noise, see check() for testing the simulated tables against them
+"""
+
+import math
+import numpy as np
+import pandas as pd
+import scipy.special
+import path_sampling
+import metrics
+import bs
+
+POINTS = 2 ** 14  # grid points of the log-return density
+WIDTH = 10  # half-width of the grid in standard deviations of the log-return
+
+
+def _skewnorm_cf(t, skew_a):
+    """Characteristic function of scipy.stats.skewnorm(skew_a) at real t, erfi written with dawsn to not overflow"""
+    d = skew_a / math.sqrt(1 + skew_a ** 2)
+    return np.exp(-.5 * t ** 2) + 2j / math.sqrt(math.pi) * np.exp(-.5 * (1 - d ** 2) * t ** 2) \
+        * scipy.special.dawsn(d * t / math.sqrt(2))
+
+
+def _skewnorm_moments(skew_a):
+    """Mean and variance of scipy.stats.skewnorm(skew_a)"""
+    mean = skew_a / math.sqrt(1 + skew_a ** 2) * math.sqrt(2 / math.pi)
+    return mean, 1 - mean ** 2
+
+
+def _binned_cf(values, u, dx):
+    """
+    Characteristic function at u = 2 * pi * numpy.fft.fftfreq(u.size, dx) of the empirical distribution of values,
+    with each value split linearly between its two neighbouring multiples of dx (keeps the mean, one FFT)
+    """
+    position = values / dx
+    low = np.floor(position)
+    upper = position - low
+    weights = np.zeros(u.size)
+    np.add.at(weights, low.astype(int) % u.size, (1 - upper) / values.size)
+    np.add.at(weights, (low.astype(int) + 1) % u.size, upper / values.size)
+    return u.size * np.fft.ifft(weights)
+
+
+def moments(length, vol, dist, **kwargs):
+    """
+    Returns
+    -------
+    tuple
+        Mean and variance of log(path[-1] / start) of path_sampling.path() with the same parameters, also checks them
+    """
+    if dist not in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm']:
+        raise ValueError("""dist must be string in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm']""")
+    for key, name in [('bs_data', 'bootstrap'), ('skew_a', 'skewnorm'), ('delta', 'double-bell')]:
+        if dist == name and key not in kwargs:
+            raise ValueError("""call with """ + name + """ must include key '""" + key + """' in kwargs""")
+    scale, drift = path_sampling.scale_and_drift(vol, dist)
+    if dist == 'bootstrap':
+        history = path_sampling.historical_log_returns(kwargs['bs_data'])
+        mean, var = float(np.mean(history)), float(np.var(history))
+    elif dist == 'skewnorm':
+        mean, var = _skewnorm_moments(float(kwargs['skew_a']))
+    else:
+        mean, var = 0.0, 1.0
+    mean, var = length * (scale * mean + drift), length * scale ** 2 * var
+    for j in path_sampling.jump_schedule(kwargs['jumps'], length) if 'jumps' in kwargs else []:
+        if j.dist == 'skewnorm':
+            skew_mean, skew_var = _skewnorm_moments(j.skew_a)
+            mean += 2 * j.mean + j.sd * skew_mean - .5 * j.sd ** 2
+            var += j.sd ** 2 * skew_var
+        else:
+            mean += (2 if j.dist == 'double-bell' else 1) * j.mean - .5 * j.sd ** 2
+            var += j.sd ** 2
+    return mean, var
+
+
+def characteristic_function(u, length, vol, dist, dx=None, **kwargs):
+    """
+    Parameters
+    ----------
+    u : numpy.ndarray
+        Real arguments
+    length, vol, dist
+        See path_sampling.path(), dist in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm']
+    dx : float
+        Grid spacing, 'bootstrap' needs u = 2 * pi * numpy.fft.fftfreq(u.size, dx), see _binned_cf()
+    **kwargs
+        See path_sampling.path(), 'delta', 'skew_a', 'bs_data' and 'jumps' are used
+
+    Returns
+    -------
+    numpy.ndarray
+        E[exp(i * u * log(path[-1] / start))] of path_sampling.path() with the same parameters
+    """
+    scale, drift = path_sampling.scale_and_drift(vol, dist)
+    if dist in ['normal', 'double-bell']:  # double-bell innovations are N(0, 1) as the +/- delta means cancel
+        step = np.exp(-.5 * (scale * u) ** 2)
+    elif dist == 'uniform':
+        step = np.sinc(math.sqrt(3) * scale * u / math.pi).astype(complex)
+    elif dist == 'skewnorm':
+        step = _skewnorm_cf(scale * u, float(kwargs['skew_a']))
+    elif dist == 'bootstrap':  # drift is binned with the returns, shifting their lattice off multiples of dx aliases
+        step = _binned_cf(path_sampling.historical_log_returns(kwargs['bs_data']) + drift, u, dx)
+        drift = 0.0
+    else:
+        raise ValueError("""dist must be string in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm']""")
+    out = (step * np.exp(1j * drift * u)) ** length
+    for j in path_sampling.jump_schedule(kwargs['jumps'], length) if 'jumps' in kwargs else []:
+        if j.dist in ['normal', 'double-bell']:  # double-bell jumps are N(2 * mean, sd)
+            jump = np.exp(1j * (2 if j.dist == 'double-bell' else 1) * j.mean * u - .5 * (j.sd * u) ** 2)
+        elif j.dist == 'uniform':
+            jump = np.exp(1j * j.mean * u) * np.sinc(math.sqrt(3) * j.sd * u / math.pi)
+        else:  # skewnorm with loc mean, plus mean, see path_sampling.step_log_returns()
+            jump = np.exp(2j * j.mean * u) * _skewnorm_cf(j.sd * u, j.skew_a)
+        out *= jump * np.exp(-.5j * j.sd ** 2 * u)
+    return out
+
+
+def density(length, vol, dist, points=POINTS, width=WIDTH, **kwargs):
+    """
+    Density of log(path[-1] / start) on a grid, by FFT inversion of characteristic_function()
+    Grid points are multiples of the spacing, so the binned 'bootstrap' returns (and their sums) fall on them
+
+    Parameters
+    ----------
+    points : int
+        Number of grid points, a power of 2 (optional, default is POINTS)
+    width : float
+        Half-width of the grid in standard deviations, around the mean, plus the largest deviation of a historical
+        return from their mean for 'bootstrap' (optional, default is WIDTH)
+
+    Returns
+    -------
+    tuple
+        Arrays of grid log-returns and their density
+    """
+    mean, var = moments(length, vol, dist, **kwargs)
+    half = width * math.sqrt(var)
+    if dist == 'bootstrap':  # fat tails, the grid also holds the most extreme return (mass beyond it wraps around)
+        history = path_sampling.historical_log_returns(kwargs['bs_data'])
+        half += float(np.max(np.abs(history - np.mean(history))))
+    dx = 2 * half / points
+    x = dx * (math.floor((mean - half) / dx) + np.arange(points))
+    u = 2 * math.pi * np.fft.fftfreq(points, dx)
+    cf = characteristic_function(u, length, vol, dist, dx, **kwargs)
+    return x, np.fft.fft(cf * np.exp(-1j * u * x[0])).real / (points * dx)
+
+
+@metrics.timed('pricing')
+def prices(length, vol, start, strikes, dist, **kwargs):
+    """
+    Call and put prices of every strike at once from density(), no Monte Carlo noise (only grid error, from the grid
+    spacing and the linear binning of 'bootstrap' returns), see path_sampling.path() for parameters
+
+    Parameters
+    ----------
+    strikes : array-like
+        Strike prices of options
+
+    Returns
+    -------
+    numpy.ndarray
+        len(strikes) x 2 array, row i is call price, put price for strikes[i]
+    """
+    if dist in ['garch', 'heston']:
+        raise ValueError('garch and heston returns are not i.i.d., price them with strike_table.CallPutTable')
+    x, f = density(length, vol, dist, **kwargs)
+    strikes = np.atleast_1d(np.asarray(strikes, dtype=float))
+    ends = start * np.exp(x)[:, np.newaxis]
+    weights = (f * (x[1] - x[0]))[:, np.newaxis]
+    return np.column_stack([np.sum(np.maximum(ends - strikes, 0) * weights, axis=0),
+                            np.sum(np.maximum(strikes - ends, 0) * weights, axis=0)])
+
+
+def reference_table(length, vol, start, strikes, dist='normal', **kwargs):
+    """
+    Reference version of strike_table.CallPutTable (without RV), priced by prices()
+
+    Parameters
+    ----------
+    strikes : array-like
+        Strike prices, e.g. from strike_table.CallPutTable.get_index()
+
+    Returns
+    -------
+    pandas.DataFrame
+        Call and put prices and IVs and C-P+X-$ for each strike price, columns named as in CallPutTable
+    """
+    strikes = np.atleast_1d(np.asarray(strikes, dtype=float))
+    values = prices(length, vol, start, strikes, dist, **kwargs)
+    ivs, _ = bs.bs_option_implied_vol_array([['c', 'p']], start, strikes[:, np.newaxis], vol, 0, length, values)
+    return pd.DataFrame(np.column_stack([values, ivs, values[:, 0] - values[:, 1] + strikes - start]),
+                        index=pd.Index(strikes, name='Strike'),
+                        columns=['Call Price', 'Put Price', 'Call IV', 'Put IV', 'C-P+X-$'])
+
+
+def check(table):
+    """
+    Compares a simulated table with its reference
+
+    Parameters
+    ----------
+    table : strike_table.CallPutTable
+
+    Returns
+    -------
+    pandas.DataFrame
+        Reference call and put prices and the simulated prices' deviations from them in standard errors
+        ('Call Z', 'Put Z'), which should mostly be within +/- 3 for a correct simulation, NaN where no simulated
+        path paid off (standard error 0)
+    """
+    reference = reference_table(table.length, table.vol, table.start, table.index, table.dist, **table.kwargs)
+    df, errors = table.get_table(), table.get_errors()
+    out = reference.loc[:, ['Call Price', 'Put Price']].set_axis(['Reference Call', 'Reference Put'], axis=1)
+    for option in ['Call', 'Put']:
+        se = errors[option + ' SE'].to_numpy(dtype=float)
+        deviation = df[option + ' Price'].to_numpy(dtype=float) - reference[option + ' Price'].to_numpy()
+        out[option + ' Z'] = np.divide(deviation, se, out=np.full(se.size, np.nan), where=se > 0)
+    return out
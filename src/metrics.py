@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+"""
+    File name: metrics.py
+    Author: Jon Lu
+    Date created: 10/17/2026
+    Date last modified: 10/17/2026
+    Python Version: 3.6.1
+"""
+
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+PHASES = ['rng', 'paths', 'rv', 'pricing', 'iv', 'io']
+COUNTERS = ['paths', 'steps', 'iv_iterations', 'cached_chunks']
+
+logger = logging.getLogger('montecarlo')
+_local = threading.local()  # Metrics collecting in the current thread, if any
+
+
+class Metrics:
+    """
+    Time spent in each phase of a run and counts of the work done, collected with collect() while the run goes
+
+    Attributes
+    ----------
+    timings : dict
+        Seconds spent in each of PHASES; 'rng', 'paths', 'rv' and 'pricing' run in the workers and are summed over
+        them, 'iv' and 'io' run in the calling process
+    counters : dict
+        Number of paths and steps simulated (cached chunks are counted separately), and of IV solver iterations
+        (summed over the prices being solved)
+    workers : dict
+        For each worker (process id and thread), number of 'tasks', 'paths' simulated and 'seconds' spent on them
+    wall : float
+        Seconds from start to end of collect()
+    peak_memory : int
+        Peak bytes traced by tracemalloc in the calling process during collect(), None unless traced
+    """
+
+    def __init__(self):
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.workers = {}
+        self.wall = 0.0
+        self.peak_memory = None
+
+    def merge(self, other):
+        """
+        Adds the timings, counters and workers of another Metrics
+
+        Returns
+        -------
+        Metrics
+            self
+        """
+        for name, seconds in other.timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+        for name, n in other.counters.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+        for worker, stats in other.workers.items():
+            totals = self.workers.setdefault(worker, {'tasks': 0, 'paths': 0, 'seconds': 0.0})
+            for name in totals:
+                totals[name] += stats[name]
+        return self
+
+    def as_dict(self):
+        """
+        Returns
+        -------
+        dict
+            JSON-serializable timings, counters, wall time, peak memory and workers, with paths per second of each
+            worker and of the whole run
+        """
+        workers = {worker: dict(stats, paths_per_second=stats['paths'] / stats['seconds'] if stats['seconds']
+                                else None)
+                   for worker, stats in self.workers.items()}
+        return {'timings': dict(self.timings), 'counters': dict(self.counters), 'wall': self.wall,
+                'paths_per_second': self.counters['paths'] / self.wall if self.wall else None,
+                'peak_memory': self.peak_memory, 'workers': workers}
+
+    def emit(self, sink, **labels):
+        """
+        Sends as_dict(), with labels (e.g. the table it belongs to), to sink
+
+        Parameters
+        ----------
+        sink : str, callable or None
+            'log' to log as JSON to the 'montecarlo' logger at INFO level, a .json filename to append as a JSON line,
+            or a callable taking the dict (optional, None sends nothing)
+        """
+        if sink is None:
+            return
+        record = dict(self.as_dict(), **labels)
+        if callable(sink):
+            sink(record)
+        elif sink == 'log':
+            logger.info(json.dumps(record, default=str))
+        elif isinstance(sink, str) and sink.lower().endswith('.json'):
+            with open(sink, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+        else:
+            raise ValueError("""sink must be 'log', a .json filename or a callable""")
+
+
+def current():
+    """
+    Returns
+    -------
+    Metrics
+        Metrics collecting in this thread, None if none
+    """
+    return getattr(_local, 'metrics', None)
+
+
+@contextlib.contextmanager
+def collect(metrics, trace_memory=False):
+    """
+    Collects phase timings and counters of everything run in this thread into metrics until the block ends
+
+    Parameters
+    ----------
+    metrics : Metrics
+    trace_memory : bool
+        If True, also records the peak memory traced by tracemalloc during the block (slows the block down,
+        only covers this process), optional, default is False
+    """
+    previous = current()
+    _local.metrics = metrics
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif trace_memory:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.wall += time.perf_counter() - started
+        if trace_memory:
+            metrics.peak_memory = tracemalloc.get_traced_memory()[1]
+        if tracing:
+            tracemalloc.stop()
+        _local.metrics = previous
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Adds the time spent in the block to phase name of the collecting Metrics, if any"""
+    metrics = current()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + time.perf_counter() - started
+
+
+def timed(name):
+    """Decorator adding the time spent in each call of a function to phase name, see phase()"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Adds n to counter name of the collecting Metrics, if any"""
+    metrics = current()
+    if metrics is not None:
+        metrics.counters[name] = metrics.counters.get(name, 0) + int(n)
+
+
+def add(other):
+    """Merges other into the collecting Metrics, if any"""
+    metrics = current()
+    if metrics is not None:
+        metrics.merge(other)
+
+
+def timed_call(function, *args, **kwargs):
+    """
+    Runs function(*args, **kwargs) collecting into a new Metrics, for tasks run on an executor
+
+    Returns
+    -------
+    tuple
+        Result of function, and its Metrics with this worker's task, paths and seconds
+    """
+    metrics = Metrics()
+    with collect(metrics):
+        result = function(*args, **kwargs)
+    metrics.workers['%d:%d' % (os.getpid(), threading.get_ident())] = {
+        'tasks': 1, 'paths': metrics.counters['paths'], 'seconds': metrics.wall}
+    return result, metrics
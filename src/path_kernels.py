@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""
+    File name: path_kernels.py
+    Author: Jon Lu
+    Date created: 10/17/2026
+    Date last modified: 10/17/2026
+    Python Version: 3.6.1
+
+    Compiled path stepper: one loop per path draws each innovation, adds jumps and accumulates the log-price and
+    squared log-returns (for RV), so paths never have to be held in memory
+    Compiled with Numba (nopython, GIL released so chunks run in parallel threads) when it is installed,
+    otherwise AVAILABLE is False and path_sampling uses its vectorized NumPy engine
+"""
+
+import math
+
+try:
+    import numba
+except ImportError:  # optional dependency
+    numba = None
+
+AVAILABLE = numba is not None
+DIST_CODES = {'normal': 0, 'uniform': 1, 'bootstrap': 2, 'double-bell': 3, 'skewnorm': 4}
+SQRT3 = math.sqrt(3)
+SQRT_HALF = math.sqrt(.5)
+
+
+def jit(function):
+    """Compiles function with Numba if available (nopython, no GIL, cached on disk), otherwise returns it as is"""
+    if numba is None:
+        return function
+    return numba.njit(nogil=True, cache=True)(function)
+
+
+@jit
+def skewnorm_draw(rng, skew_a):
+    """One draw of scipy.stats.skewnorm(skew_a) from two standard normals"""
+    d = skew_a / math.sqrt(1.0 + skew_a * skew_a)
+    u0 = rng.standard_normal()
+    u1 = d * u0 + math.sqrt(1.0 - d * d) * rng.standard_normal()
+    return u1 if u0 >= 0 else -u1
+
+
+@jit
+def innovation(rng, code, delta, skew_a, history):
+    """One innovation with the distribution of path_sampling.innovations() for DIST_CODES code"""
+    if code == 0:
+        return rng.standard_normal()
+    if code == 1:
+        return rng.uniform(-SQRT3, SQRT3)
+    if code == 2:
+        return history[min(int(rng.random() * history.size), history.size - 1)]
+    if code == 3:
+        return rng.normal(-delta, SQRT_HALF) + rng.normal(delta, SQRT_HALF)
+    return skewnorm_draw(rng, skew_a)
+
+
+@jit
+def jump(rng, code, mean, sd, delta, skew_a):
+    """One jump log-return with the distribution of path_sampling.step_log_returns()"""
+    if code == 0:
+        x = rng.normal(mean, sd)
+    elif code == 1:
+        x = rng.uniform(-sd * SQRT3, sd * SQRT3) + mean
+    elif code == 3:
+        sub_vol = math.sqrt(sd * sd / 2)
+        x = rng.normal(-delta + mean, sub_vol) + rng.normal(delta + mean, sub_vol)
+    else:
+        x = mean + sd * skewnorm_draw(rng, skew_a) + mean
+    return x - .5 * sd * sd
+
+
+@jit
+def path_kernel(rng, times, length, code, scale, drift, delta, skew_a, history, jump_first, jump_codes, jump_params,
+                start, ends, rvs, paths):
+    """
+    Simulates times paths one after another, filling ends and rvs (and paths if it has rows)
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+    times, length : int
+        Number of paths and steps
+    code : int
+        DIST_CODES of the dist of steps
+    scale, drift : float
+        See path_sampling.scale_and_drift()
+    delta, skew_a : float
+        Parameters of 'double-bell' and 'skewnorm'
+    history : numpy.ndarray
+        Historical log-returns for 'bootstrap' (any float64 array otherwise)
+    jump_first : numpy.ndarray
+        int64 array of length + 1, jumps jump_first[i] to jump_first[i + 1] - 1 are added to step i
+    jump_codes : numpy.ndarray
+        int64 DIST_CODES of jumps, ordered by step
+    jump_params : numpy.ndarray
+        len(jump_codes) x 4 array of mean, sd, delta, skew_a of jumps
+    start : float
+        Start price
+    ends, rvs : numpy.ndarray
+        Output arrays of length times, last price and RV of each path
+    paths : numpy.ndarray
+        Output times x (length + 1) array of prices, or 0 x 0 to not store paths
+    """
+    store = paths.shape[0] > 0
+    for p in range(times):
+        log_price = 0.0
+        squares = 0.0
+        if store:
+            paths[p, 0] = start
+        for i in range(length):
+            r = scale * innovation(rng, code, delta, skew_a, history) + drift
+            for j in range(jump_first[i], jump_first[i + 1]):
+                r += jump(rng, jump_codes[j], jump_params[j, 0], jump_params[j, 1], jump_params[j, 2],
+                          jump_params[j, 3])
+            log_price += r
+            squares += r * r
+            if store:
+                paths[p, i + 1] = start * math.exp(log_price)
+        ends[p] = start * math.exp(log_price)
+        rvs[p] = math.sqrt(squares / length * 252)
@@ -4,54 +4,837 @@
     File name: path_sampling.py
     Author: Jon Lu
     Date created: 6/13/2017
-    Date last modified: 6/19/2017
+    Date last modified: 10/17/2026
     Python Version: 3.6.1
 """
 
 import math
 import ast
+import collections
+import functools
 import os.path as op
+import warnings
 import numpy as np
+import scipy.special
 import scipy.stats
+import scipy.stats.qmc
 import pandas as pd
+from path_stats import PathStats
+import bs
+import metrics
+import path_kernels
 
+CHUNK_SIZE = 10000  # paths held in memory at once by the streaming functions, each chunk has its own random stream
+BLOCK_STEPS = 32  # steps of innovations held at once by aggregate_innovations()
+SUM_ROWS = 1024  # paths summed at once by running_sums()
 
-def step_sample(last, dist, mean=0.0, sd=1.0, delta=0.0, skew_a=0.0):
+_history_cache = {}
+
+Jump = collections.namedtuple('Jump', ['day', 'dist', 'mean', 'sd', 'delta', 'skew_a'])
+
+
+def historical_log_returns(bs_data):
+    """
+    Log-returns of historical prices, parsed once per process and cached by file path and modification time
+
+    Parameters
+    ----------
+    bs_data : str
+        Filename in montecarlo folder of historical data as csv (date index, price in first column)
+
+    Returns
+    -------
+    numpy.ndarray
+        float64 array of daily log-returns
+    """
+    filename = op.abspath(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir)), bs_data))
+    key = (filename, op.getmtime(filename))
+    if key not in _history_cache:
+        prices = pd.read_csv(filename, index_col=0).iloc[:, 0].to_numpy(dtype=np.float64)
+        returns = np.log(prices[1:] / prices[:-1])
+        returns.setflags(write=False)
+        for old_key in [k for k in _history_cache if k[0] == filename]:
+            del _history_cache[old_key]
+        _history_cache[key] = returns
+    return _history_cache[key]
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_jumps(jumps):
+    """Parses jumps string once, see jump_schedule()"""
+    return _compile_jumps(ast.literal_eval(jumps))
+
+
+def _compile_jumps(jumps):
+    """Converts jump dicts to (dte, dist, mean, sd, delta, skew_a) tuples with un-annualized sd"""
+    compiled = []
+    for j in jumps:
+        if j['dist'] not in ['normal', 'uniform', 'double-bell', 'skewnorm']:
+            raise ValueError("""jump dist must be string in ['normal', 'uniform', 'double-bell', 'skewnorm']""")
+        compiled.append((int(j['dte']), j['dist'], float(j.get('mean', 0)), float(j['sd']) / math.sqrt(252),
+                         float(j.get('delta', 0)), float(j.get('skew_a', 0))))
+    return tuple(compiled)
+
+
+def jump_schedule(jumps, length):
+    """
+    Compiles jumps into a schedule of steps for paths of given length
+
+    Parameters
+    ----------
+    jumps : str or list
+        Jumps as given in kwargs['jumps'], list of dicts with keys (dte, dist, mean, sd, delta, skew_a)
+        Strings are parsed once and cached
+    length : int
+        Length of path, excluding start
+
+    Returns
+    -------
+    tuple
+        Tuple of Jump, with day as index of the step (column of log_returns()) the jump is applied to
+        Jumps with DTEs outside of the path are dropped
+    """
+    compiled = _parse_jumps(jumps) if isinstance(jumps, str) else _compile_jumps(jumps)
+    # -2 because step i = 48 (arr[49]) is day 50 (b/c range is zero-indexed)
+    return tuple(Jump(length - 2 - j[0], *j[1:]) for j in compiled if 0 <= length - 2 - j[0] < length)
+
+
+def seed_sequence(seed=None):
+    """
+    Parameters
+    ----------
+    seed : int, numpy.random.SeedSequence or None
+        Seed of a run, None for fresh entropy
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+        Root of the run's random streams
+    """
+    if isinstance(seed, str):  # may be a string from the input files
+        seed = int(seed)
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def child_seed(seed, i):
+    """
+    Parameters
+    ----------
+    seed : int, numpy.random.SeedSequence or None
+        Parent seed, see seed_sequence()
+    i : int
+        Index of child
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+        i-th independent child of seed, same as seed_sequence(seed).spawn(i + 1)[i] but without spawning the others,
+        so a child only depends on the parent and its index (not on which worker or in which order it is made)
+    """
+    seed = seed_sequence(seed)
+    return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (int(i),), pool_size=seed.pool_size)
+
+
+def chunk_rng(seed, c):
+    """
+    Returns
+    -------
+    numpy.random.Generator
+        Random stream of chunk c (see chunks()) of a run seeded with seed
+    """
+    return np.random.default_rng(child_seed(seed, c))
+
+
+def step_sample(last, dist, mean=0.0, sd=1.0, delta=0.0, skew_a=0.0, rng=None):
     """Only for normal/uniform/double-bell, used for steps and jumps"""
+    rng = np.random.default_rng(rng)
     if dist == 'normal':
-        return last * math.exp(np.random.normal(loc=mean, scale=sd) - .5 * sd ** 2)
+        return last * math.exp(rng.normal(loc=mean, scale=sd) - .5 * sd ** 2)
     elif dist == 'uniform':
-        return last * math.exp(np.random.uniform(-sd * math.sqrt(3), sd * math.sqrt(3)) + mean - .5 * sd ** 2)
+        return last * math.exp(rng.uniform(-sd * math.sqrt(3), sd * math.sqrt(3)) + mean - .5 * sd ** 2)
     elif dist == 'skewnorm':
-        return last * math.exp(scipy.stats.skewnorm.rvs(skew_a, mean, sd) + mean - .5 * sd ** 2)
+        return last * math.exp(scipy.stats.skewnorm.rvs(skew_a, mean, sd, random_state=rng) + mean - .5 * sd ** 2)
     elif dist == 'double-bell':
         sub_vol = math.sqrt((sd ** 2) / 2)
-        return last * math.exp(np.random.normal(loc=-delta + mean, scale=sub_vol) + np.random.normal(loc=delta + mean, scale=sub_vol) - .5 * sd ** 2)
+        return last * math.exp(rng.normal(loc=-delta + mean, scale=sub_vol) + rng.normal(loc=delta + mean, scale=sub_vol) - .5 * sd ** 2)
+
+
+def step_log_returns(size, dist, mean=0.0, sd=1.0, delta=0.0, skew_a=0.0, rng=None):
+    """
+    Vectorized step_sample, returns log-returns (log(next / last)) instead of the next price
+
+    Parameters
+    ----------
+    size : int or tuple
+        Shape of returned array
+    dist : str
+        Distribution in ['normal', 'uniform', 'double-bell', 'skewnorm']
+    rng : numpy.random.Generator, int or None
+        Random stream to draw from, or seed of a new one (optional, default is fresh entropy)
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of log-returns with same distribution as step_sample
+    """
+    rng = np.random.default_rng(rng)
+    if dist == 'normal':
+        out = rng.normal(loc=mean, scale=sd, size=size)
+        out -= .5 * sd ** 2
+    elif dist == 'uniform':
+        out = rng.uniform(-sd * math.sqrt(3), sd * math.sqrt(3), size=size)
+        out += mean - .5 * sd ** 2
+    elif dist == 'skewnorm':
+        out = scipy.stats.skewnorm.rvs(skew_a, mean, sd, size=size, random_state=rng)
+        out += mean - .5 * sd ** 2
+    elif dist == 'double-bell':
+        sub_vol = math.sqrt((sd ** 2) / 2)
+        out = rng.normal(loc=-delta + mean, scale=sub_vol, size=size)
+        out += rng.normal(loc=delta + mean, scale=sub_vol, size=size)
+        out -= .5 * sd ** 2
+    else:
+        raise ValueError("""dist must be string in ['normal', 'uniform', 'double-bell', 'skewnorm']""")
+    return out
+
+
+def innovations(length, times, dist, rng=None, **kwargs):
+    """
+    Vol-free part of log_returns(), which is scale * innovations + drift (+ jumps), see scale_and_drift()
+    Location-scale dists are drawn with a daily sd of 1, so one set of innovations can be reused for any vol
+
+    Returns
+    -------
+    numpy.ndarray
+        times x length array of innovations, sampled historical log-returns for 'bootstrap', of dtype precision()
+        times x length x 2 for 'heston' (price and variance shocks of each step)
+    """
+    if sampler(**kwargs) == 'sobol':
+        return sobol_innovations(length, times, dist, rng, **kwargs)
+    if dist not in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm', 'garch', 'heston']:
+        raise ValueError("""dist must be string in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm', """
+                         """'garch', 'heston']""")
+    antithetic = is_antithetic(dist, **kwargs)
+    dtype = precision(**kwargs)
+    single = dtype == np.float32  # drawn in single precision where the Generator can
+    rng = np.random.default_rng(rng)
+    size = ((times + 1) // 2 if antithetic else times, length)
+    if dist == 'bootstrap':
+        if 'bs_data' not in kwargs:
+            raise ValueError("""call with bootstrap must include key 'bs_data' in kwargs""")
+        history = historical_log_returns(kwargs['bs_data']).astype(dtype, copy=False)
+        out = history[rng.integers(0, history.size, size=size)]
+    elif dist in ['normal', 'garch']:
+        out = rng.standard_normal(size=size, dtype=dtype)
+    elif dist == 'heston':
+        out = rng.standard_normal(size=size + (2,), dtype=dtype)  # price and variance shocks
+    elif dist == 'uniform':
+        if single:
+            out = rng.random(size=size, dtype=dtype)
+            out *= 2 * math.sqrt(3)
+            out -= math.sqrt(3)
+        else:
+            out = rng.uniform(-math.sqrt(3), math.sqrt(3), size=size)
+    elif dist == 'skewnorm':
+        if 'skew_a' not in kwargs:
+            raise ValueError("""call with skewnorm distribution must include key 'skew_a' in kwargs""")
+        out = scipy.stats.skewnorm.rvs(float(kwargs['skew_a']), size=size, random_state=rng).astype(dtype, copy=False)
+    else:
+        if 'delta' not in kwargs:
+            raise ValueError("""call with double-bell distribution must include key 'delta' in kwargs""")
+        delta = float(kwargs['delta'])
+        if single:
+            out = rng.standard_normal(size=size, dtype=dtype)
+            out *= math.sqrt(.5)
+            out -= delta
+            bell = rng.standard_normal(size=size, dtype=dtype)
+            bell *= math.sqrt(.5)
+            out += bell
+            out += delta
+        else:
+            out = rng.normal(loc=-delta, scale=math.sqrt(.5), size=size)
+            out += rng.normal(loc=delta, scale=math.sqrt(.5), size=size)
+    if antithetic:
+        return np.concatenate([out, -out[:times - size[0]]])
+    return out
+
+
+def is_antithetic(dist, **kwargs):
+    """
+    Parameters
+    ----------
+    dist : str
+        Type of distribution, see path()
+    **kwargs
+        kwargs['antithetic'] (bool or string from the input files) turns on antithetic pairs
+
+    Returns
+    -------
+    bool
+        True if paths are drawn as antithetic pairs: path i + ceil(times / 2) has the negated innovations
+        (and symmetric jumps mirrored about their center) of path i
+    """
+    antithetic = flag(kwargs.get('antithetic', False))
+    if antithetic and dist not in ['normal', 'uniform', 'double-bell']:
+        raise ValueError("""antithetic requires dist in ['normal', 'uniform', 'double-bell'] (symmetric innovations)""")
+    return antithetic
+
+
+def flag(value):
+    """bool of value, which may be a string from the input files"""
+    if isinstance(value, str):
+        return value.strip().lower() in ['true', '1', 'yes']
+    return bool(value)
+
+
+def control_count(dist, **kwargs):
+    """
+    Returns
+    -------
+    int
+        Number of control variates per payoff, 0 unless kwargs['control_variates'] is True
+        Controls are the last step (known forward, see forward()) and the payoff of the lognormal twin path
+        (known Black-Scholes price, see control_variates()), 'bootstrap', 'garch' and 'heston' only use the last step
+    """
+    if not flag(kwargs.get('control_variates', False)):
+        return 0
+    return 1 if dist in ['bootstrap', 'garch', 'heston'] else 2
+
+
+def control_variates(ends, twin_scores, strikes, length, vol, start, expected_end):
+    """
+    Parameters
+    ----------
+    ends : numpy.ndarray
+        Last step of each path
+    twin_scores : numpy.ndarray or None
+        Standard normal score of each path's lognormal twin (sum of normal_scores() / sqrt(length)),
+        None for only the last step control
+    strikes : array-like
+        Strike prices of options
+    length, vol, start
+        See path()
+    expected_end : float
+        Exact expected last step, see forward()
+
+    Returns
+    -------
+    numpy.ndarray
+        len(ends) x len(strikes) x 2 x (1 or 2) array of control variates of each call and put payoff, less their
+        known means: last step - forward, and twin payoff - Black-Scholes price of the twin
+    """
+    strikes = np.atleast_1d(np.asarray(strikes, dtype=float))
+    out = np.empty((ends.size, strikes.size, 2, 1 if twin_scores is None else 2))
+    out[..., 0] = (ends - expected_end)[:, np.newaxis, np.newaxis]
+    if twin_scores is not None:
+        vol_t = vol * math.sqrt(length / bs.TDAYS_IN_YEAR)
+        twins = start * np.exp(vol_t * twin_scores - .5 * vol_t ** 2)
+        np.maximum(twins[:, np.newaxis] - strikes, 0, out=out[:, :, 0, 1])
+        np.maximum(strikes - twins[:, np.newaxis], 0, out=out[:, :, 1, 1])
+        out[..., 1] -= bs.bs_option_price_array([['c', 'p']], start, strikes[:, np.newaxis], vol, 0, length)
+    return out
+
+
+def sv_params(dist, vol, **kwargs):
+    """
+    Parameters of the stochastic-vol dists, from kwargs (numbers or strings from the input files)
+
+    Parameters
+    ----------
+    dist : str
+        'garch' or 'heston'
+    vol : float
+        Long-run volatility, annualized
+
+    Returns
+    -------
+    dict
+        'vol0' : initial vol of each path, annualized (kwargs['vol0'], defaults to vol)
+        'garch' : 'alpha' and 'beta' of the GARCH(1,1) variance recursion (defaults .1 and .85), its constant is set
+                  so the long-run variance is vol ** 2
+        'heston' : 'kappa' (speed of mean reversion of the variance to vol ** 2 per year, default 2), 'xi'
+                   (vol of the variance, default .5) and 'rho' (correlation of variance and price shocks, default -.7)
+    """
+    out = {'vol0': float(kwargs.get('vol0', vol))}
+    if out['vol0'] <= 0:
+        raise ValueError('vol0 must be > 0!')
+    if dist == 'garch':
+        out['alpha'], out['beta'] = float(kwargs.get('alpha', .1)), float(kwargs.get('beta', .85))
+        if out['alpha'] < 0 or out['beta'] < 0 or out['alpha'] + out['beta'] >= 1:
+            raise ValueError('garch must have alpha >= 0, beta >= 0 and alpha + beta < 1!')
+    else:
+        out['kappa'], out['xi'] = float(kwargs.get('kappa', 2)), float(kwargs.get('xi', .5))
+        out['rho'] = float(kwargs.get('rho', -.7))
+        if out['kappa'] <= 0 or out['xi'] < 0 or abs(out['rho']) > 1:
+            raise ValueError('heston must have kappa > 0, xi >= 0 and -1 <= rho <= 1!')
+    return out
+
+
+def sv_log_returns(z, vol, dist, **kwargs):
+    """
+    Daily log-returns of the stochastic-vol dists from innovations(), one vectorized step of every path at a time
+    (Python work grows with length, not times)
+    'garch' : variance h follows h' = omega + alpha * e ** 2 + beta * h, where e = sqrt(h) * z is the shock
+    'heston' : annualized variance v follows v' = v + kappa * (vol ** 2 - v) * dt + xi * sqrt(v * dt) * w, with w the
+    variance shock correlated rho to the price shock (v below 0 is set to 0 before each step)
+    Log-returns are shock - variance / 2 (daily), so prices are martingales, see sv_params() for parameters
+
+    Returns
+    -------
+    numpy.ndarray
+        times x length array of log-returns, of the dtype of z
+    """
+    params = sv_params(dist, vol, **kwargs)
+    times, length = z.shape[:2]
+    out = np.empty((times, length), dtype=z.dtype)
+    dt = 1 / 252
+    if dist == 'garch':
+        omega = vol ** 2 * dt * (1 - params['alpha'] - params['beta'])
+        h = np.full(times, params['vol0'] ** 2 * dt)
+        for i in range(length):
+            shock = np.sqrt(h) * z[:, i]
+            out[:, i] = shock - .5 * h
+            h = omega + params['alpha'] * shock ** 2 + params['beta'] * h
+        return out
+    v = np.full(times, params['vol0'] ** 2)
+    rho = params['rho']
+    for i in range(length):
+        np.maximum(v, 0, out=v)
+        sd = np.sqrt(v * dt)
+        out[:, i] = sd * z[:, i, 0] - .5 * v * dt
+        v += params['kappa'] * (vol ** 2 - v) * dt + params['xi'] * sd * (rho * z[:, i, 0]
+                                                                         + math.sqrt(1 - rho ** 2) * z[:, i, 1])
+    return out
+
+
+def scale_and_drift(vol, dist):
+    """
+    Parameters
+    ----------
+    vol : float
+        Volatility, annualized
+    dist : str
+        Type of distribution, see path()
+
+    Returns
+    -------
+    tuple
+        Scale and drift turning innovations() into daily log-returns for given vol
+        Scale is 1 for 'bootstrap', vol only changes the drift correction
+    """
+    vol_d = vol / math.sqrt(252)  # un-annualize
+    return (1.0 if dist == 'bootstrap' else vol_d), -.5 * vol_d ** 2
+
+
+def jump_log_returns(jumps, length, times, rng=None, antithetic=False):
+    """
+    Parameters
+    ----------
+    jumps : str or list
+        Jumps as given in kwargs['jumps'], see jump_schedule()
+    length : int
+        Length of path, excluding start
+    times : int
+        Number of paths
+    rng : numpy.random.Generator, int or None
+        Random stream to draw from, see step_log_returns()
+    antithetic : bool
+        If True, the second half of the paths gets the first half's jumps mirrored about their center
+        (skewnorm jumps are drawn independently), see is_antithetic()
+
+    Returns
+    -------
+    list
+        List of (day, log-returns) for each scheduled jump, log-returns has one entry per path
+    """
+    rng = np.random.default_rng(rng)
+    out = []
+    for j in jump_schedule(jumps, length):
+        if antithetic and j.dist != 'skewnorm':
+            half = step_log_returns((times + 1) // 2, j.dist, j.mean, j.sd, j.delta, j.skew_a, rng)
+            center = (2 * j.mean if j.dist == 'double-bell' else j.mean) - .5 * j.sd ** 2
+            out.append((j.day, np.concatenate([half, 2 * center - half[:times // 2]])))
+        else:
+            out.append((j.day, step_log_returns(times, j.dist, j.mean, j.sd, j.delta, j.skew_a, rng)))
+    return out
+
+
+def jump_forward(jumps, length):
+    """
+    Returns
+    -------
+    float
+        Expected growth factor exp(sum of jump log-returns) of paths of given length
+    """
+    out = 1.0
+    for j in jump_schedule(jumps, length):
+        if j.dist == 'normal':
+            out *= math.exp(j.mean)
+        elif j.dist == 'uniform':
+            out *= math.exp(j.mean - .5 * j.sd ** 2) * _uniform_mgf(j.sd)
+        elif j.dist == 'skewnorm':
+            out *= 2 * math.exp(2 * j.mean) * scipy.special.ndtr(j.skew_a / math.sqrt(1 + j.skew_a ** 2) * j.sd)
+        else:
+            out *= math.exp(2 * j.mean)
+    return out
+
+
+def _uniform_mgf(s):
+    """E[exp(s * u)] for u uniform with mean 0 and sd 1"""
+    a = s * math.sqrt(3)
+    return math.sinh(a) / a if a else 1.0
+
+
+def forward(length, vol, start, dist, **kwargs):
+    """
+    Exact expected last step of paths, see path() for parameters
+
+    Returns
+    -------
+    float
+        E[path[-1]], start x E[exp(log-return)] ** length x expected jump growth
+    """
+    scale, drift = scale_and_drift(vol, dist)
+    if dist in ['garch', 'heston']:  # martingales, see sv_log_returns()
+        step, drift = 1.0, 0.0
+    elif dist in ['normal', 'double-bell']:  # double-bell innovations are N(0, 1) as the +/- delta means cancel
+        step = math.exp(.5 * scale ** 2)
+    elif dist == 'uniform':
+        step = _uniform_mgf(scale)
+    elif dist == 'skewnorm':
+        a = float(kwargs['skew_a'])
+        step = 2 * math.exp(.5 * scale ** 2) * scipy.special.ndtr(a / math.sqrt(1 + a ** 2) * scale)
+    else:
+        step = float(np.mean(np.exp(historical_log_returns(kwargs['bs_data']))))
+    out = start * (step * math.exp(drift)) ** length
+    return out * jump_forward(kwargs['jumps'], length) if 'jumps' in kwargs else out
+
+
+def normal_scores(z, dist, **kwargs):
+    """
+    Maps innovations() to standard normal variables through their CDF, used for the lognormal twin paths of
+    control variates (see control_variates())
+
+    Returns
+    -------
+    numpy.ndarray
+        Standard normal array of same shape as z, or None for 'bootstrap' (no continuous CDF)
+    """
+    if dist in ['normal', 'double-bell']:
+        return z
+    elif dist == 'uniform':
+        return scipy.special.ndtri(z / (2 * math.sqrt(3)) + .5)
+    elif dist == 'skewnorm':
+        scores, quantiles = _skewnorm_quantiles(float(kwargs['skew_a']))
+        return np.interp(z, quantiles, scores)
+    return None
+
+
+def from_normal_scores(x, dist, **kwargs):
+    """
+    Inverse of normal_scores(), maps standard normal variables to innovations() through the inverse CDF of dist
+    'bootstrap' uses the quantiles of the historical log-returns
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of innovations of same shape as x
+    """
+    if dist in ['normal', 'double-bell']:
+        return x
+    elif dist == 'uniform':
+        return math.sqrt(3) * (2 * scipy.special.ndtr(x) - 1)
+    elif dist == 'skewnorm':
+        scores, quantiles = _skewnorm_quantiles(float(kwargs['skew_a']))
+        return np.interp(x, scores, quantiles)
+    history = np.sort(historical_log_returns(kwargs['bs_data']))
+    return history[np.minimum((scipy.special.ndtr(x) * history.size).astype(int), history.size - 1)]
+
+
+@functools.lru_cache(maxsize=16)
+def _skewnorm_quantiles(skew_a):
+    """
+    Standard normal scores on a fine grid and the skewnorm quantiles at the same probabilities, for mapping
+    between the two by interpolation (scipy.stats.skewnorm.ppf/cdf are too slow for every step of every path)
+    """
+    scores = np.linspace(-8.5, 8.5, 4001)
+    quantiles = scipy.stats.skewnorm.ppf(scipy.special.ndtr(scores), skew_a)
+    scores.setflags(write=False)
+    quantiles.setflags(write=False)
+    return scores, quantiles
+
+
+def sampler(**kwargs):
+    """
+    Returns
+    -------
+    str
+        kwargs['sampler'] in ['random', 'sobol'], defaults to 'random'
+        'sobol' draws innovations from scrambled Sobol points, see sobol_innovations()
+    """
+    out = kwargs.get('sampler', 'random')
+    if out not in ['random', 'sobol']:
+        raise ValueError("""sampler must be string in ['random', 'sobol']""")
+    return out
+
+
+def precision(**kwargs):
+    """
+    Returns
+    -------
+    numpy.dtype
+        kwargs['dtype'] in ['float64', 'float32'] (or the numpy type), defaults to float64
+        float32 draws innovations and holds paths in single precision, halving their memory, while sums over paths
+        and steps (log-prices, RV, payoff statistics) still accumulate in float64
+    """
+    try:
+        out = np.dtype(kwargs.get('dtype', 'float64'))
+    except TypeError:
+        out = None
+    if out not in [np.float64, np.float32]:
+        raise ValueError("""dtype must be string in ['float64', 'float32']""")
+    return out
+
+
+def engine(dist, **kwargs):
+    """
+    Parameters
+    ----------
+    dist : str
+        Type of distribution, see path()
+    **kwargs
+        kwargs['engine'] in ['numpy', 'numba'], defaults to 'numpy'
+
+    Returns
+    -------
+    str
+        Engine stepping the paths: 'numba' runs the compiled path_kernels.path_kernel() (one fused loop per path,
+        releases the GIL so chunks run in parallel on the thread executor), 'numpy' the vectorized steps
+        'numba' falls back to 'numpy' when Numba is not installed, and with 'garch', 'heston', antithetic, control
+        variates or sampler 'sobol', which the kernel does not draw
+    """
+    out = kwargs.get('engine', 'numpy')
+    if out not in ['numpy', 'numba']:
+        raise ValueError("""engine must be string in ['numpy', 'numba']""")
+    if out == 'numba' and not path_kernels.AVAILABLE:
+        warnings.warn('numba is not installed, using engine numpy')
+        return 'numpy'
+    if out == 'numba' and (dist not in path_kernels.DIST_CODES or sampler(**kwargs) == 'sobol'
+                           or is_antithetic(dist, **kwargs) or control_count(dist, **kwargs)):
+        return 'numpy'
+    return out
+
+
+@functools.lru_cache(maxsize=16)
+def _bridge_schedule(length):
+    """(step, left, right, left weight, right weight, sd) of each Brownian bridge point after the last, coarse to fine"""
+    schedule = []
+    intervals = collections.deque([(0, length)])
+    while intervals:
+        left, right = intervals.popleft()
+        if right - left > 1:
+            mid = (left + right) // 2
+            schedule.append((mid, left, right, (right - mid) / (right - left), (mid - left) / (right - left),
+                             math.sqrt((mid - left) * (right - mid) / (right - left))))
+            intervals.extend([(left, mid), (mid, right)])
+    return tuple(schedule)
+
+
+def brownian_bridge(x):
+    """
+    Parameters
+    ----------
+    x : numpy.ndarray
+        times x length array of independent standard normals, most important (lowest quasi-random dimension) first
+
+    Returns
+    -------
+    numpy.ndarray
+        times x length array of independent standard normal increments of a Brownian path, whose end is set by
+        column 0 of x, then its midpoint by column 1 and so on coarse to fine
+    """
+    times, length = x.shape
+    w = np.empty((times, length + 1))
+    w[:, 0] = 0
+    w[:, length] = math.sqrt(length) * x[:, 0]
+    for k, (mid, left, right, left_weight, right_weight, sd) in enumerate(_bridge_schedule(length), 1):
+        w[:, mid] = left_weight * w[:, left] + right_weight * w[:, right] + sd * x[:, k]
+    return np.diff(w, axis=1)
+
+
+def sobol_innovations(length, times, dist, rng=None, first=0, **kwargs):
+    """
+    innovations() from scrambled Sobol points (quasi-Monte Carlo), with one dimension per step in Brownian bridge
+    order (see brownian_bridge()), so the last step of each path gets the first and best dimension
+    Bridge increments are mapped to dist through its inverse CDF (see from_normal_scores())
+    Use powers of 2 for times, so the points keep their balance
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator, int or None
+        Random stream to scramble the points with, see step_log_returns()
+    first : int
+        Index of the first point, chunks of one run use consecutive points of the same scrambled sequence
+
+    Returns
+    -------
+    numpy.ndarray
+        times x length array of innovations
+    """
+    if dist in ['garch', 'heston']:
+        raise ValueError('sampler sobol is not supported with garch and heston')
+    if dist not in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm']:
+        raise ValueError("""dist must be string in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm']""")
+    for key, name in [('bs_data', 'bootstrap'), ('skew_a', 'skewnorm')]:
+        if dist == name and key not in kwargs:
+            raise ValueError("""call with """ + name + """ must include key '""" + key + """' in kwargs""")
+    if is_antithetic(dist, **kwargs):
+        raise ValueError('antithetic is not supported with sampler sobol')
+    # seeded with an int drawn from rng, as scipy spawns from (and so changes) a Generator's SeedSequence
+    points = scipy.stats.qmc.Sobol(length, scramble=True, seed=int(np.random.default_rng(rng).integers(2 ** 63)))
+    if first:
+        points.fast_forward(int(first))
+    with warnings.catch_warnings():  # chunks are not powers of 2, the whole run should be
+        warnings.simplefilter('ignore', UserWarning)
+        u = points.random(times)
+    x = scipy.special.ndtri(np.clip(u, 1e-300, 1 - 2 ** -53))
+    return from_normal_scores(brownian_bridge(x), dist, **kwargs).astype(precision(**kwargs), copy=False)
+
+
+def _chunk_innovations(length, size, dist, seed, c, rng, **kwargs):
+    """innovations() of chunk c of a run, see strike_path_stats()"""
+    if sampler(**kwargs) == 'sobol':
+        return sobol_innovations(length, size, dist, np.random.default_rng(seed), c * CHUNK_SIZE, **kwargs)
+    return innovations(length, size, dist, rng, **kwargs)
+
+
+def log_returns(length, vol, times, dist, rng=None, **kwargs):
+    """
+    Daily log-returns of a block of paths, see path() for parameters
+    Innovations are drawn before jumps, so the same rng gives the same innovations with or without jumps
+
+    Returns
+    -------
+    numpy.ndarray
+        times x length array, row i is the log-returns of path i
+    """
+    rng = np.random.default_rng(rng)
+    return returns_from_innovations(innovations(length, times, dist, rng, **kwargs), vol, dist, rng, **kwargs)
+
+
+def returns_from_innovations(z, vol, dist, rng=None, **kwargs):
+    """
+    Turns innovations() into log-returns in place (scale, drift and jumps drawn from rng), see log_returns()
+    'garch' and 'heston' step their variance through time instead, see sv_log_returns()
+
+    Returns
+    -------
+    numpy.ndarray
+        z, or new times x length array of log-returns for 'garch' and 'heston'
+    """
+    if dist in ['garch', 'heston']:
+        z = sv_log_returns(z, vol, dist, **kwargs)
+    else:
+        scale, drift = scale_and_drift(vol, dist)
+        z *= scale
+        z += drift
+    times, length = z.shape
+    if 'jumps' in kwargs:
+        for day, jump in jump_log_returns(kwargs['jumps'], length, times, rng, is_antithetic(dist, **kwargs)):
+            z[:, day] += jump
+    return z
+
 
+def kernel_block(length, vol, start, times, dist, rng=None, store_paths=False, **kwargs):
+    """
+    Steps a block of paths with path_kernels.path_kernel(), see path() for parameters
+    Draws differ from the 'numpy' engine (one path at a time), but are reproducible for the same rng
 
-def single_path(length, vol, start, dist, **kwargs):
+    Parameters
+    ----------
+    store_paths : bool
+        If True, also returns every step of the paths (optional, default is False)
+
+    Returns
+    -------
+    tuple
+        Arrays of last step and RV of each path, and times x (length + 1) array of paths (None unless store_paths)
+    """
+    if dist not in path_kernels.DIST_CODES:
+        raise ValueError("""dist must be string in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm']""")
+    for key, name in [('bs_data', 'bootstrap'), ('skew_a', 'skewnorm'), ('delta', 'double-bell')]:
+        if dist == name and key not in kwargs:
+            raise ValueError("""call with """ + name + """ must include key '""" + key + """' in kwargs""")
+    rng = np.random.default_rng(rng)
+    scale, drift = scale_and_drift(vol, dist)
+    history = historical_log_returns(kwargs['bs_data']) if dist == 'bootstrap' else np.zeros(1)
+    schedule = sorted(jump_schedule(kwargs['jumps'], length), key=lambda j: j.day) if 'jumps' in kwargs else []
+    jump_first = np.searchsorted([j.day for j in schedule], np.arange(length + 1)).astype(np.int64)
+    jump_codes = np.array([path_kernels.DIST_CODES[j.dist] for j in schedule], dtype=np.int64)
+    jump_params = np.array([[j.mean, j.sd, j.delta, j.skew_a] for j in schedule], dtype=float).reshape(-1, 4)
+    ends, rvs = np.empty(times), np.empty(times)
+    paths = np.empty((times, length + 1) if store_paths else (0, 0), dtype=precision(**kwargs))
+    path_kernels.path_kernel(rng, int(times), int(length), path_kernels.DIST_CODES[dist], scale, drift,
+                             float(kwargs.get('delta', 0)), float(kwargs.get('skew_a', 0)), history, jump_first,
+                             jump_codes, jump_params, float(start), ends, rvs, paths)
+    return ends, rvs, paths if store_paths else None
+
+
+def running_sums(returns, out):
+    """
+    Running sums of returns along the steps (axis 1) into out, accumulated in float64 and cast once when stored
+    SUM_ROWS paths at a time, so float32 paths never need a float64 copy of the whole array
+
+    Returns
+    -------
+    numpy.ndarray
+        out
+    """
+    for first in range(0, returns.shape[0], SUM_ROWS):
+        out[first:first + SUM_ROWS] = np.cumsum(returns[first:first + SUM_ROWS], axis=1, dtype=np.float64)
+    return out
+
+
+def path_block(length, vol, start, times, dist, rng=None, **kwargs):
+    """
+    All paths at once, see path() for parameters
+
+    Returns
+    -------
+    numpy.ndarray
+        times x (length + 1) array of paths (including start)
+    """
+    if times <= 0 or times % 1 != 0:
+        raise ValueError('times must be integer > 0!')
+    if engine(dist, **kwargs) == 'numba':
+        return kernel_block(length, vol, start, times, dist, rng, True, **kwargs)[2]
+    arr = np.empty((times, length + 1), dtype=precision(**kwargs))
+    arr[:, 0] = 0
+    running_sums(log_returns(length, vol, times, dist, rng, **kwargs), arr[:, 1:])
+    np.exp(arr, out=arr)
+    arr *= start
+    return arr
+
+
+def single_path(length, vol, start, dist, rng=None, **kwargs):
     """Use path() instead"""
+    if dist in ['garch', 'heston']:  # variance depends on earlier steps, stepped by sv_log_returns()
+        return path_block(length, vol, start, 1, dist, rng, **kwargs)[0]
     if dist not in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm']:
         raise ValueError("""dist must be string in ['normal', 'uniform', 'bootstrap', 'double-bell']""")
-    if 'jumps' in kwargs:
-        jumps = ast.literal_eval(kwargs['jumps'])
-        jump_dtes = [j['dte'] for j in jumps]
-    else:
-        jump_dtes = []
+    jumps = {j.day: j for j in jump_schedule(kwargs['jumps'], length)} if 'jumps' in kwargs else {}
+    rng = np.random.default_rng(rng)
     vol_d = vol / math.sqrt(252)  # un-annualize
     arr = np.empty(length + 1)
     arr[0] = start
     if dist == 'bootstrap':
         if 'bs_data' not in kwargs:
             raise ValueError("""call with bootstrap must include key 'bs_data' in kwargs""")
-        kw = pd.read_csv(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir)), kwargs['bs_data']), index_col=0).iloc[:, 0]
-        pairs = zip(kw[:-1], kw[1:])
-        log_returns = [math.log(pair[1] / pair[0]) for pair in pairs]
+        history = historical_log_returns(kwargs['bs_data'])
         for i in range(length):
-            arr[i + 1] = arr[i] * math.exp(np.random.choice(log_returns) - .5 * vol_d ** 2)
-            if length - 2 - i in jump_dtes:  # -2 because i + 1 = 49 is day 50 (b/c range is zero-indexed)
-                d = [j for j in jumps if j['dte'] == length - 2 - i][0]
-                arr[i + 1] = step_sample(arr[i + 1], d['dist'], d['mean'], d['sd'] / math.sqrt(252), d['delta'])
+            arr[i + 1] = arr[i] * math.exp(rng.choice(history) - .5 * vol_d ** 2)
+            if i in jumps:
+                d = jumps[i]
+                arr[i + 1] = step_sample(arr[i + 1], d.dist, d.mean, d.sd, d.delta, d.skew_a, rng)
         return arr
     else:
         delta = 0
@@ -65,14 +848,14 @@ def single_path(length, vol, start, dist, **kwargs):
                 raise ValueError("""call with skewnorm distribution must include key 'skew_a' in kwargs""")
             skew_a = float(kwargs['skew_a'])
         for i in range(length):
-            arr[i + 1] = step_sample(arr[i], dist, sd=vol_d, delta=delta, skew_a=skew_a)
-            if length - 2 - i in jump_dtes:
-                d = [j for j in jumps if j['dte'] == length - 2 - i][0]
-                arr[i + 1] = step_sample(arr[i + 1], d['dist'], d['mean'], d['sd'] / math.sqrt(252), d['delta'], d['skew_a'])
+            arr[i + 1] = step_sample(arr[i], dist, sd=vol_d, delta=delta, skew_a=skew_a, rng=rng)
+            if i in jumps:
+                d = jumps[i]
+                arr[i + 1] = step_sample(arr[i + 1], d.dist, d.mean, d.sd, d.delta, d.skew_a, rng)
         return arr
 
 
-def path(length, vol, start, times, dist, **kwargs):
+def path(length, vol, start, times, dist, rng=None, **kwargs):
     """
 
     Parameters
@@ -86,16 +869,27 @@ def path(length, vol, start, times, dist, **kwargs):
     times : int
         Number of paths to create
     dist : str
-        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm'], defaults to 'normal'
+        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm', 'garch', 'heston'],
+        defaults to 'normal'
         'bootstrap' indicates randomly sampling with replacement from historical log-returns (kwargs['bs_data'])
         'double-bell' indicates distribution from adding two bell curves with means +/- kwargs['delta'] and std devs sqrt((vol ** 2) / 2)
         'double-bell' std dev derived from var(x + y) = var(x) + var(y) for independent random variables
+        'garch' and 'heston' are normal steps with GARCH(1,1) or mean-reverting (Heston) variance, with long-run vol
+        vol, see sv_log_returns()
+    rng : numpy.random.Generator, int or None
+        Random stream to draw from, or seed of a new one (optional, default is fresh entropy)
     **kwargs
         Keyword arguments, includes:
         'delta' : mean used for normal curves underpinning double bell distribution
         'bs_data' : filename in montecarlo folder of historical data used for bootstrap as csv
-        'jumps' : random dist-based "jumps" at different DTEs, represented by dict with keys (dte, dist, mean, sd, delta)
+        'jumps' : random dist-based "jumps" at different DTEs, represented by dict with keys (dte, dist, mean, sd, delta),
+                  see jump_schedule()
         'skew_a' : skewness parameter for skewnorm dist
+        'antithetic' : draw paths in antithetic pairs, see is_antithetic()
+        'sampler' : 'random' (default) or 'sobol' for quasi-Monte Carlo, see sobol_innovations()
+        'engine' : 'numpy' (default) or 'numba' for compiled path kernels, see engine()
+        'dtype' : 'float64' (default) or 'float32' for single precision paths, see precision()
+        'vol0', 'alpha', 'beta', 'kappa', 'xi', 'rho' : parameters of 'garch' and 'heston', see sv_params()
 
     Returns
     -------
@@ -103,12 +897,89 @@ def path(length, vol, start, times, dist, **kwargs):
         Array of each step of path (including start), or array of such arrays
 
     """
+    if times == 1:
+        return path_block(length, vol, start, 1, dist, rng, **kwargs)[0]
+    else:
+        return path_block(length, vol, start, times, dist, rng, **kwargs)
+
+
+def aggregate_innovations(steps, times, dist, rng=None, **kwargs):
+    """
+    Sums of innovations() over consecutive runs of steps, without holding every step
+    Exact in one draw per sum for 'normal' and 'double-bell' (sums of k N(0, 1) innovations are N(0, k)),
+    other dists are drawn and summed BLOCK_STEPS steps at a time
+
+    Parameters
+    ----------
+    steps : array-like
+        Number of steps in each run
+    times : int
+        Number of paths
+    dist : str
+        Type of distribution, see path()
+
+    Returns
+    -------
+    numpy.ndarray
+        times x len(steps) array, column j is the sum of steps[j] innovations of each path, of dtype precision()
+    """
+    rng = np.random.default_rng(rng)
+    steps = np.asarray(steps, dtype=int)
+    if dist == 'double-bell' and 'delta' not in kwargs:
+        raise ValueError("""call with double-bell distribution must include key 'delta' in kwargs""")
+    if dist in ['normal', 'double-bell']:
+        out = rng.standard_normal(size=(times, steps.size), dtype=precision(**kwargs))
+        out *= np.sqrt(steps)
+        return out
+    out = np.zeros((times, steps.size), dtype=precision(**kwargs))
+    for j, k in enumerate(steps):
+        for first in range(0, k, BLOCK_STEPS):
+            out[:, j] += innovations(min(BLOCK_STEPS, k - first), times, dist, rng, **kwargs).sum(axis=1)
+    return out
+
+
+def observations(length, vol, start, times, dist, days=None, rng=None, **kwargs):
+    """
+    Prices of paths on a schedule of observation days only, without building the days in between, so memory and
+    (for 'normal' and 'double-bell') time are O(times x len(days)) instead of O(times x length)
+    Log-returns between observations are drawn in aggregate (see aggregate_innovations()) and jumps are added to
+    the run they fall in, so prices have the same distribution as path() (not the same draws)
+    'garch', 'heston', antithetic and sampler 'sobol' are not i.i.d. sums and read the days from path() instead
+
+    Parameters
+    ----------
+    days : array-like
+        Increasing steps in [0, length] to observe (0 is start), optional, default is [length] (last step only)
+    **kwargs
+        See path()
+
+    Returns
+    -------
+    numpy.ndarray
+        times x len(days) array, column j is the price of each path on days[j]
+    """
     if times <= 0 or times % 1 != 0:
         raise ValueError('times must be integer > 0!')
-    elif times == 1:
-        return single_path(length, vol, start, dist, **kwargs)
-    else:
-        return np.array([single_path(length, vol, start, dist, **kwargs) for _ in range(times)])
+    days = np.array([length] if days is None else days, dtype=int).ravel()
+    if days.size == 0 or days[0] < 0 or days[-1] > length or np.any(np.diff(days) <= 0):
+        raise ValueError('days must be increasing integers in [0, length]!')
+    if dist in ['garch', 'heston'] or is_antithetic(dist, **kwargs) or sampler(**kwargs) == 'sobol':
+        return path_block(length, vol, start, times, dist, rng, **kwargs)[:, days]
+    rng = np.random.default_rng(rng)
+    steps = np.diff(days, prepend=0)
+    returns = aggregate_innovations(steps, times, dist, rng, **kwargs)
+    scale, drift = scale_and_drift(vol, dist)
+    returns *= scale
+    returns += steps * drift
+    if 'jumps' in kwargs:
+        for day, jump in jump_log_returns(kwargs['jumps'], length, times, rng):
+            run = np.searchsorted(days, day, side='right')  # step day is in the run ending on the first later day
+            if run < days.size:
+                returns[:, run] += jump
+    running_sums(returns, returns)
+    np.exp(returns, out=returns)
+    returns *= start
+    return returns
 
 
 def ends(length, vol, start, times, dist, **kwargs):
@@ -117,10 +988,10 @@ def ends(length, vol, start, times, dist, **kwargs):
     Returns
     -------
     numpy.ndarray
-        Array of last step of each path
+        Array of last step of each path, drawn directly (see observations())
 
     """
-    return np.array([i[-1] for i in path(length, vol, start, times, dist, **kwargs)])
+    return observations(length, vol, start, times, dist, **kwargs)[:, -1]
 
 
 def call_price(length, vol, start, times, strike, dist, **kwargs):
@@ -137,7 +1008,7 @@ def call_price(length, vol, start, times, strike, dist, **kwargs):
         Call price of option
 
     """
-    return np.mean([x - strike if x - strike > 0 else 0 for x in ends(length, vol, start, times, dist, **kwargs)])
+    return np.mean(np.maximum(ends(length, vol, start, times, dist, **kwargs) - strike, 0))
 
 
 def put_price(length, vol, start, times, strike, dist, **kwargs):
@@ -149,7 +1020,7 @@ def put_price(length, vol, start, times, strike, dist, **kwargs):
         Put price of option
 
     """
-    return np.mean([strike - x if strike - x > 0 else 0 for x in ends(length, vol, start, times, dist, **kwargs)])
+    return np.mean(np.maximum(strike - ends(length, vol, start, times, dist, **kwargs), 0))
 
 
 def rv(paths):
@@ -166,13 +1037,14 @@ def rv(paths):
         RV of individual paths
 
     """
-    return np.array(
-        [math.sqrt(np.mean([np.log(path[i + 1] / path[i]) ** 2 for i in range(path.size - 1)]) * 252) for path in
-         paths])
+    paths = np.atleast_2d(np.asarray(paths, dtype=float))
+    returns = np.log(paths[:, 1:] / paths[:, :-1])
+    return np.sqrt(np.mean(returns ** 2, axis=1) * 252)
 
 
 def all_including_rv(length, vol, start, times, strike, dist, **kwargs):
     """
+    kwargs may include 'seed', see strike_path_stats()
 
     Returns
     -------
@@ -180,12 +1052,365 @@ def all_including_rv(length, vol, start, times, strike, dist, **kwargs):
         Call price, put price, avg RV, RV sd from one set of paths
 
     """
-    paths = path(length, vol, start, times, dist, **kwargs)
-    ends = np.array([i[-1] for i in paths])
-    rvs = rv(paths)
-    return np.array([
-        np.mean([x - strike if x - strike > 0 else 0 for x in ends]),
-        np.mean([strike - x if strike - x > 0 else 0 for x in ends]),
-        np.mean(rvs),
-        np.std(rvs)
-    ])
+    return strike_path_stats(length, vol, start, times, [strike], dist, **kwargs).result()[0]
+
+
+def all_including_rv_strikes(length, vol, start, times, strikes, dist, **kwargs):
+    """
+    all_including_rv() for many strikes priced from the same set of paths (common random numbers)
+
+    Parameters
+    ----------
+    strikes : array-like
+        Strike prices of options
+
+    Returns
+    -------
+    numpy.ndarray
+        len(strikes) x 4 array, row i is call price, put price, avg RV, RV sd for strikes[i]
+    """
+    return strike_path_stats(length, vol, start, times, strikes, dist, **kwargs).result()
+
+
+def strike_stats(paths, strikes):
+    """
+
+    Parameters
+    ----------
+    paths : numpy.ndarray
+        times x (length + 1) array of paths (use path() to generate)
+    strikes : array-like
+        Strike prices of options
+
+    Returns
+    -------
+    numpy.ndarray
+        len(strikes) x 4 array, row i is call price, put price, avg RV, RV sd for strikes[i]
+
+    """
+    paths = np.atleast_2d(paths)
+    return PathStats(strikes).update(paths[:, -1], rv(paths)).result()
+
+
+def chunks(times):
+    """
+    Parameters
+    ----------
+    times : int
+        Number of paths
+
+    Returns
+    -------
+    list
+        Sizes of chunks of at most CHUNK_SIZE paths adding up to times
+        Chunk c always holds the same paths (drawn from chunk_rng(seed, c)), so results only depend on the seed
+    """
+    if times <= 0 or times % 1 != 0:
+        raise ValueError('times must be integer > 0!')
+    times = int(times)
+    return [min(CHUNK_SIZE, times - c) for c in range(0, times, CHUNK_SIZE)]
+
+
+def _chunk_ids(times, chunk_ids, antithetic=False):
+    """Sizes of chunks of times selected by chunk_ids (all if None), as (index, size) pairs"""
+    if antithetic and times % 2:
+        raise ValueError('times must be even with antithetic!')
+    sizes = chunks(times)
+    return [(c, sizes[c]) for c in (range(len(sizes)) if chunk_ids is None else chunk_ids)]
+
+
+def strike_path_stats(length, vol, start, times, strikes, dist, seed=None, chunk_ids=None, **kwargs):
+    """
+    Streams paths in chunks of at most CHUNK_SIZE into running statistics, so memory is bounded by
+    CHUNK_SIZE x length regardless of times, see path() for other parameters
+
+    Parameters
+    ----------
+    strikes : array-like
+        Strike prices of options
+    seed : int, numpy.random.SeedSequence or None
+        Seed of the run, see seed_sequence() (optional, default is fresh entropy)
+    chunk_ids : iterable
+        Indices of the chunks of times to simulate, for splitting a run between workers (optional, default is all)
+        Merging the results of single chunks in order is bit-identical to simulating all of them at once
+    **kwargs
+        See path(), also 'antithetic' (see is_antithetic()) and 'control_variates' (see control_count())
+
+    Returns
+    -------
+    path_stats.PathStats
+        Payoff and RV statistics of all paths
+    """
+    seed = seed_sequence(seed)
+    controls, antithetic = control_count(dist, **kwargs), is_antithetic(dist, **kwargs)
+    expected_end = forward(length, vol, start, dist, **kwargs) if controls else None
+    stats = PathStats(strikes, controls, antithetic)
+    kernel = engine(dist, **kwargs) == 'numba'
+    for c, size in _chunk_ids(times, chunk_ids, antithetic):
+        if kernel:
+            with metrics.phase('paths'):  # draws, steps and RV in one loop
+                ends, rvs, _ = kernel_block(length, vol, start, size, dist, chunk_rng(seed, c), **kwargs)
+        else:
+            with metrics.phase('rng'):
+                rng = chunk_rng(seed, c)
+                returns = _chunk_innovations(length, size, dist, seed, c, rng, **kwargs)
+                scores = normal_scores(returns, dist, **kwargs) if controls == 2 else None
+                scores = scores.sum(axis=1) / math.sqrt(length) if scores is not None else None
+            with metrics.phase('paths'):
+                returns = returns_from_innovations(returns, vol, dist, rng, **kwargs)
+                ends = start * np.exp(returns.sum(axis=1, dtype=np.float64))
+            with metrics.phase('rv'):
+                np.square(returns, out=returns)
+                rvs = np.sqrt(returns.mean(axis=1, dtype=np.float64) * 252)
+        with metrics.phase('pricing'):
+            stats.update(ends, rvs,
+                         control_variates(ends, scores, strikes, length, vol, start, expected_end) if controls else None)
+        metrics.count('paths', size)
+        metrics.count('steps', size * length)
+    return stats
+
+
+def replicate_results(length, vol, start, times, strikes, dist, replicates=8, seed=None, **kwargs):
+    """
+    strike_path_stats() of independent replicates, for error estimates with sampler 'sobol' where paths of one run
+    are not independent (so PathStats.standard_errors() does not apply), see path() for other parameters
+
+    Parameters
+    ----------
+    times : int
+        Number of paths of each replicate
+    replicates : int
+        Number of replicates, replicate r is seeded with child r of seed (an independent scramble with 'sobol')
+
+    Returns
+    -------
+    tuple
+        len(strikes) x 4 array of results averaged over replicates (same format as all_including_rv_strikes()),
+        len(strikes) x 2 array of standard errors of the averaged call and put prices
+    """
+    replicates = int(replicates)
+    if replicates < 2:
+        raise ValueError('replicates must be integer > 1!')
+    seed = seed_sequence(seed)
+    results = np.array([strike_path_stats(length, vol, start, times, strikes, dist, child_seed(seed, r), **kwargs).result()
+                        for r in range(replicates)])
+    return results.mean(axis=0), results[:, :, :2].std(axis=0, ddof=1) / math.sqrt(replicates)
+
+
+def surface_path_stats(length, vols, start, times, strikes, dist, seed=None, chunk_ids=None, **kwargs):
+    """
+    strike_path_stats() for every vol from one set of innovations rescaled to each vol, without building the paths
+    ('garch' and 'heston' step the same innovations through each vol's variance path instead)
+    With the same seed, each vol gets the same paths as strike_path_stats() with engine 'numpy' (kwargs['engine'] is
+    not used, the compiled kernel does not keep innovations to rescale)
+
+    Parameters
+    ----------
+    vols : array-like
+        Volatilities, annualized
+    strikes : array-like
+        Strike prices of options
+
+    Returns
+    -------
+    list
+        path_stats.PathStats for each of vols
+    """
+    seed = seed_sequence(seed)
+    if control_count(dist, **kwargs):
+        raise ValueError('control_variates are only supported by strike_path_stats()')
+    antithetic = is_antithetic(dist, **kwargs)
+    stats = [PathStats(strikes, antithetic=antithetic) for _ in vols]
+    for c, size in _chunk_ids(times, chunk_ids, antithetic):
+        with metrics.phase('rng'):
+            rng = chunk_rng(seed, c)
+            z = _chunk_innovations(length, size, dist, seed, c, rng, **kwargs)
+            jumps = jump_log_returns(kwargs['jumps'], length, size, rng, antithetic) if 'jumps' in kwargs else []
+        metrics.count('paths', size)
+        metrics.count('steps', size * length)
+        if dist in ['garch', 'heston']:  # the variance path depends on vol, so each vol steps the innovations again
+            for vol, vol_stats in zip(vols, stats):
+                with metrics.phase('paths'):
+                    returns = sv_log_returns(z, vol, dist, **kwargs)
+                    for day, jump in jumps:
+                        returns[:, day] += jump
+                    ends = start * np.exp(returns.sum(axis=1, dtype=np.float64))
+                with metrics.phase('rv'):
+                    np.square(returns, out=returns)
+                    rvs = np.sqrt(returns.mean(axis=1, dtype=np.float64) * 252)
+                with metrics.phase('pricing'):
+                    vol_stats.update(ends, rvs)
+            continue
+        with metrics.phase('paths'):
+            days = sorted(set(day for day, _ in jumps))
+            jump_total = np.zeros((size, len(days)))
+            for day, jump in jumps:
+                jump_total[:, days.index(day)] += jump
+            # log-return sums and squared sums split into steps with and without jumps
+            z_jump = z[:, days].astype(np.float64)
+            z_sum = z.sum(axis=1, dtype=np.float64)
+            z_free_sum = z_sum - z_jump.sum(axis=1)
+            z_free_sq = np.einsum('ij,ij->i', z, z, dtype=np.float64) - np.einsum('ij,ij->i', z_jump, z_jump)
+            jump_sum = jump_total.sum(axis=1)
+            del z
+        for vol, vol_stats in zip(vols, stats):
+            with metrics.phase('paths'):
+                scale, drift = scale_and_drift(vol, dist)
+                ends = start * np.exp(scale * z_sum + length * drift + jump_sum)
+            with metrics.phase('rv'):
+                sq = (scale ** 2 * z_free_sq + 2 * scale * drift * z_free_sum + (length - len(days)) * drift ** 2
+                      + np.sum((scale * z_jump + drift + jump_total) ** 2, axis=1))
+                rvs = np.sqrt(sq / length * 252)
+            with metrics.phase('pricing'):
+                vol_stats.update(ends, rvs)
+    return stats
+
+
+def all_including_rv_surface(length, vols, start, times, strikes, dist, **kwargs):
+    """
+    all_including_rv_strikes() for each of vols, from one set of innovations (see surface_path_stats())
+
+    Returns
+    -------
+    numpy.ndarray
+        len(vols) x len(strikes) x 4 array of call price, put price, avg RV, RV sd
+    """
+    return np.array([s.result() for s in surface_path_stats(length, vols, start, times, strikes, dist, **kwargs)])
+
+
+def _sv_length_returns(z, lengths, vol, dist, rng=None, **kwargs):
+    """
+    Log-returns of 'garch' and 'heston' paths of each of lengths from the last steps of innovations z of the longest
+    length, each stepped from kwargs['vol0'] (the variance path depends on where it starts) with the longest paths'
+    jumps on their DTEs, see length_path_stats()
+
+    Yields
+    ------
+    numpy.ndarray
+        times x length array of log-returns for each of lengths
+    """
+    times, longest = z.shape[:2]
+    jumps = jump_log_returns(kwargs['jumps'], longest, times, rng) if 'jumps' in kwargs else []
+    for length in lengths:
+        first = longest - int(length)
+        returns = sv_log_returns(z[:, first:], vol, dist, **kwargs)
+        for day, jump in jumps:
+            if day >= first:
+                returns[:, day - first] += jump
+        yield returns
+
+
+def length_path_stats(lengths, vol, start, times, strike, dist, seed=None, chunk_ids=None, **kwargs):
+    """
+    strike_path_stats() for several lengths from one set of paths of the longest length
+    Each length uses the last steps of the longest paths, so jumps (placed by DTE) line up for every length
+    'garch' and 'heston' step the variance of each length from kwargs['vol0'] over its last innovations
+    With the same seed, the longest length gets the same paths as strike_path_stats() with engine 'numpy'
+    (kwargs['engine'] is not used)
+
+    Parameters
+    ----------
+    lengths : array-like
+        Lengths of paths (DTEs), excluding start
+
+    Returns
+    -------
+    list
+        path_stats.PathStats for each of lengths
+    """
+    lengths = np.asarray(lengths, dtype=int)
+    if np.any(lengths <= 0):
+        raise ValueError('lengths must be integers > 0!')
+    seed = seed_sequence(seed)
+    if control_count(dist, **kwargs):
+        raise ValueError('control_variates are only supported by strike_path_stats()')
+    antithetic = is_antithetic(dist, **kwargs)
+    stats = [PathStats([strike], antithetic=antithetic) for _ in lengths]
+    for c, size in _chunk_ids(times, chunk_ids, antithetic):
+        with metrics.phase('rng'):
+            rng = chunk_rng(seed, c)
+            returns = _chunk_innovations(int(lengths.max()), size, dist, seed, c, rng, **kwargs)
+        if dist in ['garch', 'heston']:
+            ends, rvs = np.empty((size, lengths.size)), np.empty((size, lengths.size))
+            with metrics.phase('paths'):
+                for i, length_returns in enumerate(_sv_length_returns(returns, lengths, vol, dist, rng, **kwargs)):
+                    ends[:, i] = start * np.exp(length_returns.sum(axis=1, dtype=np.float64))
+                    np.square(length_returns, out=length_returns)
+                    rvs[:, i] = np.sqrt(length_returns.mean(axis=1, dtype=np.float64) * 252)
+        else:
+            with metrics.phase('paths'):
+                returns = returns_from_innovations(returns, vol, dist, rng, **kwargs)[:, ::-1]
+                ends = start * np.exp(np.cumsum(returns, axis=1, dtype=np.float64)[:, lengths - 1])
+            with metrics.phase('rv'):
+                np.square(returns, out=returns)
+                rvs = np.sqrt(np.cumsum(returns, axis=1, dtype=np.float64)[:, lengths - 1] / lengths * 252)
+        with metrics.phase('pricing'):
+            for i, length_stats in enumerate(stats):
+                length_stats.update(ends[:, i], rvs[:, i])
+        metrics.count('paths', size)
+        metrics.count('steps', size * int(lengths.max()))
+    return stats
+
+
+def all_including_rv_lengths(lengths, vol, start, times, strike, dist, **kwargs):
+    """
+    all_including_rv() for several lengths from one set of paths of the longest length (see length_path_stats())
+
+    Parameters
+    ----------
+    lengths : array-like
+        Lengths of paths (DTEs), excluding start
+
+    Returns
+    -------
+    numpy.ndarray
+        len(lengths) x 4 array, row i is call price, put price, avg RV, RV sd for lengths[i]
+    """
+    return np.array([s.result()[0] for s in length_path_stats(lengths, vol, start, times, strike, dist, **kwargs)])
+
+
+def horizon_path_stats(lengths, vol, start, times, strike, dist, seed=None, chunk_ids=None, **kwargs):
+    """
+    Call and put statistics of length_path_stats() (each length is the last steps of paths of the longest length)
+    from observations() of the longest paths on only the days the lengths start, without RV (NaN), for pricing many
+    DTEs in O(times x len(lengths)) per chunk
+    Paths differ from length_path_stats(), which keeps every step to get RV ('garch' and 'heston' are not i.i.d.
+    sums, so their lengths are stepped from kwargs['vol0'] over every step as in length_path_stats())
+
+    Parameters
+    ----------
+    lengths : array-like
+        Lengths of paths (DTEs), excluding start
+
+    Returns
+    -------
+    list
+        path_stats.PathStats for each of lengths
+    """
+    lengths = np.asarray(lengths, dtype=int)
+    if np.any(lengths <= 0):
+        raise ValueError('lengths must be integers > 0!')
+    seed = seed_sequence(seed)
+    if control_count(dist, **kwargs):
+        raise ValueError('control_variates are only supported by strike_path_stats()')
+    antithetic = is_antithetic(dist, **kwargs)
+    stats = [PathStats([strike], antithetic=antithetic) for _ in lengths]
+    longest = int(lengths.max())
+    days = np.unique(np.append(longest - lengths, longest))
+    starts = np.searchsorted(days, longest - lengths)
+    for c, size in _chunk_ids(times, chunk_ids, antithetic):
+        with metrics.phase('paths'):
+            if dist in ['garch', 'heston']:
+                rng = chunk_rng(seed, c)
+                z = _chunk_innovations(longest, size, dist, seed, c, rng, **kwargs)
+                ends = start * np.exp(np.column_stack([returns.sum(axis=1, dtype=np.float64) for returns
+                                                       in _sv_length_returns(z, lengths, vol, dist, rng, **kwargs)]))
+            else:
+                prices = observations(longest, vol, 1.0, size, dist, days, chunk_rng(seed, c), **kwargs)
+                ends = start * prices[:, -1:] / prices[:, starts]
+        with metrics.phase('pricing'):
+            for i, length_stats in enumerate(stats):
+                length_stats.update(ends[:, i], np.full(size, np.nan))
+        metrics.count('paths', size)
+        metrics.count('steps', size * days.size)  # observed days
+    return stats
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+"""
+    File name: path_stats.py
+    Author: Jon Lu
+    Date created: 10/17/2026
+    Date last modified: 10/17/2026
+    Python Version: 3.6.1
+"""
+
+import copy
+import numpy as np
+
+
+class PathStats:
+    """
+    Running call/put payoff and RV statistics over chunks of paths, so paths can be dropped after each chunk
+    Means and squared deviation sums are combined with Welford/Chan updates, so memory does not depend on the number
+    of paths and chunks from different workers can be merged in any grouping
+    With variance reduction, prices are estimated from samples (antithetic pair averages) and control variates
+    whose means and co-moments are kept the same way
+
+    Attributes
+    ----------
+    strikes : numpy.ndarray
+        Strike prices of options
+    controls : int
+        Number of control variates per payoff
+    antithetic : bool
+        If True, the first and second half of each chunk are antithetic pairs and each pair is one sample
+    count : int
+        Number of paths added
+    payoff_mean : numpy.ndarray
+        len(strikes) x 2 array of mean call and put payoffs
+    payoff_m2 : numpy.ndarray
+        len(strikes) x 2 array of sums of squared deviations of call and put payoffs from their means
+    rv_mean : float
+        Mean RV of paths
+    rv_m2 : float
+        Sum of squared deviations of RV from its mean
+    samples : int
+        Number of samples added (pairs with antithetic, otherwise paths)
+    sample_mean : numpy.ndarray
+        len(strikes) x 2 x (1 + controls) array of mean payoff and controls of samples
+    sample_m2 : numpy.ndarray
+        len(strikes) x 2 x (1 + controls) x (1 + controls) array of co-moments of payoff and controls of samples
+    """
+
+    def __init__(self, strikes, controls=0, antithetic=False):
+        self.strikes = np.atleast_1d(np.asarray(strikes, dtype=float))
+        self.controls, self.antithetic = int(controls), bool(antithetic)
+        self.count = 0
+        self.payoff_mean = np.zeros((self.strikes.size, 2))
+        self.payoff_m2 = np.zeros((self.strikes.size, 2))
+        self.rv_mean = 0.0
+        self.rv_m2 = 0.0
+        self.samples = 0
+        self.sample_mean = np.zeros((self.strikes.size, 2, 1 + self.controls))
+        self.sample_m2 = np.zeros((self.strikes.size, 2, 1 + self.controls, 1 + self.controls))
+
+    @property
+    def reduced(self):
+        """True if prices use variance reduction"""
+        return self.antithetic or self.controls > 0
+
+    def update(self, ends, rvs, controls=None):
+        """
+        Adds a chunk of paths
+
+        Parameters
+        ----------
+        ends : numpy.ndarray
+            Last step of each path in chunk
+        rvs : numpy.ndarray
+            RV of each path in chunk
+        controls : numpy.ndarray
+            len(ends) x len(strikes) x 2 x self.controls array of control variates of each payoff, less their
+            known means (optional, only with controls)
+
+        Returns
+        -------
+        PathStats
+            self
+        """
+        ends = np.asarray(ends, dtype=float)
+        if not ends.size:
+            return self
+        payoffs = np.empty((ends.size, self.strikes.size, 2))
+        np.maximum(ends[:, np.newaxis] - self.strikes, 0, out=payoffs[:, :, 0])
+        np.maximum(self.strikes - ends[:, np.newaxis], 0, out=payoffs[:, :, 1])
+        chunk = PathStats(self.strikes, self.controls, self.antithetic)
+        chunk.count = ends.size
+        chunk.payoff_mean = payoffs.mean(axis=0)
+        if self.reduced:
+            values = payoffs[..., np.newaxis]
+            if self.controls:
+                values = np.concatenate([values, controls], axis=-1)
+            if self.antithetic:
+                if ends.size % 2:
+                    raise ValueError('antithetic chunks must have an even number of paths!')
+                values = (values[:ends.size // 2] + values[ends.size // 2:]) / 2
+            chunk.samples = values.shape[0]
+            chunk.sample_mean = values.mean(axis=0)
+            values = values - chunk.sample_mean
+            chunk.sample_m2 = np.einsum('pijk,pijl->ijkl', values, values)
+        payoffs -= chunk.payoff_mean
+        chunk.payoff_m2 = np.einsum('ijk,ijk->jk', payoffs, payoffs)
+        rvs = np.asarray(rvs, dtype=float)
+        chunk.rv_mean = float(np.mean(rvs))
+        chunk.rv_m2 = float(np.sum((rvs - chunk.rv_mean) ** 2))
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Adds the paths of another PathStats with the same strikes (Chan et al. parallel update)
+
+        Parameters
+        ----------
+        other : PathStats
+
+        Returns
+        -------
+        PathStats
+            self
+        """
+        if not other.count:
+            return self
+        total = self.count + other.count
+        weight = other.count / total
+        delta = other.payoff_mean - self.payoff_mean
+        self.payoff_mean = self.payoff_mean + delta * weight
+        self.payoff_m2 = self.payoff_m2 + other.payoff_m2 + delta ** 2 * self.count * weight
+        rv_delta = other.rv_mean - self.rv_mean
+        self.rv_mean += rv_delta * weight
+        self.rv_m2 += other.rv_m2 + rv_delta ** 2 * self.count * weight
+        self.count = total
+        if other.samples:
+            samples = self.samples + other.samples
+            weight = other.samples / samples
+            delta = other.sample_mean - self.sample_mean
+            self.sample_mean = self.sample_mean + delta * weight
+            self.sample_m2 = (self.sample_m2 + other.sample_m2
+                              + delta[..., :, np.newaxis] * delta[..., np.newaxis, :] * self.samples * weight)
+            self.samples = samples
+        return self
+
+    def _control_fit(self):
+        """
+        Returns
+        -------
+        tuple
+            len(strikes) x 2 arrays of control variate price estimates and residual variances of samples
+        """
+        sxx = self.sample_m2[..., 1:, 1:]
+        sxy = self.sample_m2[..., 1:, 0]
+        beta = np.einsum('...kl,...l->...k', np.linalg.pinv(sxx), sxy)  # pinv as controls are 0 far from the money
+        prices = self.sample_mean[..., 0] - np.einsum('...k,...k->...', beta, self.sample_mean[..., 1:])
+        dof = max(self.samples - 1 - self.controls, 1)
+        residual = np.maximum(self.sample_m2[..., 0, 0] - np.einsum('...k,...k->...', beta, sxy), 0) / dof
+        return prices, residual
+
+    def prices(self):
+        """
+        Returns
+        -------
+        numpy.ndarray
+            len(strikes) x 2 array of call and put prices, control variate adjusted with controls
+        """
+        if self.controls and self.samples > self.controls + 1:
+            return self._control_fit()[0]
+        return self.payoff_mean.copy()
+
+    def result(self):
+        """
+        Returns
+        -------
+        numpy.ndarray
+            len(strikes) x 4 array, row i is call price, put price, avg RV, RV sd for strikes[i]
+            (same format as path_sampling.all_including_rv_strikes())
+        """
+        out = np.empty((self.strikes.size, 4))
+        out[:, :2] = self.prices()
+        out[:, 2] = self.rv_mean
+        out[:, 3] = np.sqrt(self.rv_m2 / self.count) if self.count else np.nan
+        return out
+
+    def standard_errors(self, reduced=True):
+        """
+        Parameters
+        ----------
+        reduced : bool
+            If False, standard errors of plain payoff averages of the same number of independent paths
+            (optional, default is with variance reduction if any)
+
+        Returns
+        -------
+        numpy.ndarray
+            len(strikes) x 2 array of standard errors of call and put prices
+        """
+        if reduced and self.reduced:
+            if self.samples < self.controls + 2:
+                return np.full((self.strikes.size, 2), np.nan)
+            if self.controls:
+                return np.sqrt(self._control_fit()[1] / self.samples)
+            return np.sqrt(self.sample_m2[..., 0, 0] / (self.samples - 1) / self.samples)
+        if self.count < 2:
+            return np.full((self.strikes.size, 2), np.nan)
+        return np.sqrt(self.payoff_m2 / (self.count - 1) / self.count)
+
+
+def merge_in_order(parts):
+    """
+    Merges results of consecutive path chunks left to right, so the result does not depend on how chunks were
+    scheduled between workers
+
+    Parameters
+    ----------
+    parts : list
+        PathStats, or lists of PathStats (one per vol or length), for each chunk in order
+
+    Returns
+    -------
+    PathStats or list
+        Merged statistics, same form as each part
+    """
+    merged = copy.deepcopy(parts[0])  # parts may be cached, see result_cache
+    for part in parts[1:]:
+        if isinstance(merged, PathStats):
+            merged.merge(part)
+        else:
+            for stats, part_stats in zip(merged, part):
+                stats.merge(part_stats)
+    return merged
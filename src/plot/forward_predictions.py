@@ -4,7 +4,7 @@
     File name: forward_predictions.py
     Author: Jon Lu
     Date created: 6/15/2017
-    Date last modified: 6/15/2017
+    Date last modified: 10/17/2026
     Python Version: 3.6.1
 """
 
@@ -13,6 +13,7 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import path_sampling
+import result_cache
 import bs
 
 
@@ -26,20 +27,22 @@ def avg_or_drop(a, b):
     Returns
     -------
     float
-        a if b equals 0 and vice-versa, or avg(a, b) if neither equal 0
+        a if b equals 0 or NaN (failed IV) and vice-versa, or avg(a, b) if neither equal 0 or NaN
     """
-    if a == 0:
+    if a == 0 or np.isnan(a):
         return b
-    elif b == 0:
+    elif b == 0 or np.isnan(b):
         return a
     return np.mean([a, b])
 
 
-def get_table(length, vol, start_price, times):
+def get_table(length, vol, start_price, times, dist='normal', **kwargs):
     """
     Gets table of IV vs days before exp for single option of fixed length, with strike price at the start price,
     with DTE as steps of 10 between 0 and 60 inclusive
     IV-DTE equivalent of iv_strike_plot
+    Every DTE is priced from one set of paths of the given length, observed only on the days the DTEs start
+    (see path_sampling.horizon_path_stats())
 
     Parameters
     ----------
@@ -51,19 +54,36 @@ def get_table(length, vol, start_price, times):
         Starting, or current, security price
     times : int
         Number of simulations to run for each strike price
+    dist : str
+        Type of distribution used, see path_sampling.path()
+    **kwargs
+        Keyword arguments for path_sampling.path(), 'seed' seeds the simulation (see path_sampling.strike_path_stats()),
+        'executor' runs path chunks on an executor (default is 'serial', see executor.get_executor()), 'cache' reuses
+        paths cached on disk and 'checkpoint' checkpoints the run to a file (see result_cache.run_cells())
+
+    Returns
+    -------
+    pandas.Series
+        Average of call and put IV (see avg_or_drop()) for each DTE, for the option starting DTE days into the paths
+        and expiring at their end (length - DTE days to expiration)
     """
     strike_price = start_price
-    paths = path_sampling.path(length, vol, start_price, times)
-    points = [[path[day] for path in paths] for day in range(-1, -62, -10)]
-    call_prices = [np.mean([x - strike_price if x - strike_price > 0 else 0 for x in day]) for day in points]
-    put_prices = [np.mean([strike_price - x if strike_price - x > 0 else 0 for x in day]) for day in points]
-    call_ivs = [bs.bs_option_implied_vol('c', start_price, strike_price, vol, 0, z[0], z[1]) for z in zip(range(0, 61, 10), call_prices)]
-    put_ivs = [bs.bs_option_implied_vol('p', start_price, strike_price, vol, 0, z[0], z[1]) for z in zip(range(0, 61, 10), put_prices)]
+    dtes = [dte for dte in range(0, 61, 10) if dte < length]
+    horizons = [length - dte for dte in dtes]
+    pool, seed, checkpoint = kwargs.pop('executor', 'serial'), kwargs.pop('seed', None), kwargs.pop('checkpoint', None)
+    cache = result_cache.use_cache(kwargs.pop('cache', False), seed, checkpoint)
+    seed = result_cache.run_seed(seed, checkpoint)
+    stats = result_cache.run_cells(pool, path_sampling.horizon_path_stats,
+                                   [((horizons, vol, start_price, times, strike_price, dist), seed)], cache, checkpoint,
+                                   **kwargs)[0]
+    results = np.array([horizon_stats.result()[0] for horizon_stats in stats])
+    call_ivs = bs.bs_option_implied_vol_array('c', start_price, strike_price, vol, 0, horizons, results[:, 0])[0]
+    put_ivs = bs.bs_option_implied_vol_array('p', start_price, strike_price, vol, 0, horizons, results[:, 1])[0]
     v_avg_or_drop = np.vectorize(avg_or_drop)
-    return v_avg_or_drop(call_ivs, put_ivs)
+    return pd.Series(v_avg_or_drop(call_ivs, put_ivs), index=pd.Index(dtes, name='DTE'))
 
 
-def plot(length, vol, start_price, times, filename=False):
+def plot(length, vol, start_price, times, filename=False, dist='normal', **kwargs):
     """
     Parameters
     ----------
@@ -79,11 +99,20 @@ def plot(length, vol, start_price, times, filename=False):
         Output file name (with or without .png extension)
         Will always output as .png
         If not specified, will display but not save plot
+    dist : str
+        Type of distribution used, see path_sampling.path()
+    **kwargs
+        Keyword arguments for path_sampling.path()
     """
+    get_table(length, vol, start_price, times, dist, **kwargs).plot(grid=1)
+    plt.xlabel('Horizon (days ahead)')
+    plt.ylabel('Implied Volatility')
     if filename is False:
         plt.show()
     else:
         plt.savefig(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir, op.pardir)),
                             'out', (filename if filename.lower().endswith('.png') else filename + '.png')))
 
-plot(100, .25, 100, 100)
+
+if __name__ == "__main__":
+    plot(100, .25, 100, 100)
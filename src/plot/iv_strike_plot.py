@@ -4,7 +4,7 @@
     File name: iv_strike_plot.py
     Author: Jon Lu
     Date created: 6/14/2017
-    Date last modified: 6/19/2017
+    Date last modified: 10/17/2026
     Python Version: 3.6.1
 """
 
@@ -13,6 +13,7 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import strike_table
+import metrics
 
 
 def avg_or_drop(a, b):
@@ -25,11 +26,11 @@ def avg_or_drop(a, b):
     Returns
     -------
     float
-        a if b equals 0 and vice-versa, or avg(a, b) if neither equal 0
+        a if b equals 0 or NaN (failed IV) and vice-versa, or avg(a, b) if neither equal 0 or NaN
     """
-    if a == 0:
+    if a == 0 or np.isnan(a):
         return b
-    elif b == 0:
+    elif b == 0 or np.isnan(b):
         return a
     return np.mean([a, b])
 
@@ -52,10 +53,14 @@ def plot(length, start_price, times, center_strike, strike_range, num_strike, fi
         Number of strikes to plot, not counting center
     filename : string
         Output file name (with or without .png extension)
-        Will always output as .png
+        Will always output as .png, with the table as .csv and as .npz columns with the run's inputs, seed, standard
+        errors and timings (see result_file.load())
         If not specified, will display but not save plot
     dist : str
-        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm'], defaults to 'normal'
+        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm', 'garch', 'heston'],
+        defaults to 'normal'
+        'garch' and 'heston' have time-varying vol (GARCH(1,1) or mean-reverting variance) around vol, with
+        parameters kwargs 'vol0', 'alpha', 'beta', 'kappa', 'xi', 'rho', see path_sampling.sv_params()
         'double-bell' indicates distribution from adding two bell curves with means +/- kwargs['delta'] and std devs sqrt((vol ** 2) / 2)
         'double-bell' std dev derived from var(x + y) = var(x) + var(y) for independent random variables
     **kwargs
@@ -64,27 +69,32 @@ def plot(length, start_price, times, center_strike, strike_range, num_strike, fi
         'bs_data' : filename in montecarlo folder of historical data used for bootstrap as csv
         'jumps' : random dist-based "jumps" at different DTEs, represented by dict with keys (dte, dist, mean, sd, delta)
         'skew_a' : skewness parameter for skewnorm dist
+        'seed' : seed of the simulation, see strike_table.CallPutSurface
+        'executor' : executor to run path chunks on, see strike_table.CallPutSurface
+        'cache' : reuse paths cached on disk, see strike_table.CallPutSurface
+        'checkpoint' : file to checkpoint and resume the surface from, see strike_table.CallPutSurface
+        'sink', 'trace_memory' : where to send the surface's metrics and whether to trace memory,
+        see strike_table.CallPutSurface
     """
-    calls = pd.DataFrame(index=strike_table.CallPutTable.get_index(center_strike, strike_range, num_strike), columns=np.linspace(.15, .35, 9))
-    puts = pd.DataFrame(index=strike_table.CallPutTable.get_index(center_strike, strike_range, num_strike), columns=np.linspace(.15, .35, 9))
-    for i in np.linspace(.15, .35, 9):
-        print('-' * 15)  # separator
-        print('starting vol: ' + str(i))
-        call_and_put = strike_table.CallPutTable(length, i, start_price, times,
-                                                 strike_table.CallPutTable.get_index(center_strike, strike_range, num_strike),
-                                                 dist, **kwargs).get_table().loc[:, ['Call IV', 'Put IV']]
-        calls.loc[:, i] = call_and_put.loc[:, 'Call IV']
-        puts.loc[:, i] = call_and_put.loc[:, 'Put IV']
-        print('ending vol: ' + str(i))
-        print('-' * 15)  # separator
-    v_avg_or_drop = np.vectorize(avg_or_drop)
-    df = pd.DataFrame(v_avg_or_drop(calls, puts), index=calls.index, columns=calls.columns)
+    inputs = dict(length=length, start_price=start_price, times=times, center_strike=center_strike,
+                  strike_range=strike_range, num_strike=num_strike, filename=filename, dist=dist, **kwargs)
+    vols = np.linspace(.15, .35, 9)
+    index = strike_table.CallPutTable.get_index(center_strike, strike_range, num_strike)
+    metrics.logger.info('starting vols: ' + str(vols))
+    surface = strike_table.CallPutSurface(length, vols, start_price, times, index, dist, **kwargs)
+    calls = np.column_stack([surface.get_table(i)['Call IV'].to_numpy() for i in vols])
+    puts = np.column_stack([surface.get_table(i)['Put IV'].to_numpy() for i in vols])
+    metrics.logger.info('ending vols: ' + str(vols))
+    v_avg_or_drop = np.vectorize(avg_or_drop, otypes=[np.float64])
+    df = pd.DataFrame(v_avg_or_drop(calls, puts), index=pd.Index(index, name='Strike'), columns=vols)
+    surface.export_to_npz(filename, inputs)
     df.to_csv(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir, op.pardir)),
                             'out', (filename if filename.lower().endswith('.csv') else filename + '.csv')))
     plt.close('all')
     ax = df.plot(grid=1)
     title_dist_type = dict([('normal', 'Normal'), ('uniform', 'Uniform'), ('bootstrap', 'Bootstrap'),
-                            ('double-bell', 'Double Bell'), ('skewnorm', 'Skew-normal')])
+                            ('double-bell', 'Double Bell'), ('skewnorm', 'Skew-normal'), ('garch', 'GARCH(1,1)'),
+                            ('heston', 'Heston')])
     plt.title(str(times) + ' ' + str(length) + 'D Paths, ' + title_dist_type[dist] + ' Return Dist')
     plt.xlabel('Strike Price')
     plt.ylabel('Implied Volatility')
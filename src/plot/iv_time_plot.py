@@ -4,11 +4,15 @@
     File name: iv_time_plot.py
     Author: Jon Lu
     Date created: 6/15/2017
-    Date last modified: 6/19/2017
+    Date last modified: 10/17/2026
     Python Version: 3.6.1
 """
 
 import path_sampling
+import result_cache
+import result_file
+import strike_table
+import metrics
 import bs
 import math
 import multiprocessing as mp
@@ -28,11 +32,11 @@ def avg_or_drop(a, b):
     Returns
     -------
     float
-        a if b equals 0 and vice-versa, or avg(a, b) if neither equal 0
+        a if b equals 0 or NaN (failed IV) and vice-versa, or avg(a, b) if neither equal 0 or NaN
     """
-    if a == 0:
+    if a == 0 or np.isnan(a):
         return b
-    elif b == 0:
+    elif b == 0 or np.isnan(b):
         return a
     return np.mean([a, b])
 
@@ -54,7 +58,10 @@ class TimeTable:
     strike : float
         Price to center strike prices around
     dist : str
-        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm'], defaults to 'normal'
+        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm', 'garch', 'heston'],
+        defaults to 'normal'
+        'garch' and 'heston' have time-varying vol (GARCH(1,1) or mean-reverting variance) around vol, with
+        parameters kwargs 'vol0', 'alpha', 'beta', 'kappa', 'xi', 'rho', see path_sampling.sv_params()
         'double-bell' indicates distribution from adding two bell curves with means +/- kwargs['delta'] and std devs sqrt((vol ** 2) / 2)
         'double-bell' std dev derived from var(x + y) = var(x) + var(y) for independent random variables
     **kwargs
@@ -62,13 +69,51 @@ class TimeTable:
         'delta' : mean used for normal curves underpinning double bell distribution
         'bs_data' : historical data used for bootstrap (array-like)
         'skew_a' : skewness parameter for skewnorm dist
+        'antithetic', 'control_variates' : variance reduction, see strike_table.CallPutTable
+        (control variates only with separate paths for each length)
+        'dtype' : 'float32' for single precision paths, see strike_table.CallPutTable
+    common_paths : bool
+        If True, simulates one set of paths of the longest length and gets every length from it
+        (see path_sampling.all_including_rv_lengths()), otherwise simulates a new set of paths for each length (default)
+    seed : numpy.random.SeedSequence
+        Seed of the table (from seed given as int, or fresh entropy if None), the same seed gives the same table
+        regardless of the number of workers; with separate paths, length n uses child n of seed
+    executor : str or executor
+        Backend in ['serial', 'thread', 'process'] or executor to run path chunks on, see executor.get_executor()
+        (optional, default is the shared process pool)
+    target_iv_se : float
+        If given, times is a batch size and batches are added to each length until the standard error of its
+        out-of-the-money IV is at most target_iv_se (see strike_table.adaptive_row_stats()), needs common_paths False
+    max_times : int
+        Most paths simulated for a length with target_iv_se (optional, default is 20 * times)
+    cache : bool
+        If True, reuses (and extends) path chunks cached on disk by earlier runs with the same parameters and seed,
+        see result_cache.run_cells() (optional, default is False)
+    checkpoint : str
+        File to write finished path chunks to while the table runs, resumed from by a rerun with the same seed,
+        see strike_table.CallPutTable (optional, default is no checkpoint)
+    metrics : metrics.Metrics
+        Phase timings, counters and paths per second of each worker of the last make_table(), see get_metrics()
+    sink : str or callable
+        Where to send metrics after each table, see metrics.Metrics.emit() (optional, default is nowhere)
+    trace_memory : bool
+        If True, metrics include the peak memory traced by tracemalloc (optional, default is False)
     """
 
-    def __init__(self, lengths, vol, start, times, strike, dist='normal', **kwargs):
+    def __init__(self, lengths, vol, start, times, strike, dist='normal', common_paths=False, seed=None, executor=None,
+                 target_iv_se=None, max_times=None, cache=False, checkpoint=None, sink=None, trace_memory=False,
+                 **kwargs):
         self.lengths, self.vol, self.start, self.times, self.strike, self.dist, self.kwargs, self.df = lengths, vol, start, times, strike, dist, kwargs, None
+        self.errors = None
+        self.common_paths = path_sampling.flag(common_paths)
+        self.seed = result_cache.run_seed(seed, checkpoint)
+        self.executor = executor
+        self.target_iv_se, self.max_times = strike_table.adaptive_settings(times, self.common_paths, target_iv_se, max_times)
+        self.cache, self.checkpoint = result_cache.use_cache(cache, seed, checkpoint), checkpoint
+        self.metrics, self.sink, self.trace_memory = None, sink, path_sampling.flag(trace_memory)
         self.make_table()
 
-    def row(self, length):
+    def row(self, length, stream=0):
         """
         For internal use only
 
@@ -76,36 +121,98 @@ class TimeTable:
         ----------
         length : int
             Path length to get IVs for
+        stream : int
+            Index of the child of self.seed to simulate with
 
         Returns
         -------
         tuple
             Tuple of given length, call IV, put IV, and avg RV
         """
-        print('starting length: ' + str(length))
-        result = path_sampling.all_including_rv(length, self.vol, self.start, self.times, self.strike, self.dist, **self.kwargs)
-        cp = result[0]
-        pp = result[1]
-        ret = (length, bs.bs_option_implied_vol('c', self.start, self.strike, self.vol, 0, length, cp),
-               bs.bs_option_implied_vol('p', self.start, self.strike, self.vol, 0, length, pp), result[2])
-        print('ending length: ' + str(length))
-        return ret
+        result = path_sampling.all_including_rv(length, self.vol, self.start, self.times, self.strike, self.dist,
+                                                seed=path_sampling.child_seed(self.seed, stream), **self.kwargs)
+        return self.row_from_output(length, result)
+
+    def row_from_output(self, length, result):
+        """
+        For internal use only
+
+        Parameters
+        ----------
+        length : int
+            Path length
+        result : numpy.ndarray
+            Call price, put price, avg RV, RV sd for length (from path_sampling.all_including_rv())
+
+        Returns
+        -------
+        tuple
+            Same as row()
+        """
+        return self.rows_from_outputs([length], [result])[0]
+
+    def rows_from_outputs(self, lengths, results):
+        """
+        For internal use only
+        Solves IVs for all lengths at once, failed IVs are NaN (see bs.bs_option_implied_vol_array())
+
+        Parameters
+        ----------
+        lengths : array-like
+            Path lengths
+        results : array-like
+            Call price, put price, avg RV, RV sd for each length (from path_sampling.all_including_rv())
+
+        Returns
+        -------
+        list
+            Tuples as returned by row()
+        """
+        results = np.asarray(results, dtype=float)
+        ivs, _ = bs.bs_option_implied_vol_array([['c', 'p']], self.start, self.strike, self.vol, 0,
+                                                np.asarray(lengths)[:, np.newaxis], results[:, :2])
+        return [(length, iv[0], iv[1], result[2]) for length, iv, result in zip(lengths, ivs, results)]
 
     def make_table(self):
         """
         For internal use only
         Stores table as self.df
+        Every (length, path chunk) pair is a separate task on self.executor, so long lengths do not hold up the table
         """
         mp.freeze_support()
-        df = pd.DataFrame(index=self.lengths, columns=['Call IV', 'Put IV', 'RV'])
-        df.index.name = 'DTE'
-        pool = mp.Pool()
-        rows = pool.map(self.row, self.lengths)
-        pool.close()
-        pool.join()
-        for a in rows:
-            df.loc[a[0], :] = [a[1], a[2], a[3]]
-        self.df = df
+        self.metrics = metrics.Metrics()
+        with metrics.collect(self.metrics, self.trace_memory):
+            self._make_table()
+        self.metrics.emit(self.sink, table='TimeTable')
+
+    def _make_table(self):
+        """For internal use only, make_table() while collecting metrics"""
+        if self.common_paths:
+            stats = result_cache.run_cells(self.executor, path_sampling.length_path_stats,
+                                           [((self.lengths, self.vol, self.start, self.times, self.strike, self.dist),
+                                             self.seed)], self.cache, self.checkpoint, **self.kwargs)[0]
+        elif self.target_iv_se is None:
+            stats = result_cache.run_cells(self.executor, path_sampling.strike_path_stats,
+                                           [((length, self.vol, self.start, self.times, [self.strike], self.dist),
+                                             path_sampling.child_seed(self.seed, n))
+                                            for n, length in enumerate(self.lengths)], self.cache, self.checkpoint,
+                                           **self.kwargs)
+        else:
+            stats = strike_table.adaptive_row_stats([(length, self.vol, self.start, self.times, [self.strike], self.dist)
+                                                     for length in self.lengths], self.seed, self.target_iv_se,
+                                                    self.max_times, self.executor, self.cache, self.checkpoint,
+                                                    **self.kwargs)
+        rows = self.rows_from_outputs(self.lengths, [length_stats.result()[0] for length_stats in stats])
+        self.df = pd.DataFrame(np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 3),
+                               index=pd.Index(self.lengths, name='DTE'), columns=['Call IV', 'Put IV', 'RV'])
+        ivs = np.array([[a[1], a[2]] for a in rows], dtype=float)
+        price_errors = [length_stats.standard_errors()[0] for length_stats in stats]
+        self.errors = pd.DataFrame(strike_table.iv_standard_errors(self.start, self.strike,
+                                                                   np.asarray(self.lengths)[:, np.newaxis], ivs,
+                                                                   price_errors),
+                                   index=pd.Index(self.lengths, name='DTE'), columns=['Call IV SE', 'Put IV SE'])
+        self.errors['Call SE'], self.errors['Put SE'] = np.array(price_errors, dtype=np.float64).reshape(-1, 2).T
+        self.errors['Paths'] = np.array([length_stats.count for length_stats in stats], dtype=np.int64)
 
     def get_table(self):
         """
@@ -116,6 +223,49 @@ class TimeTable:
         """
         return self.df
 
+    def get_errors(self):
+        """
+        Returns
+        -------
+        pandas.DataFrame
+            Standard errors of call and put IVs (see strike_table.iv_standard_errors()) and prices, and number of
+            paths simulated for each DTE
+        """
+        return self.errors.copy()
+
+    def get_metrics(self):
+        """
+        Returns
+        -------
+        dict
+            Metrics of the table, see metrics.Metrics.as_dict()
+        """
+        return self.metrics.as_dict()
+
+    def export_to_npz(self, filename='time_table', inputs=None):
+        """
+        Exports table and its standard errors and path counts as float64 columns of a .npz file into montecarlo/out,
+        with parameters, seed and timings as metadata (see strike_table.CallPutTable.export_to_npz())
+
+        Parameters
+        ----------
+        filename : str
+            Output file name, with or without .npz extension (optional, default is time_table)
+        inputs : dict
+            Inputs of the run to add to the metadata, e.g. the runner's input file (optional)
+        """
+        columns = {'DTE': np.asarray(self.df.index, dtype=np.float64)}
+        columns.update((name, self.df[name].to_numpy()) for name in self.df.columns)
+        columns.update((name, self.errors[name].to_numpy()) for name in self.errors.columns)
+        metadata = {'table': 'TimeTable',
+                    'params': {'lengths': self.lengths, 'vol': self.vol, 'start': self.start, 'times': self.times,
+                               'strike': self.strike, 'dist': self.dist, 'common_paths': self.common_paths,
+                               'target_iv_se': self.target_iv_se, 'max_times': self.max_times, 'kwargs': self.kwargs},
+                    'seed': self.seed, 'timings': self.metrics.timings, 'metrics': self.metrics.as_dict(),
+                    'inputs': inputs}
+        with metrics.collect(self.metrics), metrics.phase('io'):
+            result_file.save(result_file.out_filename(filename), columns, metadata)
+
 
 def plot(center_length, length_range, num_lengths, vol, start_price, times, strike, filename=False, dist='normal', **kwargs):
     """
@@ -137,10 +287,14 @@ def plot(center_length, length_range, num_lengths, vol, start_price, times, stri
         Target strike price
     filename : string
         Output file name (with or without .png extension)
-        Will always output as .png
+        Will always output as .png, with the table as .csv and as .npz columns with the run's inputs, seed, standard
+        errors and timings (see result_file.load())
         If not specified, will display but not save plot
     dist : str
-        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm'], defaults to 'normal'
+        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm', 'garch', 'heston'],
+        defaults to 'normal'
+        'garch' and 'heston' have time-varying vol (GARCH(1,1) or mean-reverting variance) around vol, with
+        parameters kwargs 'vol0', 'alpha', 'beta', 'kappa', 'xi', 'rho', see path_sampling.sv_params()
         'bootstrap' indicates randomly sampling with replacement from historical log-returns (kwargs['bs_data'])
         'double-bell' indicates distribution from adding two bell curves with means +/- kwargs['delta'] and std devs sqrt((vol ** 2) / 2)
         'double-bell' std dev derived from var(x + y) = var(x) + var(y) for independent random variables
@@ -149,12 +303,18 @@ def plot(center_length, length_range, num_lengths, vol, start_price, times, stri
         'delta' : mean used for normal curves underpinning double bell distribution
         'bs_data' : filename in montecarlo folder of historical data used for bootstrap as csv
         'skew_a' : skewness parameter for skewnorm dist
+        'common_paths' : get every length from one set of paths, see TimeTable
+        'seed' : seed of the simulation, see TimeTable
+        'executor' : executor to run path chunks on, see TimeTable
+        'target_iv_se', 'max_times' : adaptive number of paths for each length, see TimeTable
+        'cache' : reuse paths cached on disk, see TimeTable
+        'checkpoint' : file to checkpoint and resume the table from, see TimeTable
+        'sink', 'trace_memory' : where to send the table's metrics and whether to trace memory, see TimeTable
     """
+    inputs = dict(center_length=center_length, length_range=length_range, num_lengths=num_lengths, vol=vol,
+                  start_price=start_price, times=times, strike=strike, filename=filename, dist=dist, **kwargs)
     if dist == 'bootstrap':
-        kw = pd.read_csv(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir, op.pardir)), kwargs['bs_data']), index_col=0).iloc[:, 0]
-        pairs = zip(kw[:-1], kw[1:])
-        log_returns = [math.log(pair[1] / pair[0]) for pair in pairs]
-        vol = np.std(log_returns) * math.sqrt(252)
+        vol = np.std(path_sampling.historical_log_returns(kwargs['bs_data'])) * math.sqrt(252)
     lengths = np.arange(center_length - length_range, (center_length + length_range) * 1.001,
                         round(length_range * 2 / num_lengths), dtype=int)
     if center_length not in lengths:
@@ -162,6 +322,7 @@ def plot(center_length, length_range, num_lengths, vol, start_price, times, stri
     lengths = [x for x in lengths if x > 0]
     t = TimeTable(lengths, vol, start_price, times, strike, dist, **kwargs)
     df = t.get_table()
+    t.export_to_npz(filename, inputs)
     v_avg_or_drop = np.vectorize(avg_or_drop)
     res = pd.DataFrame({'Black–Scholes Implied Vol': v_avg_or_drop(df.loc[:, 'Call IV'].values, df.loc[:, 'Put IV'].values),
                         'Average Realized Vol': df.loc[:, 'RV']}, index=df.index)
@@ -169,7 +330,8 @@ def plot(center_length, length_range, num_lengths, vol, start_price, times, stri
                             'out', (filename if filename.lower().endswith('.csv') else filename + '.csv')))
     ax = res.plot(grid=1)
     title_dist_type = dict([('normal', 'Normal'), ('uniform', 'Uniform'), ('bootstrap', 'Bootstrap'),
-                            ('double-bell', 'Double Bell'), ('skewnorm', 'Skew-normal')])
+                            ('double-bell', 'Double Bell'), ('skewnorm', 'Skew-normal'), ('garch', 'GARCH(1,1)'),
+                            ('heston', 'Heston')])
     plt.title(str(times) + ' Paths, ' + title_dist_type[dist] + ' Return Dist' +
               ', Vol=' + str(vol) +
               ', Start=' + str(start_price) +
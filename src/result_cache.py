@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+
+"""
+    File name: result_cache.py
+    Author: Jon Lu
+    Date created: 10/17/2026
+    Date last modified: 10/17/2026
+    Python Version: 3.6.1
+"""
+
+import functools
+import hashlib
+import json
+import os
+import os.path as op
+import pickle
+import tempfile
+import time
+import warnings
+import numpy as np
+import bs
+import executor
+import metrics
+import path_sampling
+import path_stats
+
+CACHE_VERSION = 1  # bump when simulation results change, so old entries are never read
+CACHE_DIR = op.join(bs.CACHE_DIR, 'results')
+MAX_CACHE_BYTES = 512 * 2 ** 20  # cache files beyond this total are evicted, least recently used first
+CHECKPOINT_SECONDS = 5  # most time between checkpoint writes while chunks finish
+
+
+def canonical(value):
+    """
+    Parameters
+    ----------
+    value
+        Simulation parameter (number, string, list, tuple, dict, numpy array, numpy dtype or SeedSequence)
+
+    Returns
+    -------
+    object
+        JSON-serializable form of value, equal for equal parameters (dicts sorted by key, arrays as lists)
+    """
+    if isinstance(value, np.random.SeedSequence):
+        return {'entropy': canonical(value.entropy), 'spawn_key': canonical(value.spawn_key),
+                'pool_size': value.pool_size}
+    if isinstance(value, dict):
+        return {str(k): canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [canonical(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return int(value) if float(value).is_integer() else repr(float(value))  # 100 and 100.0 are the same strike
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, np.dtype) or (isinstance(value, type) and issubclass(value, np.generic)):
+        return np.dtype(value).name  # dtype option, same as its string
+    raise ValueError('cannot cache parameter of type ' + type(value).__name__)
+
+
+def cell_params(function, args, seed, kwargs):
+    """
+    Parameters
+    ----------
+    function : callable
+        Stats function of path_sampling, see run_cells()
+    args : tuple
+        Positional arguments of function up to dist, times (args[3]) is left out as chunks do not depend on it
+    seed : numpy.random.SeedSequence
+        Seed of cell
+    kwargs : dict
+        Keyword arguments of function
+
+    Returns
+    -------
+    dict
+        Canonical parameters of a cell, including the historical data file's size and modification time for
+        'bootstrap', the engine used (see path_sampling.engine()) and the chunk size
+    """
+    params = {'version': CACHE_VERSION, 'chunk_size': path_sampling.CHUNK_SIZE,
+              'function': function.__module__ + '.' + function.__name__,
+              'args': canonical(args[:3] + args[4:]), 'seed': canonical(seed), 'kwargs': canonical(kwargs)}
+    if kwargs.get('bs_data'):
+        filename = op.abspath(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir)), kwargs['bs_data']))
+        params['bs_data_file'] = [op.getsize(filename), op.getmtime(filename)]
+    if kwargs.get('engine'):  # engine actually stepping the paths, 'numba' falls back when not installed
+        params['engine'] = path_sampling.engine(args[5], **kwargs)
+    return params
+
+
+def cell_key(params):
+    """
+    Returns
+    -------
+    str
+        SHA-256 of the canonical JSON of cell_params()
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def load(key):
+    """
+    Returns
+    -------
+    dict
+        Cached chunk results of cell, keyed by (chunk index, chunk size), empty if not cached
+    """
+    filename = op.join(CACHE_DIR, key + '.pkl')
+    try:
+        with metrics.phase('io'), open(filename, 'rb') as f:
+            entry = pickle.load(f)
+        os.utime(filename)  # recently used
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+    return entry['chunks']
+
+
+def write(filename, entry):
+    """
+    Pickles entry to filename atomically (readers never see a partial file)
+    """
+    directory = op.dirname(op.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    with metrics.phase('io'), os.fdopen(fd, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, filename)
+
+
+def save(key, params, chunks):
+    """
+    Writes cached chunk results of cell
+
+    Parameters
+    ----------
+    key : str
+        See cell_key()
+    params : dict
+        See cell_params(), stored alongside for inspection
+    chunks : dict
+        Chunk results keyed by (chunk index, chunk size)
+    """
+    write(op.join(CACHE_DIR, key + '.pkl'), {'params': params, 'chunks': chunks})
+
+
+def checkpoint_filename(checkpoint):
+    """
+    Returns
+    -------
+    str
+        Absolute path of checkpoint, relative paths are in the montecarlo folder (like bs_data)
+    """
+    return op.abspath(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir)), checkpoint))
+
+
+def load_checkpoint(checkpoint):
+    """
+    Parameters
+    ----------
+    checkpoint : str
+        Checkpoint file, see run_cells()
+
+    Returns
+    -------
+    dict
+        {'version': CACHE_VERSION, 'cells': {cell key: cell}} where each cell is a dict of its 'params', the
+        'sizes' of its chunks and the finished 'chunks' keyed by (chunk index, chunk size), without cells if the
+        file does not exist
+    """
+    filename = checkpoint_filename(checkpoint)
+    try:
+        with metrics.phase('io'), open(filename, 'rb') as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return {'version': CACHE_VERSION, 'cells': {}}
+    except (OSError, EOFError, pickle.UnpicklingError):
+        warnings.warn('could not read checkpoint ' + filename + ', starting over')
+        return {'version': CACHE_VERSION, 'cells': {}}
+    if state.get('version') != CACHE_VERSION:
+        return {'version': CACHE_VERSION, 'cells': {}}
+    return state
+
+
+def run_seed(seed=None, checkpoint=None):
+    """
+    Root seed of a run, see path_sampling.seed_sequence()
+    An unseeded run with a checkpoint saves its fresh entropy to the checkpoint file and a rerun reuses it, so the
+    cell keys stay the same and the rerun resumes from the checkpoint like a seeded one
+
+    Parameters
+    ----------
+    seed : int, numpy.random.SeedSequence or None
+        Seed of the run, None for fresh entropy
+    checkpoint : str
+        Checkpoint file, see run_cells() (optional, default is no checkpoint)
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+    """
+    if seed is not None or not checkpoint:
+        return path_sampling.seed_sequence(seed)
+    state = load_checkpoint(checkpoint)
+    if 'entropy' not in state:
+        state['entropy'] = np.random.SeedSequence().entropy
+        write(checkpoint_filename(checkpoint), state)
+    return np.random.SeedSequence(state['entropy'])
+
+
+def use_cache(cache, seed=None, checkpoint=None):
+    """
+    Parameters
+    ----------
+    cache : bool
+        Use the cache (may be a string from the input files)
+    seed, checkpoint
+        Seed and checkpoint file of the run, see run_seed()
+
+    Returns
+    -------
+    bool
+        cache, False (with a warning) for an unseeded run without a checkpoint, as its fresh entropy makes new cell
+        keys on every run and its entries could never be read back
+    """
+    cache = path_sampling.flag(cache)
+    if cache and seed is None and not checkpoint:
+        warnings.warn('cache needs a seed (or a checkpoint) to be reused, running without cache')
+        return False
+    return cache
+
+
+def progress(checkpoint):
+    """
+    Progress of a run, may be called from another process while the run is going
+
+    Parameters
+    ----------
+    checkpoint : str
+        Checkpoint file, see run_cells()
+
+    Returns
+    -------
+    dict
+        Numbers of 'cells' (rows or surfaces) and 'chunks' seen so far, and of the finished ones ('cells_done',
+        'chunks_done'), with the 'paths' and 'paths_done' they add up to
+    """
+    cells = load_checkpoint(checkpoint)['cells'].values()
+    done = [[size for c, size in enumerate(cell['sizes']) if (c, size) in cell['chunks']] for cell in cells]
+    return {'cells': len(cells),
+            'cells_done': sum(len(sizes) == len(cell['sizes']) for sizes, cell in zip(done, cells)),
+            'chunks': sum(len(cell['sizes']) for cell in cells),
+            'chunks_done': sum(len(sizes) for sizes in done),
+            'paths': sum(sum(cell['sizes']) for cell in cells),
+            'paths_done': sum(sum(sizes) for sizes in done)}
+
+
+def evict(max_bytes=None):
+    """
+    Deletes least recently used cache files until they take at most max_bytes
+
+    Parameters
+    ----------
+    max_bytes : int
+        Optional, default is MAX_CACHE_BYTES
+    """
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    if not op.isdir(CACHE_DIR):
+        return
+    files = []
+    with metrics.phase('io'):
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith('.pkl'):
+                stat = os.stat(op.join(CACHE_DIR, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in files)
+    for _, size, name in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(op.join(CACHE_DIR, name))
+        except OSError:
+            pass
+        total -= size
+
+
+def run_cells(pool, function, cells, cache=False, checkpoint=None, **kwargs):
+    """
+    Runs function(*args, seed, [c], **kwargs) for every path chunk c of each cell on one executor and merges
+    the chunks of each cell in order, adding the metrics of each task to the collecting metrics.Metrics
+    With cache, chunks come from (and new chunks go to) the on-disk cache, as a chunk's accumulators only depend
+    on the cell's parameters, its index and its size: a cell rerun with more paths only simulates the new chunks
+    With checkpoint, the cells are written to the checkpoint file before any chunk runs and finished chunks while
+    the run goes (at most CHECKPOINT_SECONDS apart, and when it stops, including on Ctrl-C), and a rerun with the
+    same parameters and seed resumes from them, see progress() (unseeded runs keep their seed in the checkpoint,
+    see run_seed())
+    Cells of earlier runs are kept in the checkpoint (the rounds of strike_table.adaptive_row_stats() add their
+    batches to the same file), so progress() counts every cell it has seen, use a new file for a new run
+
+    Parameters
+    ----------
+    pool : str or executor
+        See executor.get_executor()
+    function : callable
+        path_sampling.strike_path_stats(), surface_path_stats() or length_path_stats()
+    cells : list
+        (args, seed) of each cell, args are the positional arguments of function up to dist, with times as args[3]
+    cache : bool
+        Use the cache (may be a string from the input files), optional, default is False
+    checkpoint : str
+        Checkpoint file, relative to the montecarlo folder (optional, default is no checkpoint)
+    **kwargs
+        Keyword arguments of function
+
+    Returns
+    -------
+    list
+        Merged results of function (path_stats.PathStats or list of them) for each cell
+    """
+    cache = path_sampling.flag(cache)
+    state = load_checkpoint(checkpoint) if checkpoint else None
+    entries, tasks = [], []
+    for n, (args, seed) in enumerate(cells):
+        params = cell_params(function, args, seed, kwargs) if cache or state else None
+        key = cell_key(params) if cache or state else None
+        chunks = load(key) if cache else {}
+        cached = len(chunks)
+        sizes = path_sampling.chunks(args[3])
+        if state:
+            cell = state['cells'].setdefault(key, {'params': params, 'sizes': sizes, 'chunks': {}})
+            cell['sizes'] = sizes
+            chunks.update(cell['chunks'])
+            cell['chunks'] = chunks  # filled in below
+        entries.append((key, params, chunks, cached))
+        for c, size in enumerate(sizes):
+            if (c, size) not in chunks:
+                tasks.append((n, c, size))
+    if state:
+        write(checkpoint_filename(checkpoint), state)
+    written = time.time()
+    try:
+        for (n, c, size), (part, task_metrics) in zip(tasks, executor.istarmap(
+                pool, functools.partial(metrics.timed_call, function, **kwargs),
+                [cells[n][0] + (cells[n][1], [c]) for n, c, _ in tasks])):
+            entries[n][2][(c, size)] = part
+            metrics.add(task_metrics)
+            if state and time.time() - written >= CHECKPOINT_SECONDS:
+                write(checkpoint_filename(checkpoint), state)
+                written = time.time()
+    finally:
+        if state:
+            write(checkpoint_filename(checkpoint), state)
+    if cache:
+        for key, params, chunks, cached in entries:
+            if len(chunks) > cached:
+                save(key, params, chunks)
+        evict()
+    metrics.count('cached_chunks', sum(len(path_sampling.chunks(args[3])) for args, _ in cells) - len(tasks))
+    with metrics.phase('pricing'):
+        return [path_stats.merge_in_order([chunks[(c, size)]
+                                           for c, size in enumerate(path_sampling.chunks(args[3]))])
+                for (args, _), (_, _, chunks, _) in zip(cells, entries)]
+
+
+def clear():
+    """Deletes every cached result"""
+    evict(0)
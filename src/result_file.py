@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""
+    File name: result_file.py
+    Author: Jon Lu
+    Date created: 10/17/2026
+    Date last modified: 10/17/2026
+    Python Version: 3.6.1
+"""
+
+import json
+import os
+import os.path as op
+import struct
+import tempfile
+import zipfile
+import numpy as np
+
+METADATA = '__metadata__'  # name of the JSON metadata member of result files
+
+
+def _json_default(value):
+    """JSON form of numpy values and seeds in metadata"""
+    if isinstance(value, np.random.SeedSequence):
+        return {'entropy': value.entropy, 'spawn_key': list(value.spawn_key)}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def out_filename(filename, extension='.npz'):
+    """
+    Returns
+    -------
+    str
+        Path of filename in montecarlo/out, with extension added if missing (absolute paths are kept)
+    """
+    filename = filename if filename.lower().endswith(extension) else filename + extension
+    return op.join(op.abspath(op.join(__file__, op.pardir, op.pardir)), 'out', filename)
+
+
+def save(filename, columns, metadata):
+    """
+    Writes result columns and run metadata as an uncompressed .npz file (readable with numpy.load()), written
+    atomically
+
+    Parameters
+    ----------
+    filename : str
+        Output file
+    columns : dict
+        Column name to array-like of numbers, stored as float64 unless integer (e.g. path counts)
+    metadata : dict
+        Run metadata (parameters, seed, path counts, standard errors, timings), stored as JSON
+    """
+    arrays = {}
+    for name, column in columns.items():
+        column = np.asarray(column)
+        arrays[name] = column if column.dtype.kind in 'iu' else column.astype(np.float64)
+    arrays[METADATA] = np.array(json.dumps(metadata, default=_json_default))
+    directory = op.dirname(op.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix='.npz', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, filename)
+
+
+def load(filename):
+    """
+    Loads a file written by save() without copying its columns: each numeric column is a read-only memory map of
+    its bytes in the (uncompressed) file
+
+    Parameters
+    ----------
+    filename : str
+
+    Returns
+    -------
+    tuple
+        Dict of column name to numpy.ndarray, and metadata dict
+    """
+    columns, metadata = {}, {}
+    with zipfile.ZipFile(filename) as archive, open(filename, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if name == METADATA or info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    array = np.lib.format.read_array(member, allow_pickle=False)
+                if name == METADATA:
+                    metadata = json.loads(str(array))
+                else:
+                    columns[name] = array
+                continue
+            f.seek(info.header_offset + 26)  # local file header, lengths of name and extra field
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError('result files may not hold objects!')
+            if not int(np.prod(shape)):
+                columns[name] = np.empty(shape, dtype=dtype)
+                continue
+            columns[name] = np.memmap(f, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                      order='F' if fortran_order else 'C')
+    return columns, metadata
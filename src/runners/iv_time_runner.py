@@ -1,8 +1,10 @@
+import logging
 import os.path as op
 import pandas as pd
 from plot import iv_time_plot
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')  # progress and metrics (sink=log)
     df = pd.read_csv(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir, op.pardir)), 'iv_dte_input.txt'),
                      sep='=', index_col=0).dropna()
     data = df[df.columns[0]]
@@ -15,14 +17,6 @@ if __name__ == "__main__":
         else:
             args[df.index[i]] = df.iloc[i, 0]
 
-    with open(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir, op.pardir)),
-                      'iv_dte_input.txt'), 'r') as infile, \
-            open(op.join(op.abspath(op.join(__file__, op.pardir, op.pardir, op.pardir)),
-                         'out', args['filename'] + '.txt'), 'w') as outfile:
-        outfile.write('INPUT\n')
-        outfile.write('-' * 20 + '\n')
-        outfile.write(infile.read())
-
     iv_time_plot.plot(args['center_length'], args['length_range'], args['num_lengths'],
                       args['vol'], args['start_price'], args['times'], args['strike'],
-                      filename=args['filename'], dist=args['dist'], **dict(list(data.iteritems())[9:]))
+                      filename=args['filename'], dist=args['dist'], **dict(list(data.items())[9:]))
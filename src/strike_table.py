@@ -4,11 +4,14 @@
     File name: strike_table.py
     Author: Jon Lu
     Date created: 6/14/2017
-    Date last modified: 6/19/2017
+    Date last modified: 10/17/2026
     Python Version: 3.6.1
 """
 
 import path_sampling
+import result_cache
+import result_file
+import metrics
 import bs
 import multiprocessing as mp
 import os
@@ -16,6 +19,109 @@ import numpy as np
 import pandas as pd
 
 
+@metrics.timed('iv')
+def iv_standard_errors(start, strikes, lengths, ivs, price_errors):
+    """
+    First order standard errors of IVs, price standard error / d(price)/d(vol) at the IV
+
+    Parameters
+    ----------
+    start : float
+        Starting, or current, security price
+    strikes, lengths : array-like
+        Strike prices and lengths of options, broadcast against ivs
+    ivs : array-like
+        n x 2 array of call and put IVs, NaN where IV failed
+    price_errors : array-like
+        n x 2 array of standard errors of call and put prices
+
+    Returns
+    -------
+    numpy.ndarray
+        n x 2 array of standard errors of call and put IVs, NaN where IV failed
+    """
+    ivs = np.asarray(ivs, dtype=float)
+    vegas = bs.bs_option_vega_array([['c', 'p']], start, strikes, np.nan_to_num(ivs), 0, lengths) * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(np.isnan(ivs) | (vegas <= 0), np.nan, np.asarray(price_errors, dtype=float) / vegas)
+
+
+def adaptive_settings(times, common_paths, target_iv_se, max_times):
+    """
+    For internal use only
+    Checks and converts (may be strings from the input files) target_iv_se and max_times of a table
+
+    Returns
+    -------
+    tuple
+        target_iv_se (None if not adaptive) and max_times
+    """
+    if target_iv_se is None:
+        return None, None
+    if common_paths:
+        raise ValueError('target_iv_se needs separate paths for each row (common_paths=False)')
+    target_iv_se = float(target_iv_se)
+    max_times = int(max_times) if max_times is not None else 20 * int(times)
+    if target_iv_se <= 0:
+        raise ValueError('target_iv_se must be > 0!')
+    if max_times < int(times):
+        raise ValueError('max_times must be at least times!')
+    return target_iv_se, max_times
+
+
+def adaptive_row_stats(row_args, seed, target_iv_se, max_times, pool=None, cache=False, checkpoint=None,
+                       **kwargs):
+    """
+    Adds batches of paths to each row of a table until the standard error of its out-of-the-money IV (call at or
+    above start, put below) is at most target_iv_se, or another batch would take it over max_times paths
+    Each round only simulates the rows that have not converged, all of their path chunks on one executor
+
+    Parameters
+    ----------
+    row_args : list
+        (length, vol, start, batch size, [strike], dist) of each row, see path_sampling.strike_path_stats()
+    seed : numpy.random.SeedSequence
+        Seed of the table, batch b of row n is seeded with child b of child n of seed
+    target_iv_se : float
+        Target standard error of IVs
+    max_times : int
+        Most paths of a row
+    pool : str or executor
+        See executor.get_executor()
+    cache : bool
+        Cache batches, see result_cache.run_cells()
+    checkpoint : str
+        Checkpoint file of batches, see result_cache.run_cells()
+    **kwargs
+        Keyword arguments of path_sampling.strike_path_stats()
+
+    Returns
+    -------
+    list
+        path_stats.PathStats of each row (count is the number of paths used)
+    """
+    stats = [None for _ in row_args]
+    active = list(range(len(row_args)))
+    batch = 0
+    while active:
+        parts = result_cache.run_cells(pool, path_sampling.strike_path_stats,
+                                       [(row_args[n], path_sampling.child_seed(path_sampling.child_seed(seed, n), batch))
+                                        for n in active], cache, checkpoint, **kwargs)
+        for n, part in zip(active, parts):
+            stats[n] = part if stats[n] is None else stats[n].merge(part)
+        lengths = np.array([[row_args[n][0]] for n in active])
+        strikes = np.array([[row_args[n][4][0]] for n in active])
+        vol, start = row_args[0][1:3]
+        ivs, _ = bs.bs_option_implied_vol_array([['c', 'p']], start, strikes, vol, 0, lengths,
+                                                [stats[n].result()[0, :2] for n in active])
+        errors = iv_standard_errors(start, strikes, lengths, ivs, [stats[n].standard_errors()[0] for n in active])
+        otm_errors = np.where(strikes[:, 0] >= start, errors[:, 0], errors[:, 1])
+        active = [n for n, error in zip(active, otm_errors)
+                  if not error <= target_iv_se and stats[n].count + row_args[n][3] <= max_times]
+        batch += 1
+    return stats
+
+
 class CallPutTable:
     """
     Table consisting of call price, put price, call IV, put IV, call - put + strike - start price, average RV,
@@ -34,7 +140,10 @@ class CallPutTable:
     strikes : array-like
         Strike prices to calculate with
     dist : str
-        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm'], defaults to 'normal'
+        Type of distribution used in ['normal', 'uniform', 'bootstrap', 'double-bell', 'skewnorm', 'garch', 'heston'],
+        defaults to 'normal'
+        'garch' and 'heston' have time-varying vol (GARCH(1,1) or mean-reverting variance) around vol, with
+        parameters kwargs 'vol0', 'alpha', 'beta', 'kappa', 'xi', 'rho', see path_sampling.sv_params()
         'bootstrap' indicates randomly sampling with replacement from historical log-returns (kwargs['bs_data'])
         'double-bell' indicates distribution from adding two bell curves with means +/- kwargs['delta'] and std devs sqrt((vol ** 2) / 2)
         'double-bell' std dev derived from var(x + y) = var(x) + var(y) for independent random variables
@@ -44,13 +153,58 @@ class CallPutTable:
         'delta' : mean used for normal curves underpinning double bell distribution
         'bs_data' : filename in montecarlo folder of historical data used for bootstrap as csv
         'jumps' : random dist-based "jumps" at different DTEs, represented by dict with keys (dte, dist, mean, sd, delta)
+        'antithetic' : draw paths in antithetic pairs (symmetric dists), see path_sampling.is_antithetic()
+        'control_variates' : adjust prices with control variates, see path_sampling.control_count()
+        'sampler' : 'sobol' for quasi-Monte Carlo paths, see path_sampling.sobol_innovations() (standard errors in
+                    get_errors() assume independent paths, use path_sampling.replicate_results() instead)
+        'engine' : 'numba' for compiled path kernels when Numba is installed, see path_sampling.engine()
+        'dtype' : 'float32' for single precision paths (statistics still summed in float64), see
+                  path_sampling.precision()
+    common_paths : bool
+        If True, simulates one set of paths and prices every strike from it (common random numbers),
+        otherwise simulates a new set of paths for each strike (default)
+    seed : numpy.random.SeedSequence
+        Seed of the table (from seed given as int, or fresh entropy if None), the same seed gives the same table
+        regardless of the number of workers; with separate paths, strike n uses child n of seed
+    executor : str or executor
+        Backend in ['serial', 'thread', 'process'] or executor to run path chunks on, see executor.get_executor()
+        (optional, default is the shared process pool)
+    target_iv_se : float
+        If given, times is a batch size and batches are added to each strike price until the standard error of its
+        out-of-the-money IV is at most target_iv_se (see adaptive_row_stats()), needs common_paths False
+    max_times : int
+        Most paths simulated for a strike price with target_iv_se (optional, default is 20 * times)
+    cache : bool
+        If True, reuses (and extends) path chunks cached on disk by earlier runs with the same parameters and seed,
+        see result_cache.run_cells(), ignored with a warning without seed or checkpoint (see result_cache.use_cache())
+        (optional, default is False)
+    checkpoint : str
+        File to write finished path chunks to while the table runs, a rerun with the same parameters and seed
+        resumes from it (an unseeded run keeps its seed there, see result_cache.run_seed()) and
+        result_cache.progress(checkpoint) reports progress (optional, default is no checkpoint)
+    metrics : metrics.Metrics
+        Phase timings, counters (paths, steps, IV iterations) and paths per second of each worker of the last
+        make_table(), see get_metrics()
+    sink : str or callable
+        Where to send metrics after each table, see metrics.Metrics.emit() (optional, default is nowhere)
+    trace_memory : bool
+        If True, metrics include the peak memory traced by tracemalloc (optional, default is False)
     """
 
-    def __init__(self, length, vol, start, times, strikes, dist='normal', **kwargs):
+    def __init__(self, length, vol, start, times, strikes, dist='normal', common_paths=False, seed=None,
+                 executor=None, target_iv_se=None, max_times=None, cache=False, checkpoint=None, sink=None,
+                 trace_memory=False, **kwargs):
         self.length, self.vol, self.start, self.times, self.index, self.dist, self.kwargs, self.df = length, vol, start, times, strikes, dist, kwargs, None
+        self.errors = None
+        self.common_paths = path_sampling.flag(common_paths)
+        self.seed = result_cache.run_seed(seed, checkpoint)
+        self.executor = executor
+        self.target_iv_se, self.max_times = adaptive_settings(times, self.common_paths, target_iv_se, max_times)
+        self.cache, self.checkpoint = result_cache.use_cache(cache, seed, checkpoint), checkpoint
+        self.metrics, self.sink, self.trace_memory = None, sink, path_sampling.flag(trace_memory)
         self.make_table()
 
-    def row(self, i):
+    def row(self, i, stream=0):
         """
         For internal use only
 
@@ -58,6 +212,8 @@ class CallPutTable:
         ----------
         i : float
             Strike price to get attributes for
+        stream : int
+            Index of the child of self.seed to simulate with
 
         Returns
         -------
@@ -65,37 +221,155 @@ class CallPutTable:
             Tuple of given strike price and array of format
             ['Call Price', 'Put Price', 'Call IV', 'Put IV', 'Avg RV', 'RV SD'])
         """
-        print('starting strike: ' + str(i))
-        output = path_sampling.all_including_rv(self.length, self.vol, self.start, self.times, i, self.dist, **self.kwargs)
-        ret = (i, np.insert(output, 2,
-                            [bs.bs_option_implied_vol('c', self.start, i, self.vol, 0, self.length, output[0]),
-                             bs.bs_option_implied_vol('p', self.start, i, self.vol, 0, self.length, output[1])]))
-        print('ending strike: ' + str(i))
-        return ret
+        output = path_sampling.all_including_rv(self.length, self.vol, self.start, self.times, i, self.dist,
+                                                seed=path_sampling.child_seed(self.seed, stream), **self.kwargs)
+        return self.row_from_output(self.length, self.vol, self.start, i, output)
+
+    @staticmethod
+    def row_from_output(length, vol, start, i, output):
+        """
+        For internal use only
+
+        Parameters
+        ----------
+        length, vol, start
+            Same as table attributes
+        i : float
+            Strike price
+        output : numpy.ndarray
+            Call price, put price, avg RV, RV sd for strike price (from path_sampling.all_including_rv())
+
+        Returns
+        -------
+        tuple
+            Same as row()
+        """
+        return CallPutTable.rows_from_outputs(length, vol, start, [i], [output])[0]
+
+    @staticmethod
+    def rows_from_outputs(length, vol, start, index, outputs):
+        """
+        For internal use only
+        Solves IVs for all strike prices at once, failed IVs are NaN (see bs.bs_option_implied_vol_array())
+
+        Parameters
+        ----------
+        length, vol, start
+            Same as table attributes
+        index : array-like
+            Strike prices
+        outputs : array-like
+            Call price, put price, avg RV, RV sd for each strike price (from path_sampling.all_including_rv())
+
+        Returns
+        -------
+        list
+            Tuples as returned by row()
+        """
+        outputs = np.asarray(outputs, dtype=float)
+        ivs, _ = bs.bs_option_implied_vol_array([['c', 'p']], start, np.asarray(index)[:, np.newaxis], vol, 0, length,
+                                                outputs[:, :2])
+        return [(i, np.insert(output, 2, iv)) for i, iv, output in zip(index, ivs, outputs)]
+
+    @staticmethod
+    def frame(index, rows, start):
+        """
+        For internal use only
+
+        Parameters
+        ----------
+        index : array-like
+            Strike prices
+        rows : list
+            Tuples as returned by row()
+        start : float
+            Starting, or current, security price
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table of strike prices along with attributes for each price
+        """
+        values = np.array([a[1] for a in rows], dtype=np.float64).reshape(-1, 6)
+        strikes = np.array([a[0] for a in rows], dtype=np.float64)
+        values = np.insert(values, 4, values[:, 0] - values[:, 1] + strikes - start, axis=1)
+        return pd.DataFrame(values, index=pd.Index(index, name='Strike'),
+                            columns=['Call Price', 'Put Price', 'Call IV', 'Put IV', 'C-P+X-$', 'Avg RV', 'RV SD'])
+
+    @staticmethod
+    def error_frame(index, errors, iv_errors, paths):
+        """
+        For internal use only
+
+        Parameters
+        ----------
+        index : array-like
+            Strike prices
+        errors : array-like
+            Standard errors of call and put prices, with and without variance reduction, for each strike price
+        iv_errors : array-like
+            Standard errors of call and put IVs for each strike price
+        paths : array-like
+            Number of paths for each strike price
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table of standard errors, see get_errors()
+        """
+        df = pd.DataFrame(np.column_stack([errors, iv_errors]).astype(np.float64), index=pd.Index(index, name='Strike'),
+                          columns=['Call SE', 'Put SE', 'Plain Call SE', 'Plain Put SE', 'Call IV SE', 'Put IV SE'])
+        df['Paths'] = np.asarray(paths, dtype=np.int64)
+        return df
 
     def make_table(self):
         """
         For internal use only
         Stores table as self.df
+        Every (strike, path chunk) pair is a separate task on self.executor, so all workers stay busy with few strikes
 
         Returns
         -------
         pandas.DataFrame
             Table of strike prices along with attributes for each price
         """
-        # print('running multi')
         mp.freeze_support()
+        self.metrics = metrics.Metrics()
+        with metrics.collect(self.metrics, self.trace_memory):
+            df = self._make_table()
+        self.metrics.emit(self.sink, table='CallPutTable')
+        return df
+
+    def _make_table(self):
+        """For internal use only, make_table() while collecting metrics"""
         index = self.index
-        # print('index - ' + str(index))
-        df = pd.DataFrame(index=index,
-                          columns=['Call Price', 'Put Price', 'Call IV', 'Put IV', 'C-P+X-$', 'Avg RV', 'RV SD'])
-        df.index.name = 'Strike'
-        pool = mp.Pool()
-        rows = pool.map(self.row, index)
-        pool.close()
-        pool.join()
-        for a in rows:
-            df.loc[a[0], :] = np.insert(a[1], 4, a[1][0] - a[1][1] + float(a[0]) - self.start)
+        args = (self.length, self.vol, self.start, self.times)
+        if self.common_paths:
+            stats = result_cache.run_cells(self.executor, path_sampling.strike_path_stats,
+                                           [(args + (index, self.dist), self.seed)], self.cache, self.checkpoint,
+                                           **self.kwargs)[0]
+            outputs = stats.result()
+            errors = np.hstack([stats.standard_errors(), stats.standard_errors(reduced=False)])
+            paths = np.full(len(index), stats.count)
+        else:
+            if self.target_iv_se is None:
+                stats = result_cache.run_cells(self.executor, path_sampling.strike_path_stats,
+                                               [(args + ([i], self.dist), path_sampling.child_seed(self.seed, n))
+                                                for n, i in enumerate(index)], self.cache, self.checkpoint,
+                                               **self.kwargs)
+            else:
+                stats = adaptive_row_stats([args + ([i], self.dist) for i in index], self.seed, self.target_iv_se,
+                                           self.max_times, self.executor, self.cache, self.checkpoint, **self.kwargs)
+            outputs = [strike_stats.result()[0] for strike_stats in stats]
+            errors = [np.append(strike_stats.standard_errors()[0], strike_stats.standard_errors(reduced=False)[0])
+                      for strike_stats in stats]
+            paths = np.array([strike_stats.count for strike_stats in stats])
+        rows = self.rows_from_outputs(self.length, self.vol, self.start, index, outputs)
+        ivs = np.array([row[1][2:4] for row in rows], dtype=float)
+        iv_errors = iv_standard_errors(self.start, np.asarray(index)[:, np.newaxis], self.length, ivs,
+                                       np.asarray(errors)[:, :2])
+        self.errors = self.error_frame(index, errors, iv_errors, paths)
+        df = self.frame(index, rows, self.start)
         self.df = df
         return df
 
@@ -131,10 +405,202 @@ class CallPutTable:
         """
         return self.df.copy()
 
+    def get_errors(self):
+        """
+        Returns
+        -------
+        pandas.DataFrame
+            Standard errors of call and put prices for each strike price, with variance reduction (same as plain
+            without) and of plain payoff averages of the same number of paths, standard errors of call and put IVs
+            (see iv_standard_errors()) and number of paths simulated
+        """
+        return self.errors.copy()
+
     def export_to_csv(self):
         """
         Exports table as csv into montecarlo/out
         """
-        print('exporting to call_put_table.csv')
         self.df.to_csv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
                                     'out', 'call_put_table.csv'))
+
+    def get_metrics(self):
+        """
+        Returns
+        -------
+        dict
+            Metrics of the table, see metrics.Metrics.as_dict()
+        """
+        return self.metrics.as_dict()
+
+    def metadata(self):
+        """
+        Returns
+        -------
+        dict
+            Parameters, seed, phase timings and metrics (see get_metrics()) of the table
+        """
+        return {'table': 'CallPutTable',
+                'params': {'length': self.length, 'vol': self.vol, 'start': self.start, 'times': self.times,
+                           'dist': self.dist, 'common_paths': self.common_paths, 'target_iv_se': self.target_iv_se,
+                           'max_times': self.max_times, 'kwargs': self.kwargs},
+                'seed': self.seed, 'timings': self.metrics.timings, 'metrics': self.metrics.as_dict()}
+
+    def export_to_npz(self, filename='call_put_table', inputs=None):
+        """
+        Exports table and its standard errors and path counts as float64 columns of a .npz file into montecarlo/out,
+        with metadata() (see result_file.save(), load with result_file.load())
+
+        Parameters
+        ----------
+        filename : str
+            Output file name, with or without .npz extension (optional, default is call_put_table)
+        inputs : dict
+            Inputs of the run to add to the metadata, e.g. the runner's input file (optional)
+        """
+        columns = {'Strike': np.asarray(self.df.index, dtype=np.float64)}
+        columns.update((name, self.df[name].to_numpy()) for name in self.df.columns)
+        columns.update((name, self.errors[name].to_numpy()) for name in self.errors.columns)
+        with metrics.collect(self.metrics), metrics.phase('io'):
+            result_file.save(result_file.out_filename(filename), columns, dict(self.metadata(), inputs=inputs))
+
+
+class CallPutSurface:
+    """
+    CallPutTable for each of several actual vols, all simulated from one set of innovations rescaled to each vol
+    (see path_sampling.surface_path_stats()), split into path chunks over one executor, or into one task per vol
+    when the paths fit in one chunk (each redraws the same innovations)
+
+    Attributes
+    ----------
+    length : int
+        Length of simulation in days
+    vols : array-like
+        Volatilities or standard deviations, annualized, to make tables for
+    start : float
+        Starting, or current, security price
+    times : int
+        Number of simulations to run (shared by every vol and strike price)
+    strikes : array-like
+        Strike prices to calculate with
+    dist : str
+        Type of distribution, see CallPutTable
+    **kwargs
+        Keyword arguments, see CallPutTable
+    seed : numpy.random.SeedSequence
+        Seed of the surface, see CallPutTable
+    executor : str or executor
+        Executor to run path chunks on, see CallPutTable
+    cache : bool
+        Use cached path chunks, see CallPutTable
+    checkpoint : str
+        Checkpoint file, see CallPutTable
+    metrics : metrics.Metrics
+        Metrics of the surface, see CallPutTable
+    sink : str or callable
+        Where to send metrics, see CallPutTable
+    trace_memory : bool
+        Trace peak memory, see CallPutTable
+    """
+
+    def __init__(self, length, vols, start, times, strikes, dist='normal', seed=None, executor=None, cache=False,
+                 checkpoint=None, sink=None, trace_memory=False, **kwargs):
+        self.length, self.vols, self.start, self.times, self.index, self.dist, self.kwargs = length, list(vols), start, times, strikes, dist, kwargs
+        self.seed = result_cache.run_seed(seed, checkpoint)
+        self.executor = executor
+        self.cache, self.checkpoint = result_cache.use_cache(cache, seed, checkpoint), checkpoint
+        self.tables, self.errors = None, None
+        self.metrics, self.sink, self.trace_memory = None, sink, path_sampling.flag(trace_memory)
+        self.make_surface()
+
+    def make_surface(self):
+        """
+        For internal use only
+        Stores tables as self.tables (one per vol, same order as self.vols)
+        Chunks are merged in order, so tables do not depend on the number of workers
+        """
+        mp.freeze_support()
+        self.metrics = metrics.Metrics()
+        with metrics.collect(self.metrics, self.trace_memory):
+            self._make_surface()
+        self.metrics.emit(self.sink, table='CallPutSurface')
+
+    def _make_surface(self):
+        """For internal use only, make_surface() while collecting metrics"""
+        # one chunk would be a single task, so each vol gets its own (same seed, same innovations, so same paths)
+        groups = [[vol] for vol in self.vols] if len(path_sampling.chunks(self.times)) == 1 else [self.vols]
+        stats = [vol_stats for cell_stats in result_cache.run_cells(
+            self.executor, path_sampling.surface_path_stats,
+            [((self.length, vols, self.start, self.times, self.index, self.dist), self.seed) for vols in groups],
+            self.cache, self.checkpoint, **self.kwargs) for vol_stats in cell_stats]
+        self.tables, self.errors = [], []
+        strikes = np.asarray(self.index)[:, np.newaxis]
+        for vol, vol_stats in zip(self.vols, stats):
+            rows = CallPutTable.rows_from_outputs(self.length, vol, self.start, self.index, vol_stats.result())
+            errors = np.hstack([vol_stats.standard_errors(), vol_stats.standard_errors(reduced=False)])
+            ivs = np.array([row[1][2:4] for row in rows], dtype=float)
+            iv_errors = iv_standard_errors(self.start, strikes, self.length, ivs, errors[:, :2])
+            self.tables.append(CallPutTable.frame(self.index, rows, self.start))
+            self.errors.append(CallPutTable.error_frame(self.index, errors, iv_errors,
+                                                        np.full(len(self.index), vol_stats.count)))
+
+    def get_table(self, vol):
+        """
+        Parameters
+        ----------
+        vol : float
+            One of self.vols
+
+        Returns
+        -------
+        pandas.DataFrame
+            Copy of table for vol, same format as CallPutTable
+        """
+        return self.tables[int(np.argmin(np.abs(np.asarray(self.vols) - vol)))].copy()
+
+    def get_errors(self, vol):
+        """
+        Parameters
+        ----------
+        vol : float
+            One of self.vols
+
+        Returns
+        -------
+        pandas.DataFrame
+            Copy of standard errors for vol, same format as CallPutTable.get_errors()
+        """
+        return self.errors[int(np.argmin(np.abs(np.asarray(self.vols) - vol)))].copy()
+
+    def get_metrics(self):
+        """
+        Returns
+        -------
+        dict
+            Metrics of the surface, see metrics.Metrics.as_dict()
+        """
+        return self.metrics.as_dict()
+
+    def export_to_npz(self, filename='call_put_surface', inputs=None):
+        """
+        Exports every table of the surface as float64 columns of a .npz file into montecarlo/out, each column a
+        len(vols) x len(strikes) array, with metadata as CallPutTable.export_to_npz()
+
+        Parameters
+        ----------
+        filename : str
+            Output file name, with or without .npz extension (optional, default is call_put_surface)
+        inputs : dict
+            Inputs of the run to add to the metadata (optional)
+        """
+        columns = {'Strike': np.asarray(self.index, dtype=np.float64), 'Vol': np.asarray(self.vols, dtype=np.float64)}
+        for name in self.tables[0].columns:
+            columns[name] = np.array([table[name].to_numpy() for table in self.tables])
+        for name in self.errors[0].columns:
+            columns[name] = np.array([errors[name].to_numpy() for errors in self.errors])
+        metadata = {'table': 'CallPutSurface',
+                    'params': {'length': self.length, 'vols': self.vols, 'start': self.start, 'times': self.times,
+                               'dist': self.dist, 'kwargs': self.kwargs},
+                    'seed': self.seed, 'timings': self.metrics.timings, 'metrics': self.metrics.as_dict(),
+                    'inputs': inputs}
+        with metrics.collect(self.metrics), metrics.phase('io'):
+            result_file.save(result_file.out_filename(filename), columns, metadata)
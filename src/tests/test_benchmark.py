@@ -0,0 +1,32 @@
+import unittest
+import os
+import tempfile
+import json
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run(self):
+        names = [name for name, _, _ in benchmark.benchmarks(quick=True)]
+        for name in ['path_bootstrap_jumps', 'rv', 'all_including_rv', 'call_put_table', 'time_table',
+                     'iv_solver_100']:
+            self.assertTrue(name in names)
+        report = benchmark.run(quick=True, only=['rv', 'iv_solver_100'], repeat=1)
+        self.assertEqual(sorted(report['results']), ['iv_solver_100', 'rv'])
+        self.assertTrue(report['results']['rv']['seconds'] > 0)
+        slower = json.loads(json.dumps(report))
+        slower['results']['rv']['seconds'] *= 2
+        self.assertEqual(benchmark.compare(slower, report)['regressions'], ['rv'])
+        self.assertEqual(benchmark.compare(report, slower)['regressions'], [])
+        self.assertRaises(ValueError, benchmark.compare, report, dict(report, quick=False))
+        with tempfile.TemporaryDirectory() as tmp:
+            output, baseline = os.path.join(tmp, 'out.json'), os.path.join(tmp, 'baseline.json')
+            argv = ['--quick', '--only', 'rv', '--repeat', '1', '--output', output, '--baseline', baseline]
+            self.assertEqual(benchmark.main(argv + ['--save-baseline']), 0)
+            self.assertEqual(benchmark.main(argv + ['--tolerance', '100']), 0)
+            with open(output) as f:
+                self.assertEqual(list(json.load(f)['comparison']['ratios']), ['rv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
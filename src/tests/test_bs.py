@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import bs
 
 
@@ -29,6 +30,53 @@ class TestBS(unittest.TestCase):
         self.assertTrue(bs.bs_option_implied_vol('C', 101, 90, .32, 0, 50, 12.5353) - 0.31420288351383 < 10e-8)
         self.assertTrue(bs.bs_option_implied_vol('P', 101, 90, .32, 0, 50, .535) - 0.218304232561594 < 10e-8)
 
+    def test_array_functions(self):
+        np.random.seed(0)
+        n = 500
+        args = (np.random.choice(['C', 'call', 'P', 'put '], n), np.random.uniform(50, 150, n),
+                np.random.uniform(50, 150, n), np.random.choice([0, .01, .32, 2], n), np.random.choice([0, .05], n),
+                np.random.choice([-1, 0, 1, 50, 252], n), np.random.choice([True, False], n))
+        for scalar, array in [(bs.bs_option_price, bs.bs_option_price_array),
+                              (bs.bs_option_delta, bs.bs_option_delta_array),
+                              (bs.bs_option_gamma, bs.bs_option_gamma_array),
+                              (bs.bs_option_vega, bs.bs_option_vega_array),
+                              (bs.bs_option_rho, bs.bs_option_rho_array)]:
+            expected = np.array([scalar(*a) for a in zip(*args)])
+            self.assertTrue(np.max(np.abs(array(*args) - expected)) < 1e-10)
+        self.assertEqual(bs.bs_option_price_array('C', 101, [90, 100, 110], .32, 0, 50).shape, (3,))
+        self.assertEqual(bs.bs_option_delta_array('stock', 101, 90, .32, 0, 50), 1.0)
+
+    def test_implied_vol_array(self):
+        ivs, status = bs.bs_option_implied_vol_array(['C', 'P'], 101, 90, .32, 0, 50, [12.5353, .535])
+        self.assertTrue(np.all(np.abs(ivs - [0.31420288351383, 0.218304232561594]) < 10e-8))
+        self.assertTrue(np.all(status == bs.IV_CONVERGED))
+        np.random.seed(0)
+        n = 1000
+        option_type = np.random.choice(['c', 'p'], n)
+        strike = np.random.uniform(80, 125, n)
+        vol = np.random.uniform(.1, 2, n)
+        days = np.random.randint(10, 500, n)
+        prices = bs.bs_option_price_array(option_type, 100, strike, vol, .01, days)
+        ivs, status = bs.bs_option_implied_vol_array(option_type, 100, strike, .25, .01, days, prices)
+        self.assertTrue(np.all(status == bs.IV_CONVERGED))
+        self.assertTrue(np.max(np.abs(ivs - vol)) < 1e-6)
+        ivs, status = bs.bs_option_implied_vol_array('c', 100, 90, .25, 0, [50, 50, 50, 0], [5, 0, 200, 12])
+        self.assertTrue(np.all(np.isnan(ivs)))
+        self.assertEqual(list(status), [bs.IV_OUT_OF_BOUNDS] * 3 + [bs.IV_EXPIRED])
+
+    def test_implied_vol_table(self):
+        self.assertEqual(bs.iv_table().shape, (bs.IV_TABLE_X[2], bs.IV_TABLE_Y[2]))
+        np.random.seed(1)
+        n = 1000
+        option_type = np.random.choice(['c', 'p'], n)
+        strike = np.random.uniform(80, 125, n)
+        vol = np.random.uniform(.1, 2, n)
+        days = np.random.randint(10, 500, n)
+        prices = bs.bs_option_price_array(option_type, 100, strike, vol, .01, days)
+        ivs, status = bs.bs_option_implied_vol_array(option_type, 100, strike, .25, .01, days, prices, method='table')
+        self.assertTrue(np.all(status == bs.IV_CONVERGED))
+        self.assertTrue(np.max(np.abs(ivs - vol)) < 1e-6)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+import concurrent.futures
+import operator
+import os
+import executor
+
+
+class TestExecutor(unittest.TestCase):
+    def test_backends(self):
+        tasks = [(i, i + 1) for i in range(20)]
+        for backend in executor.BACKENDS:
+            self.assertEqual(executor.starmap(backend, operator.mul, tasks), [a * b for a, b in tasks])
+        self.assertTrue(executor.get_executor('thread', 2) is executor.get_executor('thread', '2'))
+        self.assertEqual(executor.starmap('serial', operator.mul, []), [])
+        self.assertRaises(ValueError, executor.get_executor, 'gpu')
+
+    def test_broken_pool(self):
+        tasks = [(i, i + 1) for i in range(4)]
+        with self.assertRaises(concurrent.futures.process.BrokenProcessPool):
+            executor.starmap('process', os._exit, [(1,)])  # worker dies
+        self.assertEqual(executor.starmap('process', operator.mul, tasks), [a * b for a, b in tasks])
+
+
+if __name__ == '__main__':
+    unittest.main()
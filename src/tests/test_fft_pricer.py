@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import bs
+import fft_pricer
+import path_sampling
+import strike_table
+
+
+class TestFFTPricer(unittest.TestCase):
+    def test_normal(self):
+        index = strike_table.CallPutTable.get_index(100, 30, 12)
+        table = fft_pricer.reference_table(60, .25, 100, index, 'normal')
+        expected = bs.bs_option_price_array('c', 100, index.astype(float), .25, 0, 60)
+        self.assertTrue(np.allclose(table.loc[:, 'Call Price'].values, expected, atol=1e-5))
+        self.assertTrue(np.allclose(table.loc[:, 'Put IV'].values, .25, atol=1e-4))
+        self.assertTrue(np.allclose(table.loc[:, 'C-P+X-$'].values, 0, atol=1e-6))
+        self.assertTrue(np.array_equal(fft_pricer.prices(60, .25, 100, index, 'double-bell', delta=1),
+                                       fft_pricer.prices(60, .25, 100, index, 'normal')))
+
+    def test_density(self):
+        jumps = "[{'dte': 20, 'dist': '%s', 'mean': .01, 'sd': .6, 'delta': .02, 'skew_a': 2}]"
+        for dist, kwargs in [('uniform', {}), ('skewnorm', {'skew_a': 3}), ('bootstrap', {'bs_data': 'spec/stkPx.csv'})]:
+            for jump in ['normal', 'uniform', 'double-bell', 'skewnorm']:
+                kwargs['jumps'] = jumps % jump
+                x, f = fft_pricer.density(60, .25, dist, **kwargs)
+                dx = x[1] - x[0]
+                self.assertTrue(abs(np.sum(f) * dx - 1) < 1e-9)
+                forward = path_sampling.forward(60, .25, 100, dist, **kwargs)
+                self.assertTrue(abs(np.sum(100 * np.exp(x) * f) * dx / forward - 1) < 1e-6)
+
+    def test_check(self):
+        jumps = "[{'dte': 20, 'dist': 'skewnorm', 'mean': 0, 'sd': .6, 'delta': 0, 'skew_a': 2}]"
+        table = strike_table.CallPutTable(60, .25, 100, 20000, [85, 100, 115], 'uniform', common_paths=True, seed=1,
+                                          executor='serial', jumps=jumps)
+        z = fft_pricer.check(table).loc[:, ['Call Z', 'Put Z']].values
+        self.assertTrue(np.all(np.abs(z) < 4))
+        table = strike_table.CallPutTable(1, .25, 100, 100000, [97, 100, 103], 'bootstrap', common_paths=True, seed=2,
+                                          executor='serial', bs_data='spec/stkPx.csv')
+        z = fft_pricer.check(table).loc[:, ['Call Z', 'Put Z']].values
+        self.assertTrue(np.all(np.abs(z) < 4))
+        _, drift = path_sampling.scale_and_drift(.25, 'bootstrap')
+        history = path_sampling.historical_log_returns('spec/stkPx.csv') + drift
+        expected = np.mean(np.maximum(100 * np.exp(history)[:, np.newaxis] - [97, 100, 103], 0), axis=0)
+        self.assertTrue(np.allclose(fft_pricer.prices(1, .25, 100, [97, 100, 103], 'bootstrap',
+                                                      bs_data='spec/stkPx.csv')[:, 0], expected, atol=1e-6))
+        self.assertRaises(ValueError, fft_pricer.prices, 60, .25, 100, [100], 'garch')
+        self.assertRaises(ValueError, fft_pricer.prices, 60, .25, 100, [100], 'skewnorm')
+
+
+if __name__ == '__main__':
+    unittest.main()
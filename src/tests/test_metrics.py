@@ -0,0 +1,53 @@
+import unittest
+import json
+import os
+import tempfile
+import metrics
+import strike_table
+from plot import iv_time_plot
+
+
+class TestMetrics(unittest.TestCase):
+    def test_collect(self):
+        outer = metrics.Metrics()
+        with metrics.collect(outer, trace_memory=True):
+            with metrics.phase('io'):
+                bytearray(2 ** 20)
+            metrics.count('paths', 5)
+            result, task = metrics.timed_call(metrics.count, 'paths', 7)
+            metrics.add(task)
+        self.assertEqual(outer.counters['paths'], 12)
+        self.assertEqual(list(task.workers.values())[0]['paths'], 7)
+        self.assertTrue(outer.timings['io'] > 0 and outer.wall >= outer.timings['io'])
+        self.assertTrue(outer.peak_memory >= 2 ** 20)
+        with metrics.phase('io'):
+            metrics.count('paths')  # nothing collecting
+        self.assertEqual(outer.counters['paths'], 12)
+        records = []
+        outer.emit(records.append, table='test')
+        self.assertEqual((records[0]['table'], records[0]['counters']['paths']), ('test', 12))
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'metrics.json')
+            outer.emit(filename)
+            outer.emit(filename)
+            with open(filename) as f:
+                self.assertEqual(len([json.loads(line) for line in f]), 2)
+        self.assertRaises(ValueError, outer.emit, 'stdout')
+
+    def test_tables(self):
+        records = []
+        table = strike_table.CallPutTable(20, .25, 100, 3000, [90, 100, 110], seed=1, executor='serial',
+                                          sink=records.append)
+        counters = table.get_metrics()['counters']
+        self.assertEqual((counters['paths'], counters['steps']), (9000, 9000 * 20))
+        self.assertTrue(counters['iv_iterations'] > 0)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(sum(worker['tasks'] for worker in records[0]['workers'].values()), 3)
+        self.assertTrue(all(table.get_metrics()['timings'][phase] > 0 for phase in ['rng', 'paths', 'pricing', 'iv']))
+        time_table = iv_time_plot.TimeTable([10, 20], .25, 100, 3000, 100, seed=1, executor='serial',
+                                            common_paths=True)
+        self.assertEqual(time_table.get_metrics()['counters']['steps'], 3000 * 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
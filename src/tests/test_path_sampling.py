@@ -0,0 +1,227 @@
+import unittest
+import warnings
+import numpy as np
+import path_sampling
+import path_kernels
+import bs
+
+
+class TestPathSampling(unittest.TestCase):
+    def test_path_shape(self):
+        self.assertEqual(path_sampling.path(100, .25, 100, 1, 'normal').shape, (101,))
+        self.assertEqual(path_sampling.path(100, .25, 100, 50, 'normal').shape, (50, 101))
+        self.assertTrue(np.all(path_sampling.path(100, .25, 100, 50, 'uniform')[:, 0] == 100))
+
+    def test_path_dists(self):
+        for dist, kwargs in [('normal', {}), ('uniform', {}), ('double-bell', {'delta': 2})]:
+            paths = path_sampling.path(50, .25, 100, 20000, dist, rng=0, **kwargs)
+            self.assertTrue(abs(np.mean(paths[:, -1]) - 100) < 1)
+            self.assertTrue(abs(np.mean(path_sampling.rv(paths)) - .25) < .005)
+        self.assertEqual(path_sampling.path(50, .25, 100, 10, 'skewnorm', skew_a=3).shape, (10, 51))
+
+    def test_rv(self):
+        p = np.array([100, 101, 100, 102])
+        expected = np.sqrt(np.mean(np.log(p[1:] / p[:-1]) ** 2) * 252)
+        self.assertTrue(abs(path_sampling.rv(p)[0] - expected) < 1e-12)
+        self.assertTrue(abs(path_sampling.rv([p, p])[1] - expected) < 1e-12)
+
+    def test_all_including_rv(self):
+        call, put, avg_rv, rv_sd = path_sampling.all_including_rv(50, .25, 100, 20000, 100, 'normal', seed=0)
+        self.assertTrue(abs(call - put) < .5)  # put-call parity at the money
+        self.assertTrue(abs(avg_rv - .25) < .005)
+        self.assertTrue(rv_sd > 0)
+
+    def test_bootstrap(self):
+        history = path_sampling.historical_log_returns('spec/stkPx.csv')
+        self.assertTrue(history is path_sampling.historical_log_returns('spec/stkPx.csv'))
+        self.assertEqual(history.dtype, np.float64)
+        paths = path_sampling.path(20, .25, 100, 100, 'bootstrap', bs_data='spec/stkPx.csv')
+        returns = np.log(paths[:, 1:] / paths[:, :-1]) + .5 * (.25 / np.sqrt(252)) ** 2
+        self.assertTrue(np.all(np.min(np.abs(returns.reshape(-1, 1) - history), axis=1) < 1e-9))
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 5, 'bootstrap')
+
+    def test_jumps(self):
+        jumps = "[{'dte': 50, 'dist': 'normal', 'mean': 0, 'sd': .6, 'delta': 0, 'skew_a': 0}]"
+        schedule = path_sampling.jump_schedule(jumps, 100)
+        self.assertEqual(len(schedule), 1)
+        self.assertEqual(schedule[0].day, 48)
+        self.assertEqual(path_sampling.jump_schedule(jumps, 10), ())
+        paths = path_sampling.path(100, .25, 100, 20000, 'normal', rng=0, jumps=jumps)
+        sds = np.std(np.log(paths[:, 1:] / paths[:, :-1]), axis=0)
+        self.assertTrue(abs(sds[48] - np.sqrt(.6 ** 2 + .25 ** 2) / np.sqrt(252)) < .001)
+        self.assertTrue(abs(sds[47] - .25 / np.sqrt(252)) < .001)
+        self.assertRaises(ValueError, path_sampling.jump_schedule, [{'dte': 5, 'dist': 'bootstrap', 'sd': 1}], 10)
+
+    def test_surface(self):
+        jumps = "[{'dte': 20, 'dist': 'normal', 'mean': 0, 'sd': .6, 'delta': 0, 'skew_a': 0}]"
+        for dist, kwargs in [('normal', {'jumps': jumps}), ('skewnorm', {'skew_a': 3}),
+                             ('bootstrap', {'bs_data': 'spec/stkPx.csv'})]:
+            surface = path_sampling.all_including_rv_surface(50, [.15, .25], 100, 500, [90, 100, 110], dist, seed=1,
+                                                             **kwargs)
+            table = path_sampling.all_including_rv_strikes(50, .25, 100, 500, [90, 100, 110], dist, seed=1, **kwargs)
+            self.assertEqual(surface.shape, (2, 3, 4))
+            self.assertTrue(np.allclose(surface[1], table, rtol=1e-10, atol=1e-10))
+
+    def test_lengths(self):
+        jumps = "[{'dte': 20, 'dist': 'normal', 'mean': 0, 'sd': 3, 'delta': 0, 'skew_a': 0}]"
+        out = path_sampling.all_including_rv_lengths([10, 30, 60], .25, 100, 20000, 100, 'normal', seed=0, jumps=jumps)
+        self.assertEqual(out.shape, (3, 4))
+        for length, row in zip([10, 30, 60], out):
+            expected = path_sampling.all_including_rv(length, .25, 100, 20000, 100, 'normal', seed=1, jumps=jumps)
+            self.assertTrue(np.all(np.abs(row - expected) / expected < .05))
+        same_paths = path_sampling.all_including_rv(60, .25, 100, 20000, 100, 'normal', seed=0, jumps=jumps)
+        self.assertTrue(np.allclose(out[2], same_paths, rtol=1e-10, atol=1e-10))
+        self.assertRaises(ValueError, path_sampling.all_including_rv_lengths, [0, 10], .25, 100, 10, 100, 'normal')
+
+    def test_seed(self):
+        jumps = "[{'dte': 20, 'dist': 'double-bell', 'mean': 0, 'sd': .6, 'delta': 1, 'skew_a': 0}]"
+        times = 2 * path_sampling.CHUNK_SIZE + 123
+        whole = path_sampling.strike_path_stats(30, .25, 100, times, [90, 110], 'skewnorm', seed=7, skew_a=3,
+                                                jumps=jumps)
+        # one chunk at a time, as split between workers
+        merged = path_sampling.strike_path_stats(30, .25, 100, times, [90, 110], 'skewnorm', seed=7, chunk_ids=[],
+                                                 skew_a=3, jumps=jumps)
+        for c in range(len(path_sampling.chunks(times))):
+            merged.merge(path_sampling.strike_path_stats(30, .25, 100, times, [90, 110], 'skewnorm', seed=7,
+                                                         chunk_ids=[c], skew_a=3, jumps=jumps))
+        self.assertTrue(np.array_equal(whole.result(), merged.result()))
+        other = path_sampling.strike_path_stats(30, .25, 100, times, [90, 110], 'skewnorm', seed=8, skew_a=3)
+        self.assertFalse(np.array_equal(whole.result(), other.result()))
+        self.assertTrue(np.array_equal(path_sampling.path(20, .25, 100, 3, 'uniform', rng=5),
+                                       path_sampling.path(20, .25, 100, 3, 'uniform', rng=np.random.default_rng(5))))
+        self.assertTrue(np.array_equal(path_sampling.single_path(20, .25, 100, 'normal', rng=5),
+                                       path_sampling.single_path(20, .25, 100, 'normal', rng=5)))
+        self.assertEqual(path_sampling.child_seed(3, 2).generate_state(4).tolist(),
+                         np.random.SeedSequence(3).spawn(3)[2].generate_state(4).tolist())
+
+    def test_sobol(self):
+        x = np.random.default_rng(0).standard_normal((20000, 37))
+        increments = path_sampling.brownian_bridge(x)
+        self.assertTrue(np.allclose(increments.sum(axis=1), np.sqrt(37) * x[:, 0]))
+        self.assertTrue(np.all(np.abs(increments.std(axis=0) - 1) < .03))
+        exact = bs.bs_option_price('c', 100, 110, .25, 0, 100)
+        for dist, kwargs in [('normal', {}), ('uniform', {}), ('double-bell', {'delta': 1}), ('skewnorm', {'skew_a': 3}),
+                             ('bootstrap', {'bs_data': 'spec/stkPx.csv'})]:
+            result, errors = path_sampling.replicate_results(100, .25, 100, 1024, [110], dist, replicates=4, seed=1,
+                                                             sampler='sobol', **kwargs)
+            plain = path_sampling.strike_path_stats(100, .25, 100, 4096, [110], dist, seed=1, **kwargs)
+            self.assertTrue(np.all(errors <= plain.standard_errors()))
+            self.assertTrue(np.all(np.abs(result[:, :2] - plain.result()[:, :2]) <= 4 * plain.standard_errors()))
+            if dist == 'normal':
+                self.assertTrue(abs(result[0, 0] - exact) < plain.standard_errors()[0, 0] / 10)
+                self.assertTrue(np.all(errors < plain.standard_errors() / 10))
+        times = path_sampling.CHUNK_SIZE + 2 ** 10
+        whole = path_sampling.strike_path_stats(30, .25, 100, times, [100], 'uniform', seed=2, sampler='sobol')
+        merged = path_sampling.strike_path_stats(30, .25, 100, times, [100], 'uniform', seed=2, chunk_ids=[0],
+                                                 sampler='sobol')
+        merged.merge(path_sampling.strike_path_stats(30, .25, 100, times, [100], 'uniform', seed=2, chunk_ids=[1],
+                                                     sampler='sobol'))
+        self.assertTrue(np.array_equal(whole.result(), merged.result()))
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 4, 'normal', sampler='halton')
+
+    def test_engine(self):
+        # the kernel runs as plain Python without Numba, so it is checked against the numpy engine at small sizes
+        jumps = "[{'dte': 5, 'dist': '%s', 'mean': .01, 'sd': .6, 'delta': .02, 'skew_a': 2}]"
+        for dist, kwargs in [('normal', {}), ('uniform', {}), ('double-bell', {'delta': 1}),
+                             ('skewnorm', {'skew_a': 3}), ('bootstrap', {'bs_data': 'spec/stkPx.csv'})]:
+            kwargs = dict(kwargs, jumps=jumps % (dist if dist != 'bootstrap' else 'normal'))
+            ends, rvs, paths = path_sampling.kernel_block(20, .25, 100, 4000, dist, 0, True, **kwargs)
+            self.assertTrue(np.allclose(paths[:, -1], ends) and np.allclose(path_sampling.rv(paths), rvs))
+            self.assertTrue(np.all(paths[:, 0] == 100))
+            expected = path_sampling.path(20, .25, 100, 4000, dist, rng=0, **kwargs)
+            self.assertTrue(abs(np.mean(ends) - np.mean(expected[:, -1])) < 1)
+            self.assertTrue(abs(np.mean(rvs) - np.mean(path_sampling.rv(expected))) < .01)
+        again = path_sampling.kernel_block(20, .25, 100, 10, 'normal', 0)
+        self.assertTrue(np.array_equal(again[0], path_sampling.kernel_block(20, .25, 100, 10, 'normal', 0)[0]))
+        self.assertEqual(path_sampling.engine('normal'), 'numpy')
+        with warnings.catch_warnings():  # falls back either way
+            warnings.simplefilter('ignore')
+            self.assertEqual(path_sampling.engine('normal', engine='numba', antithetic=True), 'numpy')
+        if not path_kernels.AVAILABLE:
+            with self.assertWarns(UserWarning):
+                fallback = path_sampling.all_including_rv(20, .25, 100, 500, 100, 'normal', seed=1, engine='numba')
+            self.assertTrue(np.array_equal(fallback, path_sampling.all_including_rv(20, .25, 100, 500, 100, 'normal',
+                                                                                    seed=1)))
+        self.assertRaises(ValueError, path_sampling.engine, 'normal', engine='cuda')
+
+    def test_dtype(self):
+        self.assertEqual(path_sampling.path(20, .25, 100, 10, 'uniform', dtype='float32').dtype, np.float32)
+        self.assertEqual(path_sampling.precision(dtype=np.float32), np.float32)
+        for dist, kwargs in [('skewnorm', {'skew_a': 3}), ('bootstrap', {'bs_data': 'spec/stkPx.csv'})]:
+            # same draws, rounded to single precision
+            double = path_sampling.all_including_rv_strikes(50, .25, 100, 3000, [90, 100], dist, seed=1, **kwargs)
+            single = path_sampling.all_including_rv_strikes(50, .25, 100, 3000, [90, 100], dist, seed=1,
+                                                            dtype='float32', **kwargs)
+            self.assertEqual(single.dtype, np.float64)
+            self.assertTrue(np.allclose(single, double, rtol=1e-5, atol=1e-5))
+            surface = path_sampling.all_including_rv_surface(50, [.25], 100, 3000, [90, 100], dist, seed=1,
+                                                             dtype='float32', **kwargs)
+            self.assertTrue(np.allclose(surface[0], double, rtol=1e-5, atol=1e-5))
+        call, put, avg_rv, _ = path_sampling.all_including_rv(50, .25, 100, 20000, 100, 'normal', seed=0,
+                                                              dtype='float32')
+        self.assertTrue(abs(call - put) < .5 and abs(avg_rv - .25) < .005)
+        returns = path_sampling.log_returns(2520, .25, 2000, 'normal', np.random.default_rng(2), dtype='float32')
+        paths = path_sampling.path_block(2520, .25, 100, 2000, 'normal', np.random.default_rng(2), dtype='float32')
+        self.assertTrue(np.allclose(paths[:, 1:], 100 * np.exp(np.cumsum(returns, axis=1, dtype=np.float64)),
+                                    rtol=1e-6, atol=0))  # log-prices summed in float64
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 5, 'normal', dtype='float16')
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 5, 'normal', dtype='double-ish')
+
+    def test_stochastic_vol(self):
+        jumps = "[{'dte': 20, 'dist': 'normal', 'mean': 0, 'sd': .6, 'delta': 0, 'skew_a': 0}]"
+        for dist in ['garch', 'heston']:
+            paths = path_sampling.path(60, .25, 100, 20000, dist, rng=0, vol0=.3)
+            self.assertTrue(abs(np.mean(paths[:, -1]) - 100) < 1)  # martingale
+            self.assertTrue(.25 < np.mean(path_sampling.rv(paths)) < .3)  # reverting from vol0 to vol
+            self.assertEqual(path_sampling.forward(60, .25, 100, dist), 100)
+            surface = path_sampling.all_including_rv_surface(60, [.15, .25], 100, 500, [90, 110], dist, seed=1,
+                                                             jumps=jumps)
+            table = path_sampling.all_including_rv_strikes(60, .25, 100, 500, [90, 110], dist, seed=1, jumps=jumps)
+            self.assertTrue(np.allclose(surface[1], table))
+            lengths = path_sampling.all_including_rv_lengths([30, 60], .25, 100, 500, 110, dist, seed=1, jumps=jumps)
+            self.assertTrue(np.allclose(lengths[1], table[1]))
+            # every length starts from vol0, not from where the longest paths' variance has moved to
+            lengths = path_sampling.all_including_rv_lengths([10, 120], .2, 100, 20000, 100, dist, seed=1, vol0=.6)
+            short = path_sampling.all_including_rv(10, .2, 100, 20000, 100, dist, seed=2, vol0=.6)
+            self.assertTrue(np.allclose(lengths[0, :2], short[:2], atol=.15) and abs(lengths[0, 2] - short[2]) < .01)
+            horizons = path_sampling.horizon_path_stats([10, 120], .2, 100, 20000, 100, dist, seed=1, vol0=.6)
+            self.assertTrue(np.allclose(horizons[0].result()[0, :2], lengths[0, :2]))
+        # negative correlation of variance and price skews the smile down
+        calls = path_sampling.all_including_rv_strikes(60, .25, 100, 20000, [80, 120], 'heston', seed=2)[:, 0]
+        ivs = bs.bs_option_implied_vol_array('c', 100, np.array([80.0, 120.0]), .25, 0, 60, calls)[0]
+        self.assertTrue(ivs[0] > ivs[1] + .03)
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 5, 'garch', alpha=.2, beta=.8)
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 5, 'heston', rho='-1.5')
+        with self.assertRaisesRegex(ValueError, 'not supported with garch'):
+            path_sampling.path(10, .25, 100, 4, 'garch', sampler='sobol')
+
+    def test_observations(self):
+        jumps = "[{'dte': 20, 'dist': 'normal', 'mean': 0, 'sd': .6, 'delta': 0, 'skew_a': 0}]"
+        for dist, kwargs in [('normal', {'jumps': jumps}), ('uniform', {}), ('skewnorm', {'skew_a': 3})]:
+            prices = path_sampling.observations(80, .25, 100, 20000, dist, [0, 10, 80], rng=0, **kwargs)
+            self.assertEqual(prices.shape, (20000, 3))
+            self.assertTrue(np.all(prices[:, 0] == 100))
+            expected = path_sampling.path(80, .25, 100, 20000, dist, rng=1, **kwargs)[:, [10, 80]]
+            self.assertTrue(np.all(np.abs(np.mean(prices[:, 1:], axis=0) - np.mean(expected, axis=0)) < .5))
+            sds = np.std(np.log(prices[:, 1:]), axis=0) / np.std(np.log(expected), axis=0)
+            self.assertTrue(np.all(np.abs(sds - 1) < .03))
+        self.assertEqual(path_sampling.ends(30, .25, 100, 7, 'double-bell', delta=1).shape, (7,))
+        self.assertTrue(np.array_equal(path_sampling.observations(20, .25, 100, 5, 'garch', [5, 20], rng=2),
+                                       path_sampling.path(20, .25, 100, 5, 'garch', rng=2)[:, [5, 20]]))
+        self.assertRaises(ValueError, path_sampling.observations, 20, .25, 100, 5, 'normal', [10, 5])
+        self.assertRaises(ValueError, path_sampling.observations, 20, .25, 100, 5, 'normal', [30])
+        horizons = path_sampling.horizon_path_stats([60, 30], .25, 100, 20000, 100, 'normal', seed=1, jumps=jumps)
+        lengths = path_sampling.all_including_rv_lengths([60, 30], .25, 100, 20000, 100, 'normal', seed=1,
+                                                         jumps=jumps)
+        for stats, expected in zip(horizons, lengths):
+            self.assertTrue(np.allclose(stats.result()[0, :2], expected[:2], atol=.2))
+            self.assertTrue(np.isnan(stats.result()[0, 2]))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 0, 'normal')
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 5, 'lognormal')
+        self.assertRaises(ValueError, path_sampling.path, 10, .25, 100, 5, 'double-bell')
+
+
+if __name__ == '__main__':
+    unittest.main()
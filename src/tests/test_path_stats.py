@@ -0,0 +1,56 @@
+import unittest
+import tracemalloc
+import numpy as np
+import path_sampling
+from path_stats import PathStats
+
+
+class TestPathStats(unittest.TestCase):
+    def test_chunked_matches_direct(self):
+        np.random.seed(0)
+        ends = np.random.lognormal(4.6, .2, 1000)
+        rvs = np.random.uniform(.2, .3, 1000)
+        strikes = [90, 100, 110]
+        stats = PathStats(strikes)
+        for c in range(0, 1000, 137):
+            stats.update(ends[c:c + 137], rvs[c:c + 137])
+        self.assertEqual(stats.count, 1000)
+        calls = np.maximum(ends[:, np.newaxis] - strikes, 0)
+        expected = np.column_stack([calls.mean(axis=0), np.maximum(np.array(strikes) - ends[:, np.newaxis], 0).mean(axis=0),
+                                    np.full(3, rvs.mean()), np.full(3, rvs.std())])
+        self.assertTrue(np.allclose(stats.result(), expected, rtol=1e-12, atol=1e-12))
+        self.assertTrue(np.allclose(stats.standard_errors()[:, 0], calls.std(axis=0, ddof=1) / np.sqrt(1000)))
+
+    def test_streaming_memory(self):
+        tracemalloc.start()
+        stats = path_sampling.strike_path_stats(50, .25, 100, 50000, [100], 'normal', seed=0)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual(stats.count, 50000)
+        self.assertTrue(peak < 50000 * 50 * 8 / 2)
+        self.assertTrue(abs(stats.result()[0, 2] - .25) < .005)
+
+    def test_variance_reduction(self):
+        jumps = "[{'dte': 10, 'dist': 'uniform', 'mean': .01, 'sd': .5}]"
+        for dist, kwargs in [('uniform', {'antithetic': True, 'control_variates': True}),
+                             ('double-bell', {'delta': 1, 'antithetic': 'True'}),
+                             ('skewnorm', {'skew_a': 3, 'control_variates': True}),
+                             ('bootstrap', {'bs_data': 'spec/stkPx.csv', 'control_variates': True})]:
+            kwargs['jumps'] = jumps
+            self.assertTrue(abs(path_sampling.forward(30, .25, 100, dist, **kwargs) /
+                                np.mean(path_sampling.ends(30, .25, 100, 100000, dist, rng=1, **kwargs)) - 1) < .002)
+            stats = path_sampling.strike_path_stats(30, .25, 100, 20000, [90, 110], dist, seed=2, **kwargs)
+            plain = path_sampling.strike_path_stats(30, .25, 100, 200000, [90, 110], dist, seed=3, jumps=jumps,
+                                                    **{k: v for k, v in kwargs.items() if k in ['delta', 'skew_a', 'bs_data']})
+            errors = stats.standard_errors()
+            self.assertTrue(np.all(errors <= stats.standard_errors(reduced=False)))
+            self.assertTrue(np.all(np.abs(stats.result()[:, :2] - plain.result()[:, :2])
+                                   <= 4 * np.hypot(errors, plain.standard_errors())))
+        self.assertRaises(ValueError, path_sampling.strike_path_stats, 30, .25, 100, 100, [100], 'skewnorm',
+                          skew_a=3, antithetic=True)
+        self.assertRaises(ValueError, path_sampling.strike_path_stats, 30, .25, 100, 101, [100], 'normal',
+                          antithetic=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import path_sampling
+import result_cache
+import strike_table
+from plot import iv_time_plot
+
+
+class CountingExecutor:
+    """Serial executor that counts the tasks it runs"""
+
+    def __init__(self):
+        self.tasks = 0
+
+    def map(self, fn, *iterables):
+        results = list(map(fn, *iterables))
+        self.tasks += len(results)
+        return results
+
+
+class InterruptedExecutor:
+    """Serial executor interrupted (as by Ctrl-C) after a number of tasks"""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+    def map(self, fn, *iterables):
+        for n, args in enumerate(zip(*iterables)):
+            if n == self.tasks:
+                raise KeyboardInterrupt
+            yield fn(*args)
+
+
+class ProgressExecutor:
+    """Serial executor that reads the progress of a checkpoint before running its tasks"""
+
+    def __init__(self, checkpoint):
+        self.checkpoint, self.progress = checkpoint, None
+
+    def map(self, fn, *iterables):
+        self.progress = result_cache.progress(self.checkpoint)
+        return list(map(fn, *iterables))
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = result_cache.CACHE_DIR
+        self.tmp = tempfile.TemporaryDirectory()
+        result_cache.CACHE_DIR = self.tmp.name
+
+    def tearDown(self):
+        result_cache.CACHE_DIR = self.cache_dir
+        self.tmp.cleanup()
+
+    def test_reuse(self):
+        index = [90, 100, 110]
+        pool = CountingExecutor()
+        first = strike_table.CallPutTable(20, .25, 100, 3000, index, seed=1, executor=pool, cache=True).get_table()
+        self.assertEqual(pool.tasks, 3)
+        second = strike_table.CallPutTable(20, .25, 100.0, 3000, index, seed=1, executor=pool, cache='true').get_table()
+        self.assertEqual(pool.tasks, 3)
+        self.assertTrue(first.equals(second))
+        strike_table.CallPutTable(20, .25, 100, 3000, index, seed=2, executor=pool, cache=True)
+        self.assertEqual(pool.tasks, 6)
+        table = iv_time_plot.TimeTable([10, 20], .25, 100, 3000, 100, seed=1, executor=pool, common_paths=True,
+                                       cache=True)
+        self.assertEqual(pool.tasks, 7)
+        again = iv_time_plot.TimeTable([10, 20], .25, 100, 3000, 100, seed=1, executor=pool, common_paths=True,
+                                       cache=True)
+        self.assertEqual(pool.tasks, 7)
+        self.assertTrue(table.get_table().equals(again.get_table()))
+
+    def test_extend(self):
+        times = path_sampling.CHUNK_SIZE + 500
+        pool = CountingExecutor()
+        strike_table.CallPutTable(20, .25, 100, times, [100], seed=3, executor=pool, cache=True)
+        extended = strike_table.CallPutTable(20, .25, 100, 2 * times, [100], seed=3, executor=pool, cache=True)
+        # chunk 0 is reused, chunk 1 grows from 500 paths to a full chunk and chunk 2 is new
+        self.assertEqual(pool.tasks, 2 + 2)
+        fresh = strike_table.CallPutTable(20, .25, 100, 2 * times, [100], seed=3, executor='serial')
+        self.assertTrue(extended.get_table().equals(fresh.get_table()))
+        self.assertTrue(extended.get_errors().equals(fresh.get_errors()))
+
+    def test_checkpoint(self):
+        checkpoint = os.path.join(self.tmp.name, 'run.ckpt')
+        times = 2 * path_sampling.CHUNK_SIZE + 10
+        index = [90, 100, 110]
+        with self.assertRaises(KeyboardInterrupt):
+            strike_table.CallPutTable(20, .25, 100, times, index, seed=4, executor=InterruptedExecutor(4),
+                                      checkpoint=checkpoint)
+        progress = result_cache.progress(checkpoint)
+        self.assertEqual(progress['cells'], 3)
+        self.assertEqual((progress['cells_done'], progress['chunks'], progress['chunks_done']), (1, 9, 4))
+        self.assertEqual(progress['paths_done'], times + path_sampling.CHUNK_SIZE)
+        pool = CountingExecutor()
+        resumed = strike_table.CallPutTable(20, .25, 100, times, index, seed=4, executor=pool, checkpoint=checkpoint)
+        self.assertEqual(pool.tasks, 5)
+        self.assertEqual(result_cache.progress(checkpoint)['chunks_done'], 9)
+        fresh = strike_table.CallPutTable(20, .25, 100, times, index, seed=4, executor='serial')
+        self.assertTrue(resumed.get_table().equals(fresh.get_table()))
+        self.assertEqual(result_cache.progress(os.path.join(self.tmp.name, 'none.ckpt'))['cells'], 0)
+        pool = ProgressExecutor(os.path.join(self.tmp.name, 'new.ckpt'))
+        strike_table.CallPutTable(20, .25, 100, times, index, seed=4, executor=pool, checkpoint=pool.checkpoint)
+        self.assertEqual((pool.progress['cells'], pool.progress['chunks'], pool.progress['chunks_done']), (3, 9, 0))
+
+    def test_unseeded_cache(self):
+        with self.assertWarns(UserWarning):
+            table = strike_table.CallPutTable(20, .25, 100, 500, [100], executor='serial', cache=True)
+        self.assertFalse(table.cache)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_unseeded_checkpoint(self):
+        checkpoint = os.path.join(self.tmp.name, 'unseeded.ckpt')
+        times = 2 * path_sampling.CHUNK_SIZE + 10
+        with self.assertRaises(KeyboardInterrupt):
+            strike_table.CallPutTable(20, .25, 100, times, [90, 100], executor=InterruptedExecutor(4),
+                                      checkpoint=checkpoint)
+        pool = CountingExecutor()
+        resumed = strike_table.CallPutTable(20, .25, 100, times, [90, 100], executor=pool, checkpoint=checkpoint)
+        self.assertEqual(pool.tasks, 2)
+        self.assertEqual(result_cache.progress(checkpoint)['cells'], 2)
+        fresh = strike_table.CallPutTable(20, .25, 100, times, [90, 100], seed=resumed.seed, executor='serial')
+        self.assertTrue(resumed.get_table().equals(fresh.get_table()))
+
+    def test_key(self):
+        params = result_cache.cell_params(path_sampling.strike_path_stats, (20, .25, 100, 5, [100.0], 'normal'),
+                                          path_sampling.seed_sequence(1), {'antithetic': 'true'})
+        same = result_cache.cell_params(path_sampling.strike_path_stats, (20, .25, 100.0, 50, np.array([100]),
+                                                                          'normal'),
+                                        np.random.SeedSequence(1), {'antithetic': 'true'})
+        self.assertEqual(result_cache.cell_key(params), result_cache.cell_key(same))
+        other = result_cache.cell_params(path_sampling.strike_path_stats, (20, .25, 100, 5, [100], 'normal'),
+                                         path_sampling.child_seed(1, 0), {'antithetic': 'true'})
+        self.assertNotEqual(result_cache.cell_key(params), result_cache.cell_key(other))
+        self.assertEqual(result_cache.canonical({'dtype': np.float32}), {'dtype': 'float32'})
+        self.assertRaises(ValueError, result_cache.canonical, object())
+
+    def test_evict(self):
+        for n in range(4):
+            result_cache.save('key%d' % n, {}, {(0, 1): np.zeros(1000)})
+            os.utime(os.path.join(result_cache.CACHE_DIR, 'key%d.pkl' % n), (n, n))
+        size = os.path.getsize(os.path.join(result_cache.CACHE_DIR, 'key0.pkl'))
+        result_cache.evict(2 * size)
+        self.assertEqual(sorted(os.listdir(result_cache.CACHE_DIR)), ['key2.pkl', 'key3.pkl'])
+        self.assertEqual(result_cache.load('key0'), {})
+        result_cache.clear()
+        self.assertEqual(os.listdir(result_cache.CACHE_DIR), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import path_sampling
+import result_file
+import strike_table
+from plot import iv_time_plot
+
+
+class TestCallPutTable(unittest.TestCase):
+    def test_common_paths(self):
+        index = strike_table.CallPutTable.get_index(100, 30, 6)
+        df = strike_table.CallPutTable(50, .25, 100, 5000, index, common_paths=True, seed=0).get_table()
+        self.assertEqual(list(df.index), list(index))
+        # with common paths C - P + X - S is the same sample mean for every strike
+        parity = df.loc[:, 'C-P+X-$'].astype(float).values
+        self.assertTrue(np.all(np.abs(parity - parity[0]) < 1e-8))
+        self.assertTrue(abs(df.loc[100, 'Call IV'] - .25) < .02)
+        self.assertTrue(np.all(np.diff(df.loc[:, 'Call Price'].astype(float).values) < 0))
+
+    def test_stochastic_vol(self):
+        # parameters as read from the input files
+        df = strike_table.CallPutTable(50, .25, 100, 4000, [90, 100, 110], 'heston', common_paths=True, seed=0,
+                                       kappa='3', rho='-.5', control_variates='true').get_table()
+        self.assertTrue(df.loc[90, 'Put IV'] > df.loc[110, 'Call IV'])
+        table = iv_time_plot.TimeTable([20, 40], .25, 100, 2000, 100, 'garch', seed=0, alpha='.15', beta='.8')
+        self.assertTrue(np.all(np.abs(table.get_table().loc[:, 'RV'].astype(float).values - .25) < .03))
+
+    def test_seed(self):
+        index = [90, 100, 110]
+        first = strike_table.CallPutTable(20, .25, 100, 2000, index, seed=3).get_table()
+        second = strike_table.CallPutTable(20, .25, 100, 2000, index, seed=3).get_table()
+        self.assertTrue(first.equals(second))
+        surface = strike_table.CallPutSurface(20, [.2, .3], 100, 2 * path_sampling.CHUNK_SIZE + 1, index, seed=3)
+        expected = path_sampling.all_including_rv_surface(20, [.2, .3], 100, 2 * path_sampling.CHUNK_SIZE + 1, index,
+                                                          'normal', seed=3)
+        self.assertTrue(np.array_equal(surface.get_table(.3).loc[:, 'Call Price'].astype(float).values,
+                                       expected[1, :, 0]))
+        surface = strike_table.CallPutSurface(20, [.2, .3], 100, 2500, index, seed=3, executor='thread')
+        expected = path_sampling.all_including_rv_surface(20, [.2, .3], 100, 2500, index, 'normal', seed=3)
+        self.assertTrue(np.array_equal(surface.get_table(.2).loc[:, 'Put Price'].astype(float).values,
+                                       expected[0, :, 1]))
+
+    def test_executors(self):
+        times = path_sampling.CHUNK_SIZE + 500
+        tables = [strike_table.CallPutTable(20, .25, 100, times, [95, 105], seed=4, executor=e).get_table()
+                  for e in ['serial', 'thread', 'process']]
+        self.assertTrue(tables[0].equals(tables[1]) and tables[0].equals(tables[2]))
+
+    def test_adaptive(self):
+        index = [80, 100, 120]
+        table = strike_table.CallPutTable(50, .25, 100, 1000, index, seed=5, executor='serial', target_iv_se=.005,
+                                          max_times=20000)
+        errors = table.get_errors()
+        otm = np.where(np.array(index) >= 100, errors.loc[:, 'Call IV SE'], errors.loc[:, 'Put IV SE'])
+        self.assertTrue(np.all((otm <= .005) | (errors.loc[:, 'Paths'] + 1000 > 20000)))
+        self.assertTrue(np.all(errors.loc[:, 'Paths'] % 1000 == 0) and errors.loc[:, 'Paths'].max() > 1000)
+        again = strike_table.CallPutTable(50, .25, 100, 1000, index, seed=5, target_iv_se='.005', max_times='20000')
+        self.assertTrue(table.get_table().equals(again.get_table()))
+        self.assertRaises(ValueError, strike_table.CallPutTable, 50, .25, 100, 1000, index, common_paths=True,
+                          target_iv_se=.005)
+        flagged = strike_table.CallPutTable(50, .25, 100, 1000, index, common_paths='False', seed=5,
+                                            target_iv_se=.005, max_times=20000)
+        self.assertFalse(flagged.common_paths)
+        self.assertTrue(table.get_table().equals(flagged.get_table()))
+
+    def test_export(self):
+        table = strike_table.CallPutTable(20, .25, 100, 2000, [90, 100, 110], seed=6, executor='serial')
+        self.assertTrue(all(dtype == np.float64 for dtype in table.get_table().dtypes))
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'table')
+            table.export_to_npz(filename, inputs={'filename': 'table'})
+            columns, metadata = result_file.load(filename + '.npz')
+            self.assertTrue(isinstance(columns['Call IV'], np.memmap))
+            self.assertTrue(np.array_equal(columns['Call IV'], table.get_table()['Call IV'].to_numpy(),
+                                           equal_nan=True))
+            self.assertTrue(np.array_equal(columns['Paths'], [2000] * 3))
+            self.assertTrue(np.array_equal(columns['Strike'], np.load(filename + '.npz')['Strike']))
+            self.assertEqual(metadata['seed'], {'entropy': 6, 'spawn_key': []})
+            self.assertEqual(metadata['params']['times'], 2000)
+            self.assertEqual(metadata['inputs'], {'filename': 'table'})
+            self.assertTrue(metadata['timings']['paths'] >= 0)
+            del columns
+
+
+if __name__ == '__main__':
+    unittest.main()